@@ -0,0 +1,240 @@
+import contextlib
+
+from a2wsgi import WSGIMiddleware
+from flask import Response as FlaskResponse, abort, make_response, render_template, request, session
+from sqlalchemy import orm
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from app import create_app
+from views import page_etag
+from views.artists import artist_data, artist_list
+from views.shows import show_list
+from views.venues import venue_data
+from dbpool import async_database_url, async_engine_options
+from cache import view_cache
+from forms import genre_choices
+from models import Artist, Venue
+from models import venue_directory_query, venue_areas, artist_list_query, venue_shows_query, artist_shows_query
+from models import show_page_query, paginate_shows, split_on_start_time
+from models import venue_version_query, artist_version_query, venue_directory_version_query
+from models import artist_list_version_query, show_list_version_query, version_of
+from search import search_query, search_results
+
+#----------------------------------------------------------------------------#
+# Async read app.
+#----------------------------------------------------------------------------#
+
+# An ASGI entry point for the read pages -- venue and artist listings, detail
+# pages, shows and search -- whose database access goes through SQLAlchemy's
+# asyncio extension (asyncpg on PostgreSQL, aiosqlite on SQLite), so a request
+# waiting on the database or on a slow client holds no thread:
+#
+#     uvicorn asgi:app --workers 4
+#
+# Every other route, the forms included, is passed to the Flask app, which runs
+# on a thread pool. The async views run inside a Flask request context built
+# from the ASGI request and reuse the Flask app's request hooks (profiler,
+# metrics, session cookie), templates, view cache and error handlers, so a page
+# is the same whichever side served it. They read from the primary database.
+
+flask_app = create_app()
+engine = create_async_engine(async_database_url(flask_app.config), **async_engine_options(flask_app.config))
+Session = orm.sessionmaker(engine, class_=AsyncSession)
+
+
+def read_view(view):
+  # A Starlette endpoint calling `await view(db_session, **path_params)` the
+  # way Flask's wsgi_app()/full_dispatch_request() call a sync view.
+  async def endpoint(asgi_request):
+    context = flask_app.test_request_context(
+      asgi_request.url.path,
+      base_url=f'{asgi_request.url.scheme}://{asgi_request.url.netloc}{asgi_request.scope.get("root_path", "")}',
+      query_string=asgi_request.url.query,
+      method=asgi_request.method,
+      headers=[(key.decode('latin-1'), value.decode('latin-1')) for key, value in asgi_request.headers.raw],
+      data=await asgi_request.body(),
+    )
+    with context:
+      async with Session() as db_session:
+        try:
+          try:
+            rv = flask_app.preprocess_request()
+            if rv is None:
+              rv = await view(db_session, **asgi_request.path_params)
+          except Exception as e:
+            rv = flask_app.handle_user_exception(e)
+          response = flask_app.finalize_request(rv)
+        except Exception as e:
+          response = flask_app.handle_exception(e)
+    asgi_response = Response(response.get_data(), status_code=response.status_code)
+    asgi_response.raw_headers = [
+      (key.lower().encode('latin-1'), value.encode('latin-1')) for key, value in response.headers.items()
+    ]
+    return asgi_response
+  return endpoint
+
+
+async def conditional(version, render):
+  # views.conditional() for a coroutine function `render`.
+  last_modified, parts = version
+  etag = page_etag(parts)
+  if request.if_none_match.contains_weak(etag) and not session.get('_flashes'):
+    response = FlaskResponse(status=304)
+  else:
+    response = make_response(await render())
+  response.set_etag(etag)
+  response.last_modified = last_modified
+  response.cache_control.no_cache = True
+  return response
+
+
+async def fetch(db_session, statement):
+  return (await db_session.execute(statement)).all()
+
+
+async def fetch_version(db_session, statement):
+  return version_of((await db_session.execute(statement)).first())
+
+#----------------------------------------------------------------------------#
+# Views.
+#----------------------------------------------------------------------------#
+
+async def venues(db_session):
+  genre = request.args.get('genre') or None
+
+  async def load():
+    return venue_areas(await fetch(db_session, venue_directory_query(genre)))
+
+  version = await fetch_version(db_session, venue_directory_version_query())
+
+  async def render():
+    areas = await view_cache.get_or_set_async(f'venues:{genre or ""}', ['venues'], load, version=version[1])
+    return render_template('pages/venues.html', genre=genre, genres=genre_choices, areas=areas)
+
+  return await conditional(version, render)
+
+
+async def show_venue(db_session, venue_id):
+  version = await fetch_version(db_session, venue_version_query(venue_id))
+  if version is None:
+    abort(404)
+
+  async def load():
+    venue = await db_session.get(Venue, venue_id)
+    if venue is None:
+      return None
+    return venue_data(venue, *split_on_start_time(await fetch(db_session, venue_shows_query(venue_id))))
+
+  async def render():
+    data = await view_cache.get_or_set_async(
+      f'venue:{venue_id}', [f'venue:{venue_id}', 'venue:*'], load, version=version[1])
+    if data is None:
+      abort(404)
+    return render_template('pages/show_venue.html', venue=data)
+
+  return await conditional(version, render)
+
+
+async def artists(db_session):
+  genre = request.args.get('genre') or None
+
+  async def load():
+    return artist_list(await fetch(db_session, artist_list_query(genre)))
+
+  version = await fetch_version(db_session, artist_list_version_query())
+
+  async def render():
+    data = await view_cache.get_or_set_async(f'artists:{genre or ""}', ['artists'], load, version=version[1])
+    return render_template('pages/artists.html', genre=genre, genres=genre_choices, artists=data)
+
+  return await conditional(version, render)
+
+
+async def show_artist(db_session, artist_id):
+  version = await fetch_version(db_session, artist_version_query(artist_id))
+  if version is None:
+    abort(404)
+
+  async def load():
+    artist = await db_session.get(Artist, artist_id)
+    if artist is None:
+      return None
+    return artist_data(artist, *split_on_start_time(await fetch(db_session, artist_shows_query(artist_id))))
+
+  async def render():
+    data = await view_cache.get_or_set_async(
+      f'artist:{artist_id}', [f'artist:{artist_id}', 'artist:*'], load, version=version[1])
+    if data is None:
+      abort(404)
+    return render_template('pages/show_artist.html', artist=data)
+
+  return await conditional(version, render)
+
+
+async def shows(db_session):
+  per_page = request.args.get('per_page', flask_app.config['SHOWS_PER_PAGE'], type=int)
+  per_page = max(1, min(per_page, flask_app.config['SHOWS_MAX_PER_PAGE']))
+  after, before = request.args.get('after'), request.args.get('before')
+  version = await fetch_version(db_session, show_list_version_query())
+
+  async def load():
+    rows = await fetch(db_session, show_page_query(after, before, per_page))
+    page, next_cursor, prev_cursor = paginate_shows(rows, after, before, per_page)
+    return show_list(page), next_cursor, prev_cursor
+
+  async def render():
+    try:
+      data, next_cursor, prev_cursor = await view_cache.get_or_set_async(
+        f'shows:{after}:{before}:{per_page}', ['shows'], load, version=version[1]
+      )
+    except ValueError:
+      abort(400)
+    return render_template('pages/shows.html', shows=data, per_page=per_page,
+                           next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+  return await conditional(version, render)
+
+
+async def search(db_session, model, term):
+  # search.search() on the async session.
+  term, limit = term.strip(), flask_app.config['SEARCH_RESULTS_LIMIT']
+  return search_results(await fetch(db_session, search_query(model, term, limit)))
+
+
+async def search_venues(db_session):
+  search_term = request.form.get('search_term', '')
+  count, data = await search(db_session, Venue, search_term)
+  return render_template('pages/search_venues.html', results={'count': count, 'data': data}, search_term=search_term)
+
+
+async def search_artists(db_session):
+  search_term = request.form.get('search_term', '')
+  count, data = await search(db_session, Artist, search_term)
+  return render_template('pages/search_artists.html', results={'count': count, 'data': data}, search_term=search_term)
+
+#----------------------------------------------------------------------------#
+# App.
+#----------------------------------------------------------------------------#
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+  yield
+  await engine.dispose()
+
+
+app = Starlette(
+  routes=[
+    Route('/venues', read_view(venues)),
+    Route('/venues/search', read_view(search_venues), methods=['POST']),
+    Route('/venues/{venue_id:int}', read_view(show_venue)),
+    Route('/artists', read_view(artists)),
+    Route('/artists/search', read_view(search_artists), methods=['POST']),
+    Route('/artists/{artist_id:int}', read_view(show_artist)),
+    Route('/shows', read_view(shows)),
+    Mount('/', WSGIMiddleware(flask_app)),
+  ],
+  lifespan=lifespan,
+)
@@ -0,0 +1,88 @@
+import bisect
+import threading
+import time
+
+from models import db, Artist, Venue
+
+#----------------------------------------------------------------------------#
+# Autocomplete.
+#----------------------------------------------------------------------------#
+
+class PrefixIndex:
+    # Names kept in a sorted array of (key, id) pairs, answering prefix queries
+    # with a binary search. Every word of a name is a key, so "hop" completes
+    # "The Musical Hop" as well as "Hop Scotch".
+    #
+    # The index loads itself with one query on first use and is then kept
+    # current by the write handlers calling add()/remove(). Other worker
+    # processes don't see those calls, so a full reload also happens every
+    # `refresh_seconds` to bound how stale a worker can get.
+
+    def __init__(self, model, refresh_seconds=300):
+      self.model = model
+      self.refresh_seconds = refresh_seconds
+      self._keys = []
+      self._names = {}
+      self._loaded_at = None
+      self._lock = threading.RLock()
+
+    def complete(self, prefix, limit=10):
+      prefix = prefix.strip().lower()
+      if not prefix:
+        return []
+      with self._lock:
+        self._ensure_loaded()
+        results, seen = [], set()
+        i = bisect.bisect_left(self._keys, (prefix,))
+        while i < len(self._keys) and self._keys[i][0].startswith(prefix) and len(results) < limit:
+          entity_id = self._keys[i][1]
+          if entity_id not in seen:
+            seen.add(entity_id)
+            results.append({'id': entity_id, 'name': self._names[entity_id]})
+          i += 1
+        return results
+
+    def add(self, entity_id, name):
+      # Insert or rename one entry. A no-op until the index has been loaded,
+      # since loading will pick the change up anyway.
+      with self._lock:
+        if self._loaded_at is None:
+          return
+        self._discard(entity_id)
+        self._names[entity_id] = name
+        for key in _keys(name):
+          bisect.insort(self._keys, (key, entity_id))
+
+    def remove(self, entity_id):
+      with self._lock:
+        if self._loaded_at is not None:
+          self._discard(entity_id)
+
+    def reload(self):
+      rows = db.session.query(self.model.id, self.model.name).filter(self.model.archived_at.is_(None)).all()
+      with self._lock:
+        self._names = {row.id: row.name for row in rows}
+        self._keys = sorted((key, row.id) for row in rows for key in _keys(row.name))
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+      if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_seconds:
+        self.reload()
+
+    def _discard(self, entity_id):
+      name = self._names.pop(entity_id, None)
+      if name is None:
+        return
+      for key in _keys(name):
+        i = bisect.bisect_left(self._keys, (key, entity_id))
+        if i < len(self._keys) and self._keys[i] == (key, entity_id):
+          del self._keys[i]
+
+
+def _keys(name):
+  words = name.lower().split()
+  return {' '.join(words[i:]) for i in range(len(words))}
+
+
+venue_names = PrefixIndex(Venue)
+artist_names = PrefixIndex(Artist)
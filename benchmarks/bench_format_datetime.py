@@ -0,0 +1,84 @@
+"""Micro-benchmark: start-time formatting for a 10k-show listing.
+
+Compares the previous path, where the view formatted each start_time via an
+ISO round-trip through dateutil and Babel and the template's `datetime('full')`
+filter parsed and formatted that string again, with the current path, where
+the template formats the datetime once through filters.format_datetime.
+
+    python benchmarks/bench_format_datetime.py [--rows 10000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import babel.dates
+import dateutil.parser
+
+import filters
+
+
+def legacy_format_datetime(value, format='medium'):
+  if isinstance(value, datetime):
+    value = value.isoformat()
+  date = dateutil.parser.parse(value)
+  if format == 'full':
+    format = "EEEE MMMM, d, y 'at' h:mma"
+  elif format == 'medium':
+    format = "EE MM, dd, y h:mma"
+  return babel.dates.format_datetime(date, format, locale='en')
+
+
+def legacy_row(start_time):
+  # view: format_datetime(show.start_time); template: |datetime('full')
+  return legacy_format_datetime(legacy_format_datetime(start_time), 'full')
+
+
+def current_row(start_time):
+  # template: |datetime('full') on the datetime itself
+  return filters.format_datetime(start_time, 'full')
+
+
+def start_times(rows, seed=0):
+  # Shows start on the half hour across a year, so times repeat the way they
+  # do in a real listing.
+  rng = random.Random(seed)
+  base = datetime(2026, 1, 1, 18, 0)
+  return [base + timedelta(minutes=30 * rng.randrange(365 * 12)) for _ in range(rows)]
+
+
+def timed(fn, values, repeat):
+  best = float('inf')
+  for _ in range(repeat):
+    filters._format.cache_clear()
+    started = time.perf_counter()
+    for value in values:
+      fn(value)
+    best = min(best, time.perf_counter() - started)
+  return best
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--rows', type=int, default=10000)
+  parser.add_argument('--repeat', type=int, default=3)
+  args = parser.parse_args()
+
+  values = start_times(args.rows)
+  assert [legacy_row(v) for v in values[:200]] == [current_row(v) for v in values[:200]]
+
+  legacy = timed(legacy_row, values, args.repeat)
+  current = timed(current_row, values, args.repeat)
+  distinct = len(set(values))
+  print(f'{args.rows} rows ({distinct} distinct start times), best of {args.repeat}')
+  print(f'  legacy:  {legacy * 1e3:8.1f} ms  {legacy / args.rows * 1e6:7.2f} us/row')
+  print(f'  current: {current * 1e3:8.1f} ms  {current / args.rows * 1e6:7.2f} us/row')
+  print(f'  speedup: {legacy / current:.1f}x')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,68 @@
+"""Startup benchmark: importing app and building it with create_app().
+
+Runs `python -X importtime` on a fresh interpreter `--repeat` times, reports
+the median wall time and the modules costing the most, and fails if startup
+takes longer than `--max-ms` or imports a module that should load on first use
+only (Alembic, Babel, WTForms, the import/export commands...).
+
+    python benchmarks/bench_importtime.py [--repeat 5] [--top 15] [--max-ms 1000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = 'from app import create_app; create_app()'
+
+# Modules only some requests or commands need.
+DEFERRED = ['alembic', 'flask_migrate', 'babel', 'wtforms', 'flask_wtf', 'importer', 'exporter']
+
+
+def run_once():
+  # Returns wall milliseconds and {module: (self us, cumulative us)}.
+  started = time.perf_counter()
+  result = subprocess.run(
+    [sys.executable, '-X', 'importtime', '-c', STARTUP],
+    cwd=ROOT, capture_output=True, text=True, check=True,
+  )
+  wall = (time.perf_counter() - started) * 1000
+  modules = {}
+  for line in result.stderr.splitlines():
+    if not line.startswith('import time:') or 'self [us]' in line:
+      continue
+    self_us, cumulative_us, name = line[len('import time:'):].split('|')
+    modules[name.strip()] = (int(self_us), int(cumulative_us))
+  return wall, modules
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--top', type=int, default=15, help='Modules to list, by self time.')
+  parser.add_argument('--max-ms', type=float, help='Fail if the median wall time is above this.')
+  args = parser.parse_args()
+
+  runs = [run_once() for _ in range(args.repeat)]
+  wall = statistics.median(wall for wall, _ in runs)
+  modules = runs[-1][1]
+  imports = sum(self_us for self_us, _ in modules.values()) / 1000
+
+  print(f'startup: {wall:.0f} ms wall (median of {args.repeat}), {imports:.0f} ms importing {len(modules)} modules')
+  print(f'{"self ms":>8} {"cumul ms":>9}  module')
+  for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][0])[:args.top]:
+    print(f'{self_us / 1000:8.1f} {cumulative_us / 1000:9.1f}  {name}')
+
+  failures = [f'{name} imported at startup' for name in DEFERRED if name in modules]
+  if args.max_ms is not None and wall > args.max_ms:
+    failures.append(f'startup took {wall:.0f} ms, over {args.max_ms:.0f} ms')
+  for failure in failures:
+    print(f'FAIL: {failure}')
+  return 1 if failures else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
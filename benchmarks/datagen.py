@@ -0,0 +1,260 @@
+"""Synthetic data generator: fills the database with venues, artists and shows.
+
+Rows are random but seeded, so the same arguments always produce the same
+data. Shows never double-book a venue or an artist, so the data satisfies the
+booking rules (see bookings.py). On PostgreSQL batches are loaded with COPY;
+elsewhere with executemany.
+The tables should be empty (see --truncate): ids are assigned from 1.
+
+    python benchmarks/datagen.py --venues 10000 --artists 100000 --shows 5000000 \\
+        [--database-url URL] [--create-schema] [--truncate] [--seed 0]
+
+--database-url defaults to DATABASE_URL, then to config.py's database.
+--create-schema creates missing tables from the models, for a fresh SQLite
+file or scratch database; otherwise run `flask db upgrade` first.
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+import config
+from forms import genre_choices
+from models import db, Artist, Genre, Show, Venue, DEFAULT_SHOW_LENGTH, genre_links
+from rollups import rebuild
+
+GENRES = [value for value, _ in genre_choices]
+CITIES = [
+  ('San Francisco', 'CA'), ('Los Angeles', 'CA'), ('San Diego', 'CA'), ('New York', 'NY'),
+  ('Brooklyn', 'NY'), ('Chicago', 'IL'), ('Austin', 'TX'), ('Houston', 'TX'), ('Seattle', 'WA'),
+  ('Portland', 'OR'), ('Denver', 'CO'), ('Nashville', 'TN'), ('Memphis', 'TN'),
+  ('New Orleans', 'LA'), ('Atlanta', 'GA'), ('Miami', 'FL'), ('Boston', 'MA'),
+  ('Philadelphia', 'PA'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+]
+WORDS = [
+  'Blue', 'Red', 'Golden', 'Silver', 'Velvet', 'Electric', 'Midnight', 'Wild', 'Lucky', 'Broken',
+  'Crystal', 'Neon', 'Hidden', 'Rolling', 'Howling', 'Quiet', 'Lost', 'Northern', 'Southern',
+  'Little', 'Grand', 'Royal', 'Musical', 'Dueling', 'Park', 'Hop', 'Moon', 'Room', 'Hall',
+  'Lounge', 'Garden', 'Cellar', 'Tavern', 'Club', 'Stage', 'Wolves', 'Kings', 'Sisters', 'Echo',
+]
+
+
+def venue_rows(count, rng, now):
+  for i in range(1, count + 1):
+    city, state = rng.choice(CITIES)
+    yield {
+      'id': i,
+      'name': f'The {rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+      'genres': rng.sample(GENRES, rng.randint(1, 3)),
+      'address': f'{rng.randint(1, 9999)} {rng.choice(WORDS)} St',
+      'city': city,
+      'state': state,
+      'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+      'website': f'https://venue{i}.example.com',
+      'facebook_link': f'https://www.facebook.com/venue{i}',
+      'seeking_talent': rng.random() < 0.3,
+      'seeking_description': 'Looking for local acts.' if rng.random() < 0.3 else None,
+      'image_link': f'https://images.example.com/venues/{i}.jpg',
+      'updated_at': now,
+    }
+
+
+def artist_rows(count, rng, now):
+  for i in range(1, count + 1):
+    city, state = rng.choice(CITIES)
+    yield {
+      'id': i,
+      'name': f'{rng.choice(WORDS)} {rng.choice(WORDS)} {i}',
+      'genres': rng.sample(GENRES, rng.randint(1, 3)),
+      'city': city,
+      'state': state,
+      'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+      'website': f'https://artist{i}.example.com',
+      'facebook_link': f'https://www.facebook.com/artist{i}',
+      'seeking_venue': rng.random() < 0.3,
+      'seeking_description': 'Looking for gigs.' if rng.random() < 0.3 else None,
+      'image_link': f'https://images.example.com/artists/{i}.jpg',
+      'updated_at': now,
+    }
+
+
+def show_rows(count, venues, artists, rng, now):
+  # Two years of past shows and one of upcoming ones, two hours long and
+  # starting on the half hour, with no venue or artist booked twice at once.
+  first = now.replace(minute=0, second=0, microsecond=0) - timedelta(days=730)
+  slots = 3 * 365 * 48
+  length = DEFAULT_SHOW_LENGTH // timedelta(minutes=30)
+  booked = {'venue': Slots(venues + 1, slots), 'artist': Slots(artists + 1, slots)}
+  for i in range(1, count + 1):
+    while True:
+      artist_id, venue_id = rng.randint(1, artists), rng.randint(1, venues)
+      slot = rng.randrange(slots - length + 1)
+      if booked['venue'].free(venue_id, slot, length) and booked['artist'].free(artist_id, slot, length):
+        break
+    booked['venue'].book(venue_id, slot, length)
+    booked['artist'].book(artist_id, slot, length)
+    start_time = first + timedelta(minutes=30 * slot)
+    yield {
+      'id': i,
+      'artist_id': artist_id,
+      'venue_id': venue_id,
+      'start_time': start_time,
+      'end_time': start_time + DEFAULT_SHOW_LENGTH,
+      'updated_at': now,
+    }
+
+
+class Slots:
+    # One bit per (owner, half hour): which venues or artists are busy when.
+
+    def __init__(self, owners, slots):
+      self.slots = slots
+      self.bits = bytearray((owners * slots + 7) // 8)
+
+    def free(self, owner, slot, length):
+      return not any(self._get(owner * self.slots + s) for s in range(slot, slot + length))
+
+    def book(self, owner, slot, length):
+      for bit in range(owner * self.slots + slot, owner * self.slots + slot + length):
+        self.bits[bit >> 3] |= 1 << (bit & 7)
+
+    def _get(self, bit):
+      return self.bits[bit >> 3] & (1 << (bit & 7))
+
+
+def genre_ids(engine):
+  # Ids of every genre, adding the form's genres that are missing.
+  table = Genre.__table__
+  with engine.begin() as conn:
+    existing = {name for name, in conn.execute(select(table.c.name))}
+    missing = [{'name': name} for name in GENRES if name not in existing]
+    if missing:
+      conn.execute(table.insert(), missing)
+    return {name: genre_id for genre_id, name in conn.execute(select(table.c.id, table.c.name))}
+
+
+def load(engine, model, rows, batch_size, genres=None):
+  # Rows of venues and artists carry a list of genre names, which `genres`
+  # maps to ids for the association table.
+  loaded = 0
+  batch = []
+  for row in rows:
+    batch.append(row)
+    if len(batch) >= batch_size:
+      loaded += _load_batch(engine, model, batch, genres)
+      batch = []
+  if batch:
+    loaded += _load_batch(engine, model, batch, genres)
+  if engine.dialect.name == 'postgresql':
+    with engine.begin() as conn:
+      conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('\"{model.__tablename__}\"', 'id'), "
+        f"(SELECT coalesce(max(id), 1) FROM \"{model.__tablename__}\"))"
+      ))
+  return loaded
+
+
+def _load_batch(engine, model, batch, genres):
+  if not genres:
+    return _insert(engine, model.__table__, batch)
+  links, owner_id = genre_links(model)
+  link_rows = [
+    {owner_id.key: row['id'], 'genre_id': genres[name]} for row in batch for name in row.pop('genres')
+  ]
+  loaded = _insert(engine, model.__table__, batch)
+  _insert(engine, links, link_rows)
+  return loaded
+
+
+def _insert(engine, table, batch):
+  if engine.dialect.name != 'postgresql':
+    with engine.begin() as conn:
+      conn.execute(table.insert(), batch)
+    return len(batch)
+
+  columns = list(batch[0])
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  for row in batch:
+    writer.writerow([_copy_value(row[column]) for column in columns])
+  buffer.seek(0)
+  raw = engine.raw_connection()
+  try:
+    with raw.cursor() as cursor:
+      cursor.copy_expert(
+        f'COPY "{table.name}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer
+      )
+    raw.commit()
+  finally:
+    raw.close()
+  return len(batch)
+
+
+def _copy_value(value):
+  if isinstance(value, datetime):
+    return value.isoformat()
+  if value is None:
+    return ''
+  return value
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--venues', type=int, default=1000)
+  parser.add_argument('--artists', type=int, default=5000)
+  parser.add_argument('--shows', type=int, default=50000)
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--batch-size', type=int, default=20000)
+  parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL', config.SQLALCHEMY_DATABASE_URI))
+  parser.add_argument('--create-schema', action='store_true')
+  parser.add_argument('--truncate', action='store_true', help='Delete existing rows first.')
+  args = parser.parse_args()
+  if args.shows and not (args.venues and args.artists):
+    parser.error('shows need at least one venue and one artist')
+
+  engine = create_engine(args.database_url)
+  if args.create_schema:
+    db.metadata.create_all(engine)
+  if args.truncate:
+    with engine.begin() as conn:
+      if engine.dialect.name == 'postgresql':
+        conn.execute(text('TRUNCATE "Show", "VenueGenre", "ArtistGenre", "Venue", "Artist" RESTART IDENTITY CASCADE'))
+      else:
+        for table in reversed(db.metadata.sorted_tables):
+          conn.execute(table.delete())
+
+  rng = random.Random(args.seed)
+  now = datetime.utcnow()
+  genres = genre_ids(engine)
+  for model, rows, linked in (
+    (Venue, venue_rows(args.venues, rng, now), genres),
+    (Artist, artist_rows(args.artists, rng, now), genres),
+    (Show, show_rows(args.shows, args.venues, args.artists, rng, now), None),
+  ):
+    started = time.perf_counter()
+    loaded = load(engine, model, rows, args.batch_size, linked)
+    print(f'{model.__tablename__}: {loaded} rows in {time.perf_counter() - started:.1f}s')
+
+  # Shows were loaded around the ORM, so count them for the list pages.
+  started = time.perf_counter()
+  with Session(engine) as session:
+    rebuild(session)
+    session.commit()
+  print(f'show counts rebuilt in {time.perf_counter() - started:.1f}s')
+
+  if engine.dialect.name == 'postgresql':
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+      conn.execute(text('ANALYZE'))
+
+
+if __name__ == '__main__':
+  main()
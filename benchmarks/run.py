@@ -0,0 +1,251 @@
+"""Benchmark runner: latency, queries per request and memory for every route.
+
+Runs the scenarios in benchmarks/scenarios.py, either in process through the
+Flask test client or over HTTP against a running server, and reports p50, p95
+and p99 latency, SQL statements per request (from the Server-Timing header
+the profiler adds) and, in process, peak memory allocated per request. The
+header is set before a streamed body is generated, so statements run while
+streaming (the calendar feeds') are not in the count.
+With --thresholds, any scenario over its limits fails the run.
+
+    python benchmarks/datagen.py --create-schema --truncate ...
+    python benchmarks/run.py [--driver client|http] [--url http://localhost:5000]
+        [--database-url URL] [--requests 200] [--warmup 10] [--concurrency 8]
+        [--scenarios venues,shows] [--read-only] [--no-cache]
+        [--thresholds benchmarks/thresholds.json] [--output results.json]
+
+--database-url defaults to DATABASE_URL, then to config.py's database. With
+--driver http it is only used to sample ids for the requests, and must point
+at the server's database.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SERVER_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+LIMITS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kib', 'errors')
+
+
+class ClientDriver:
+    # In process, through the test client. CSRF is off so create flows can
+    # submit their forms.
+
+    def __init__(self, app, no_cache=False):
+      app.config.update(WTF_CSRF_ENABLED=False, SQL_QUERY_BUDGET=None, SQL_TIME_BUDGET_MS=None)
+      if no_cache:
+        from cache import view_cache
+        view_cache.backend = None
+      self.client = app.test_client()
+
+    def send(self, method, path, data, as_json=False):
+      response = self.client.open(path, method=method, **({'json': data} if as_json else {'data': data}))
+      # Streamed responses only run their queries as the body is read.
+      for _ in response.iter_encoded():
+        pass
+      response.close()
+      return response.status_code, response.headers.get('Server-Timing')
+
+
+class HTTPDriver:
+    # Over HTTP with one cookie-keeping opener per thread. The server decides
+    # whether CSRF applies; with it on, create flows measure the rejection.
+
+    def __init__(self, url):
+      self.url = url.rstrip('/')
+      self._local = threading.local()
+
+    def send(self, method, path, data, as_json=False):
+      opener = getattr(self._local, 'opener', None)
+      if opener is None:
+        opener = self._local.opener = urllib.request.build_opener(
+          urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+      headers = {}
+      if data is None:
+        body = None
+      elif as_json:
+        body, headers['Content-Type'] = json.dumps(data).encode(), 'application/json'
+      else:
+        body = urllib.parse.urlencode(data, doseq=True).encode()
+      request = urllib.request.Request(self.url + path, data=body, method=method, headers=headers)
+      try:
+        with opener.open(request) as response:
+          response.read()
+          return response.status, response.headers.get('Server-Timing')
+      except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, e.headers.get('Server-Timing')
+
+
+def run_scenario(driver, scenario, context, requests, warmup, concurrency, memory):
+  for _ in range(warmup):
+    driver.send(*scenario.request(context))
+
+  # Requests are built up front so the context's random state is only touched
+  # from this thread.
+  planned = [scenario.request(context) for _ in range(requests)]
+  samples = []
+
+  def timed(request):
+    started = time.perf_counter()
+    status, timing = driver.send(*request)
+    samples.append((time.perf_counter() - started, status, timing))
+
+  started = time.perf_counter()
+  if concurrency > 1:
+    with ThreadPoolExecutor(concurrency) as pool:
+      list(pool.map(timed, planned))
+  else:
+    for request in planned:
+      timed(request)
+  elapsed = time.perf_counter() - started
+
+  latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+  queries, db_ms = [], []
+  for _, _, timing in samples:
+    match = SERVER_TIMING.search(timing or '')
+    if match:
+      db_ms.append(float(match.group(1)))
+      queries.append(int(match.group(2)))
+  result = {
+    'scenario': scenario.name,
+    'requests': len(samples),
+    'errors': sum(1 for _, status, _ in samples if status >= 500),
+    'rps': len(samples) / elapsed if elapsed else 0.0,
+    'mean_ms': sum(latencies) / len(latencies),
+    'p50_ms': percentile(latencies, 50),
+    'p95_ms': percentile(latencies, 95),
+    'p99_ms': percentile(latencies, 99),
+    'queries': sum(queries) / len(queries) if queries else None,
+    'max_queries': max(queries) if queries else None,
+    'db_ms': sum(db_ms) / len(db_ms) if db_ms else None,
+    'peak_kib': None,
+  }
+  if memory:
+    result['peak_kib'] = peak_memory(driver, scenario, context, min(requests, 20))
+  return result
+
+
+def peak_memory(driver, scenario, context, requests):
+  # Peak Python allocations during a single request, the worst over a few.
+  # Measured apart from the timed requests since tracing slows them down.
+  peak = 0
+  tracemalloc.start()
+  try:
+    for _ in range(requests):
+      request = scenario.request(context)
+      tracemalloc.reset_peak()
+      baseline = tracemalloc.get_traced_memory()[0]
+      driver.send(*request)
+      peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+  finally:
+    tracemalloc.stop()
+  return peak / 1024
+
+
+def percentile(values, p):
+  # Nearest-rank percentile of sorted values.
+  if not values:
+    return None
+  rank = max(1, -(-len(values) * p // 100))
+  return values[int(rank) - 1]
+
+
+def check(results, thresholds):
+  failures = []
+  for result in results:
+    limits = thresholds.get(result['scenario'], {})
+    for key in LIMITS:
+      limit, value = limits.get(key), result.get(key)
+      if limit is not None and value is not None and value > limit:
+        failures.append(f'{result["scenario"]}: {key} {value:.1f} > {limit}')
+  return failures
+
+
+def report(results):
+  header = f'{"scenario":<22}{"n":>6}{"err":>5}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"rps":>8}{"queries":>9}{"db ms":>8}{"peak KiB":>10}'
+  print(header)
+  print('-' * len(header))
+  fmt = lambda value, spec: format(value, spec) if value is not None else format('-', spec[:-2].rstrip('.'))
+  for r in results:
+    print(
+      f'{r["scenario"]:<22}{r["requests"]:>6}{r["errors"]:>5}{r["p50_ms"]:>9.1f}{r["p95_ms"]:>9.1f}'
+      f'{r["p99_ms"]:>9.1f}{r["rps"]:>8.0f}{fmt(r["queries"], ">9.1f")}{fmt(r["db_ms"], ">8.1f")}'
+      f'{fmt(r["peak_kib"], ">10.0f")}'
+    )
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--driver', choices=['client', 'http'], default='client')
+  parser.add_argument('--url', default='http://localhost:5000')
+  parser.add_argument('--database-url')
+  parser.add_argument('--requests', type=int, default=200)
+  parser.add_argument('--warmup', type=int, default=10)
+  parser.add_argument('--concurrency', type=int, default=1, help='Concurrent requests (http driver).')
+  parser.add_argument('--scenarios', help='Comma-separated scenario names; all by default.')
+  parser.add_argument('--read-only', action='store_true', help='Skip the create flows.')
+  parser.add_argument('--no-cache', action='store_true', help='Disable the view cache (client driver).')
+  parser.add_argument('--no-memory', action='store_true', help='Skip the memory pass (client driver).')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--thresholds', type=argparse.FileType())
+  parser.add_argument('--output', type=argparse.FileType('w'))
+  args = parser.parse_args()
+
+  if args.database_url:
+    os.environ['DATABASE_URL'] = args.database_url
+  from app import create_app
+  from scenarios import SCENARIOS, Context
+
+  scenarios = SCENARIOS
+  if args.scenarios:
+    names = args.scenarios.split(',')
+    unknown = set(names) - {scenario.name for scenario in SCENARIOS}
+    if unknown:
+      parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+    scenarios = [scenario for scenario in SCENARIOS if scenario.name in names]
+  if args.read_only:
+    scenarios = [scenario for scenario in scenarios if not scenario.writes]
+
+  app = create_app()
+  with app.app_context():
+    context = Context(seed=args.seed)
+  if args.driver == 'client':
+    driver = ClientDriver(app, args.no_cache)
+    concurrency, memory = 1, not args.no_memory
+  else:
+    driver = HTTPDriver(args.url)
+    concurrency, memory = args.concurrency, False
+
+  results = [
+    run_scenario(driver, scenario, context, args.requests, args.warmup, concurrency, memory)
+    for scenario in scenarios
+  ]
+  report(results)
+  print(f'\nmax RSS of this process: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB')
+  if args.output:
+    json.dump({'driver': args.driver, 'results': results}, args.output, indent=2)
+
+  if args.thresholds:
+    failures = check(results, json.load(args.thresholds))
+    if failures:
+      print('\nThresholds exceeded:\n  ' + '\n  '.join(failures))
+      sys.exit(1)
+    print('\nAll thresholds met.')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,126 @@
+"""Benchmark scenarios: one scripted request per route, parameterised by the data.
+
+Each scenario builds its request from a Context sampled from the database, so
+detail pages, cursors and search terms point at rows that exist. Scenarios
+with `writes` set insert rows and are skipped by `run.py --read-only`.
+"""
+import random
+from datetime import datetime, timedelta
+
+from forms import genre_choices
+from models import db, Artist, Show, Venue, encode_show_cursor
+
+GENRES = [value for value, _ in genre_choices]
+
+
+class Context:
+    # Ids, names and cursors sampled from the database once, before a run.
+
+    def __init__(self, sample=200, seed=0):
+      self.rng = random.Random(seed)
+      self.venue_ids = [id for id, in db.session.query(Venue.id).order_by(db.func.random()).limit(sample)]
+      self.artist_ids = [id for id, in db.session.query(Artist.id).order_by(db.func.random()).limit(sample)]
+      names = [name for name, in db.session.query(Venue.name).limit(sample)]
+      names += [name for name, in db.session.query(Artist.name).limit(sample)]
+      self.words = sorted({word for name in names for word in name.split() if word.isalpha()}) or ['the']
+      shows = db.session.query(Show).order_by(db.func.random()).limit(sample).all()
+      self.show_cursors = [encode_show_cursor(show) for show in shows]
+      self.places = db.session.query(Venue.city, Venue.state).distinct().limit(sample).all()
+      if not (self.venue_ids and self.artist_ids):
+        raise SystemExit('No venues or artists to benchmark against; run benchmarks/datagen.py first.')
+      self.serial = 0
+
+    def venue_id(self):
+      return self.rng.choice(self.venue_ids)
+
+    def artist_id(self):
+      return self.rng.choice(self.artist_ids)
+
+    def place(self):
+      return self.rng.choice(self.places)
+
+    def word(self):
+      return self.rng.choice(self.words)
+
+    def unique(self, prefix):
+      self.serial += 1
+      return f'{prefix} {datetime.utcnow():%H%M%S%f} {self.serial}'
+
+
+class Scenario:
+
+    def __init__(self, name, method, path, data=None, writes=False, as_json=False):
+      self.name = name
+      self.method = method
+      self.path = path  # str, or callable(context) -> str
+      self.data = data  # None, or callable(context) -> form dict (JSON body with as_json)
+      self.writes = writes
+      self.as_json = as_json
+
+    def request(self, context):
+      path = self.path(context) if callable(self.path) else self.path
+      data = self.data(context) if self.data else None
+      return self.method, path, data, self.as_json
+
+
+def _venue_form(context):
+  return {
+    'name': context.unique('Bench Venue'), 'city': 'San Francisco', 'state': 'CA',
+    'address': '1 Bench St', 'phone': '415-555-0100', 'genres': context.rng.sample(GENRES, 2),
+    'facebook_link': 'https://www.facebook.com/bench', 'image_link': '', 'website_link': '',
+    'seeking_description': '',
+  }
+
+
+def _artist_form(context):
+  return {
+    'name': context.unique('Bench Artist'), 'city': 'San Francisco', 'state': 'CA',
+    'phone': '415-555-0100', 'genres': context.rng.sample(GENRES, 2),
+    'facebook_link': 'https://www.facebook.com/bench', 'image_link': '', 'website_link': '',
+    'seeking_description': '',
+  }
+
+
+def _show_form(context):
+  start = datetime(2030, 1, 1) + timedelta(hours=context.rng.randrange(24 * 365))
+  return {
+    'artist_id': context.artist_id(), 'venue_id': context.venue_id(),
+    'start_time': start.strftime('%Y-%m-%d %H:%M:%S'),
+  }
+
+
+def _batch(context, size=10):
+  # `size` new venues and artists, and as many phone number edits of existing
+  # ones (in id order, so concurrent batches lock rows in the same order).
+  return {
+    kind: {
+      'create': [form(context) for _ in range(size)],
+      'update': [
+        {'id': entity_id, 'phone': f'415-555-{context.rng.randrange(10000):04d}'}
+        for entity_id in sorted({sample(context) for _ in range(size)})
+      ],
+    }
+    for kind, form, sample in (('venues', _venue_form, Context.venue_id), ('artists', _artist_form, Context.artist_id))
+  }
+
+
+SCENARIOS = [
+  Scenario('home', 'GET', '/'),
+  Scenario('venues', 'GET', '/venues'),
+  Scenario('artists', 'GET', '/artists'),
+  Scenario('shows', 'GET', '/shows'),
+  Scenario('shows_page', 'GET', lambda c: f'/shows?after={c.rng.choice(c.show_cursors)}' if c.show_cursors else '/shows'),
+  Scenario('calendar', 'GET', '/shows/calendar'),
+  Scenario('calendar_city_json', 'GET', lambda c: '/shows/calendar.json?city={}&state={}'.format(*c.place())),
+  Scenario('calendar_genre_ics', 'GET', lambda c: f'/shows/calendar.ics?genre={c.rng.choice(GENRES)}'),
+  Scenario('venue_detail', 'GET', lambda c: f'/venues/{c.venue_id()}'),
+  Scenario('artist_detail', 'GET', lambda c: f'/artists/{c.artist_id()}'),
+  Scenario('search_venues', 'POST', '/venues/search', lambda c: {'search_term': c.word()}),
+  Scenario('search_artists', 'POST', '/artists/search', lambda c: {'search_term': c.word()}),
+  Scenario('autocomplete_venues', 'GET', lambda c: f'/venues/autocomplete?q={c.word()[:3]}'),
+  Scenario('autocomplete_artists', 'GET', lambda c: f'/artists/autocomplete?q={c.word()[:3]}'),
+  Scenario('create_venue', 'POST', '/venues/create', _venue_form, writes=True),
+  Scenario('create_artist', 'POST', '/artists/create', _artist_form, writes=True),
+  Scenario('create_show', 'POST', '/shows/create', _show_form, writes=True),
+  Scenario('batch', 'POST', '/batch', _batch, writes=True, as_json=True),
+]
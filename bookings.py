@@ -0,0 +1,159 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import and_, or_, select
+
+from models import db, Artist, Show, Venue, DEFAULT_SHOW_LENGTH, MAX_SHOW_LENGTH
+
+#----------------------------------------------------------------------------#
+# Booking conflicts.
+#----------------------------------------------------------------------------#
+
+# A venue hosts, and an artist plays, one show at a time: a proposed booking
+# conflicts with any show, or other proposed booking, that shares its venue or
+# its artist and overlaps it in time. Touching shows (one ending as the next
+# starts) don't overlap.
+#
+# Since no show is longer than MAX_SHOW_LENGTH, a show overlapping a booking
+# at a venue starts less than that before the booking and before it ends: one
+# range of the (venue_id, start_time) index, and likewise for its artist.
+# Checking a batch of bookings reads each venue's and artist's ranges, merged
+# where they overlap, as range scans ORed together (RANGES_PER_QUERY to a
+# query), so bookings months apart never read the schedule in between. The
+# bookings and those shows are then matched by a sweep over each venue's and
+# each artist's intervals in start order, in O(n log n) for the batch rather
+# than a query per booking.
+#
+# Writers pass lock=True, which locks the bookings' venue and artist rows (in
+# id order, venues first) until commit, so two transactions booking the same
+# venue or artist check and insert one after the other. SQLite ignores FOR
+# UPDATE; there concurrent writers are only kept apart by the database's
+# single write lock, which is taken at the insert, after the check. On
+# PostgreSQL with btree_gist, exclusion constraints on Show also enforce the
+# rule in the database (see the 2f8c6a1d9b34 migration).
+
+RANGES_PER_QUERY = 200
+
+
+def check_bookings(bookings, session=None, lock=False):
+  # For a list of bookings -- dicts with venue_id, artist_id, start_time and an
+  # optional end_time -- returns a list of the same length holding each one's
+  # conflicts, as dicts: {'on': 'venue' or 'artist', 'show_id': id} for an
+  # existing show or {'on': ..., 'booking': index} for another booking. With
+  # `lock`, the venues and artists stay locked until the caller commits.
+  session = session or db.session
+  conflicts = [[] for _ in bookings]
+  if not bookings:
+    return conflicts
+  if lock:
+    lock_owners(session, bookings)
+
+  intervals = defaultdict(list)
+  for index, booking in enumerate(bookings):
+    start, end = booking_times(booking)
+    intervals['venue', booking['venue_id']].append((start, end, 'booking', index))
+    intervals['artist', booking['artist_id']].append((start, end, 'booking', index))
+
+  seen = set()
+  for query in existing_shows_queries(bookings):
+    for show in session.execute(query):
+      # A show can fall in both a venue's and an artist's range.
+      if show.id in seen:
+        continue
+      seen.add(show.id)
+      for on, owner_id in (('venue', show.venue_id), ('artist', show.artist_id)):
+        if (on, owner_id) in intervals:
+          intervals[on, owner_id].append((show.start_time, show.end_time, 'show_id', show.id))
+
+  for (on, _), owner_intervals in intervals.items():
+    for (kind, key), (other_kind, other_key) in overlapping_pairs(owner_intervals):
+      if kind == 'booking':
+        conflicts[key].append({'on': on, other_kind: other_key})
+      if other_kind == 'booking':
+        conflicts[other_key].append({'on': on, kind: key})
+  return conflicts
+
+
+def parse_booking(data):
+  # A booking dict from JSON-style `data`: integer ids and ISO datetimes.
+  # Raises ValueError (or TypeError/KeyError for missing or mistyped fields).
+  booking = {
+    'venue_id': int(data['venue_id']),
+    'artist_id': int(data['artist_id']),
+    'start_time': datetime.fromisoformat(data['start_time']),
+    'end_time': datetime.fromisoformat(data['end_time']) if data.get('end_time') else None,
+  }
+  check_length(*booking_times(booking))
+  return booking
+
+
+def check_length(start, end):
+  if end <= start:
+    raise ValueError('A show must end after it starts.')
+  if end - start > MAX_SHOW_LENGTH:
+    raise ValueError(f'A show can last at most {MAX_SHOW_LENGTH}.')
+
+
+def booking_times(booking):
+  start = booking['start_time']
+  return start, booking.get('end_time') or start + DEFAULT_SHOW_LENGTH
+
+
+def lock_owners(session, bookings):
+  for model, key in ((Venue, 'venue_id'), (Artist, 'artist_id')):
+    session.execute(
+      select(model.id).where(model.id.in_(sorted({booking[key] for booking in bookings})))
+        .order_by(model.id).with_for_update()
+    ).all()
+
+
+def existing_shows_queries(bookings, per_query=RANGES_PER_QUERY):
+  # Statements for the shows that could overlap any of `bookings`, at most
+  # `per_query` ranges each; a show may be returned by more than one.
+  ranges = owner_ranges(bookings)
+  for start in range(0, len(ranges), per_query):
+    yield (
+      select(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)
+        .where(or_(*(
+          and_(column == owner_id, Show.start_time > earliest - MAX_SHOW_LENGTH, Show.start_time < latest,
+            Show.end_time > earliest)
+          for column, owner_id, earliest, latest in ranges[start:start + per_query]
+        )))
+    )
+
+
+def owner_ranges(bookings):
+  # (Show column, owner id, earliest start, latest end) for the bookings of
+  # each venue and artist, merged where the stretches of start_time they scan
+  # overlap.
+  times = defaultdict(list)
+  for booking in bookings:
+    start, end = booking_times(booking)
+    times[Show.venue_id, booking['venue_id']].append((start, end))
+    times[Show.artist_id, booking['artist_id']].append((start, end))
+  ranges = []
+  for (column, owner_id), owner_times in times.items():
+    merged = []
+    for start, end in sorted(owner_times):
+      if merged and start - MAX_SHOW_LENGTH < merged[-1][1]:
+        merged[-1][1] = max(merged[-1][1], end)
+      else:
+        merged.append([start, end])
+    ranges.extend((column, owner_id, start, end) for start, end in merged)
+  return ranges
+
+
+def overlapping_pairs(intervals):
+  # Yields ((kind, key), (kind, key)) for every overlapping pair among
+  # (start, end, kind, key) intervals, skipping pairs of existing shows. A heap
+  # keeps the intervals still open, by end, as they are swept in start order.
+  active = []
+  ordered = sorted(intervals, key=lambda interval: interval[:2])
+  for position, (start, end, kind, key) in enumerate(ordered):
+    while active and active[0][0] <= start:
+      heapq.heappop(active)
+    for _, _, other_kind, other_key in active:
+      if 'booking' in (kind, other_kind):
+        yield (kind, key), (other_kind, other_key)
+    heapq.heappush(active, (end, position, kind, key))
@@ -0,0 +1,248 @@
+import hashlib
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+
+from models import db, Artist, Show, Venue
+
+#----------------------------------------------------------------------------#
+# View cache.
+#----------------------------------------------------------------------------#
+
+# Page view-models (the dicts handed to render_template) are cached rather than
+# rendered HTML, since the layout embeds per-user flash messages.
+#
+# Every entry belongs to one or more namespaces, e.g. `venue:3` for the venue
+# page of venue 3, `venue:*` for every venue page, or `venues` for the
+# directory. Each namespace has a version token that is folded into the entry
+# keys, so invalidating a namespace is a single write of a new token; entries
+# under the old token are never read again and age out through TTL/LRU. A
+# missing token (never set, or evicted) is replaced by a fresh one, so an
+# eviction can only cause misses, never stale hits.
+#
+# Namespaces are invalidated when a session commits changes to a Venue, Artist
+# or Show. Bulk writes that bypass the ORM must call invalidate() themselves.
+# That only reaches other processes through a shared (redis) backend, so pages
+# also pass the data version their ETag is built from (one of the *_version()
+# queries in models), which is folded into the key: a page whose data changed
+# elsewhere, or whose shows moved from upcoming to past, misses however the
+# cache was invalidated.
+# Tokens carry the time of their invalidation: with replicas, a page loaded
+# within `settle_seconds` of it may predate the write and is served uncached.
+
+class MemoryBackend:
+    # An in-process dict with per-entry TTL and LRU eviction past max_entries.
+
+    def __init__(self, max_entries=2048):
+      self.max_entries = max_entries
+      self._entries = OrderedDict()
+      self._lock = threading.Lock()
+
+    def get_many(self, keys):
+      now = time.monotonic()
+      values = []
+      with self._lock:
+        for key in keys:
+          entry = self._entries.get(key)
+          if entry is None or (entry[1] is not None and entry[1] <= now):
+            self._entries.pop(key, None)
+            values.append(None)
+          else:
+            self._entries.move_to_end(key)
+            values.append(entry[0])
+      return values
+
+    def set(self, key, value, timeout=None):
+      expires = time.monotonic() + timeout if timeout else None
+      with self._lock:
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+          self._entries.popitem(last=False)
+
+    def delete(self, key):
+      with self._lock:
+        self._entries.pop(key, None)
+
+
+class RedisBackend:
+    # Shared between processes through any server speaking the Redis protocol.
+    # `client` is a redis-py style client (mget/set/delete), so a local
+    # stand-in such as fakeredis can take its place in tests. Eviction is left
+    # to the server's maxmemory policy.
+
+    def __init__(self, client, prefix='fyyur:'):
+      self.client = client
+      self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+      import redis
+      return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get_many(self, keys):
+      values = self.client.mget([self.prefix + key for key in keys])
+      return [None if value is None else pickle.loads(value) for value in values]
+
+    def set(self, key, value, timeout=None):
+      self.client.set(self.prefix + key, pickle.dumps(value), ex=timeout)
+
+    def delete(self, key):
+      self.client.delete(self.prefix + key)
+
+
+class ViewCache:
+
+    def __init__(self, app=None):
+      self.backend = None
+      self.timeout = None
+      self.settle_seconds = 0
+      self.hits = 0
+      self.misses = 0
+      self._stats_lock = threading.Lock()
+      if app is not None:
+        self.init_app(app)
+
+    def init_app(self, app):
+      backend = app.config.get('CACHE_BACKEND', 'memory')
+      if backend == 'memory':
+        self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 2048))
+      elif backend == 'redis':
+        self.backend = RedisBackend.from_url(app.config['CACHE_REDIS_URL'])
+      elif backend is None:
+        self.backend = None
+      else:
+        raise ValueError(f'Unknown CACHE_BACKEND: {backend!r}')
+      self.timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+      self.settle_seconds = app.config.get('CACHE_SETTLE_SECONDS', 0)
+
+      # db.session is shared by every app, so listen once however many apps
+      # are created; the listeners always use the latest backend.
+      if not event.contains(db.session, 'after_flush', self._collect_namespaces):
+        event.listen(db.session, 'after_flush', self._collect_namespaces)
+        event.listen(db.session, 'after_commit', self._invalidate_pending)
+        event.listen(db.session, 'after_rollback', self._discard_pending)
+      app.extensions['view_cache'] = self
+
+    def get_or_set(self, key, namespaces, loader, timeout=None, version=None):
+      # The cached value for `key` at data `version`, or loader()'s result,
+      # which is stored unless it is None.
+      if self.backend is None:
+        return loader()
+      versioned_key, versions, value = self._lookup(key, namespaces, version)
+      if value is None:
+        value = loader()
+        self._store(versioned_key, versions, value, timeout)
+      return value
+
+    async def get_or_set_async(self, key, namespaces, loader, timeout=None, version=None):
+      # get_or_set() for a coroutine function `loader`.
+      if self.backend is None:
+        return await loader()
+      versioned_key, versions, value = self._lookup(key, namespaces, version)
+      if value is None:
+        value = await loader()
+        self._store(versioned_key, versions, value, timeout)
+      return value
+
+    def invalidate(self, *namespaces):
+      if self.backend is None:
+        return
+      for namespace in namespaces:
+        self.backend.set(f'ns:{namespace}', _new_version(invalidated=True))
+
+    def stats(self):
+      with self._stats_lock:
+        lookups = self.hits + self.misses
+        return {
+          'backend': type(self.backend).__name__ if self.backend else None,
+          'hits': self.hits,
+          'misses': self.misses,
+          'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+    def _lookup(self, key, namespaces, version=None):
+      versions = self._versions(namespaces)
+      versioned_key = f'view:{key}@' + '.'.join(versions)
+      if version is not None:
+        versioned_key += '#' + hashlib.sha1(repr(version).encode()).hexdigest()[:16]
+      value = self.backend.get_many([versioned_key])[0]
+      with self._stats_lock:
+        if value is None:
+          self.misses += 1
+        else:
+          self.hits += 1
+      return versioned_key, versions, value
+
+    def _store(self, versioned_key, versions, value, timeout):
+      if value is not None and self._settled(versions):
+        self.backend.set(versioned_key, value, timeout or self.timeout)
+
+    def _versions(self, namespaces):
+      keys = [f'ns:{namespace}' for namespace in namespaces]
+      versions = self.backend.get_many(keys)
+      for i, version in enumerate(versions):
+        if version is None:
+          versions[i] = _new_version()
+          self.backend.set(keys[i], versions[i])
+      return versions
+
+    def _settled(self, versions):
+      if not self.settle_seconds:
+        return True
+      stamps = [version.rpartition('-')[2] for version in versions]
+      latest = max(int(stamp) if stamp.isdigit() else 0 for stamp in stamps)
+      return time.time() - latest >= self.settle_seconds
+
+    def _collect_namespaces(self, session, flush_context):
+      pending = session.info.setdefault('view_cache_namespaces', set())
+      for obj in (*session.new, *session.dirty, *session.deleted):
+        pending.update(affected_namespaces(obj))
+
+    def _invalidate_pending(self, session):
+      self.invalidate(*session.info.pop('view_cache_namespaces', ()))
+
+    def _discard_pending(self, session):
+      session.info.pop('view_cache_namespaces', None)
+
+
+def affected_namespaces(obj):
+  # The cache namespaces whose pages show data from `obj`.
+  if isinstance(obj, Show):
+    state = inspect(obj)
+    return show_namespaces(
+      {obj.venue_id, *state.attrs.venue_id.history.deleted},
+      {obj.artist_id, *state.attrs.artist_id.history.deleted},
+    )
+  if isinstance(obj, (Venue, Artist)):
+    return owner_namespaces(type(obj), obj.id)
+  return set()
+
+
+def owner_namespaces(model, owner_id):
+  # The namespaces of the venue or artist `owner_id`: its own pages and the
+  # listings, plus every page of the other side, whose shows name it.
+  if model is Venue:
+    return {'venues', 'shows', f'venue:{owner_id}', 'artist:*'}
+  return {'artists', 'shows', f'artist:{owner_id}', 'venue:*'}
+
+
+def show_namespaces(venue_ids, artist_ids):
+  # The namespaces of shows at `venue_ids` by `artist_ids`, counting the
+  # venues and artists they were moved away from.
+  return {
+    'venues', 'shows',
+    *(f'venue:{venue_id}' for venue_id in venue_ids),
+    *(f'artist:{artist_id}' for artist_id in artist_ids),
+  }
+
+
+def _new_version(invalidated=False):
+  return f'{uuid.uuid4().hex[:12]}-{int(time.time()) if invalidated else 0}'
+
+
+view_cache = ViewCache()
@@ -0,0 +1,148 @@
+import bisect
+import threading
+import time
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Connection pool.
+#----------------------------------------------------------------------------#
+
+# Engine and pool settings come from the DB_* config values (read from the
+# environment in config.py) and are turned into SQLALCHEMY_ENGINE_OPTIONS here.
+# The pool class times every checkout, which includes any wait for a free
+# connection, into a histogram; checkouts slower than DB_SLOW_CHECKOUT_MS are
+# logged. stats() reports that histogram along with the pool's live counts.
+
+# asgi.py's async engine takes the same settings through async_engine_options(),
+# with the matching asyncio driver; its pool isn't instrumented.
+
+# Upper bounds, in milliseconds, of the checkout time histogram buckets.
+CHECKOUT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class InstrumentedQueuePool(QueuePool):
+
+    def connect(self):
+      started = time.perf_counter()
+      try:
+        return super().connect()
+      finally:
+        pool_monitor.record(time.perf_counter() - started)
+
+
+class PoolMonitor:
+
+    def __init__(self, app=None):
+      self.slow_checkout = None
+      self.logger = None
+      self._lock = threading.Lock()
+      self.reset()
+      if app is not None:
+        self.init_app(app)
+
+    def init_app(self, app):
+      # Must run before the engine is first used, since Flask-SQLAlchemy reads
+      # SQLALCHEMY_ENGINE_OPTIONS when it creates the engine.
+      app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+      slow_ms = app.config.get('DB_SLOW_CHECKOUT_MS')
+      self.slow_checkout = slow_ms / 1000 if slow_ms else None
+      self.logger = app.logger
+      app.extensions['pool_monitor'] = self
+
+    def record(self, seconds):
+      with self._lock:
+        self.counts[bisect.bisect_left(CHECKOUT_BUCKETS, seconds * 1000)] += 1
+        self.checkouts += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+      if self.slow_checkout is not None and seconds >= self.slow_checkout:
+        self.logger.warning('Slow connection checkout: %.1f ms', seconds * 1000)
+
+    def reset(self):
+      with self._lock:
+        self.counts = [0] * (len(CHECKOUT_BUCKETS) + 1)
+        self.checkouts = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def stats(self, engine=None):
+      # Live counts of the engine's pool (the app's engine by default, which
+      # needs an app context) and the checkout times recorded so far.
+      pool = (engine or db.engine).pool
+      with self._lock:
+        stats = {
+          'pool': type(pool).__name__,
+          'checkouts': self.checkouts,
+          'checkout_ms_avg': self.total_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+          'checkout_ms_max': self.max_seconds * 1000,
+          'checkout_ms_histogram': {
+            **{f'le_{bound}': count for bound, count in zip(CHECKOUT_BUCKETS, self.counts)},
+            'inf': self.counts[-1],
+          },
+        }
+      if isinstance(pool, QueuePool):
+        stats.update({
+          'size': pool.size(),
+          'checked_out': pool.checkedout(),
+          'checked_in': pool.checkedin(),
+          'overflow': max(pool.overflow(), 0),
+          'max_overflow': pool._max_overflow,
+        })
+      return stats
+
+
+def engine_options(config):
+  # SQLALCHEMY_ENGINE_OPTIONS for the configured database. SQLite keeps
+  # SQLAlchemy's default pool, which doesn't take the sizing options.
+  url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+  if url.get_backend_name() == 'sqlite':
+    return {}
+  options = {
+    'poolclass': InstrumentedQueuePool,
+    'pool_size': config.get('DB_POOL_SIZE', 5),
+    'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+    'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+    'pool_recycle': config.get('DB_POOL_RECYCLE', -1),
+    'pool_pre_ping': config.get('DB_POOL_PRE_PING', False),
+  }
+  timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+  if timeout and url.get_backend_name() == 'postgresql':
+    options['connect_args'] = {'options': f'-c statement_timeout={int(timeout)}'}
+  return options
+
+
+def dispose_engines(app):
+  # Drops the pooled connections of every engine (binds included) without
+  # closing them, for a forked worker: the sockets belong to the parent.
+  with app.app_context():
+    for bind in [None, *(app.config.get('SQLALCHEMY_BINDS') or {})]:
+      db.get_engine(app, bind=bind).dispose(close=False)
+
+
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'sqlite': 'aiosqlite'}
+
+
+def async_database_url(config):
+  # SQLALCHEMY_DATABASE_URI with its driver swapped for the asyncio one.
+  url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+  backend = url.get_backend_name()
+  if backend not in ASYNC_DRIVERS:
+    raise ValueError(f'No asyncio driver configured for {backend!r} databases')
+  return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def async_engine_options(config):
+  # create_async_engine() options matching engine_options().
+  options = engine_options(config)
+  options.pop('poolclass', None)
+  if 'connect_args' in options:
+    timeout = config['DB_STATEMENT_TIMEOUT_MS']
+    options['connect_args'] = {'server_settings': {'statement_timeout': str(int(timeout))}}
+  return options
+
+
+pool_monitor = PoolMonitor()
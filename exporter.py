@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from models import db, Artist, Show, Venue, genre_names
+
+#----------------------------------------------------------------------------#
+# Bulk export.
+#----------------------------------------------------------------------------#
+
+# Rows are read through a server-side cursor, `yield_per` at a time, and
+# serialized into a stream of chunks. The CLI writes that stream to a file and
+# the HTTP endpoint returns it as a streamed Response, so memory stays flat
+# however large the tables are. The output uses the column names and the
+# CSV conventions (';'-separated genres) that `flask import-data` reads.
+
+COLUMNS = {
+  'venues': [
+    Venue.id, Venue.name, genre_names(Venue).label('genres'), Venue.address, Venue.city, Venue.state,
+    Venue.phone, Venue.website, Venue.facebook_link, Venue.seeking_talent,
+    Venue.seeking_description, Venue.image_link, Venue.updated_at,
+  ],
+  'artists': [
+    Artist.id, Artist.name, genre_names(Artist).label('genres'), Artist.city, Artist.state,
+    Artist.phone, Artist.website, Artist.facebook_link, Artist.seeking_venue,
+    Artist.seeking_description, Artist.image_link, Artist.updated_at,
+  ],
+  'shows': [
+    Show.id, Show.artist_id, Show.venue_id, Show.start_time, Show.end_time, Show.updated_at,
+  ],
+}
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CHUNK_SIZE = 64 * 1024
+
+
+def export_chunks(kind, format='ndjson', start=None, end=None, compress=False, yield_per=1000):
+  # The export of `kind` as an iterator of bytes chunks. `start`/`end` bound
+  # Show.start_time (start inclusive, end exclusive) when exporting shows.
+  rows = export_rows(kind, start, end, yield_per)
+  names = [column.key for column in COLUMNS[kind]]
+  lines = csv_lines(rows, names) if format == 'csv' else ndjson_lines(rows)
+  chunks = buffered_chunks(lines)
+  return gzip_chunks(chunks) if compress else chunks
+
+
+def export_rows(kind, start=None, end=None, yield_per=1000):
+  statement = select(*COLUMNS[kind]).order_by(COLUMNS[kind][0])
+  if kind == 'shows':
+    if start is not None:
+      statement = statement.where(Show.start_time >= start)
+    if end is not None:
+      statement = statement.where(Show.start_time < end)
+  result = db.session.execute(statement, execution_options={'stream_results': True})
+  for row in result.yield_per(yield_per):
+    row = row._asdict()
+    if 'genres' in row:
+      row['genres'] = row['genres'].split(';') if row['genres'] else []
+    yield row
+
+
+def ndjson_lines(rows):
+  for row in rows:
+    yield json.dumps(row, default=_json_default) + '\n'
+
+
+def csv_lines(rows, names):
+  buffer = io.StringIO()
+  writer = csv.DictWriter(buffer, fieldnames=names)
+  writer.writeheader()
+  for row in rows:
+    if isinstance(row.get('genres'), list):
+      row['genres'] = ';'.join(row['genres'])
+    writer.writerow(row)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+  yield buffer.getvalue()
+
+
+def gzip_chunks(chunks):
+  compressor = zlib.compressobj(wbits=31)
+  for chunk in chunks:
+    data = compressor.compress(chunk)
+    if data:
+      yield data
+  yield compressor.flush()
+
+
+def buffered_chunks(lines, size=CHUNK_SIZE):
+  # Joins lines into chunks of roughly `size` bytes, so the WSGI server and
+  # the compressor aren't handed one tiny write per row.
+  parts, length = [], 0
+  for line in lines:
+    parts.append(line)
+    length += len(line)
+    if length >= size:
+      yield ''.join(parts).encode()
+      parts, length = [], 0
+  if parts:
+    yield ''.join(parts).encode()
+
+
+def _json_default(value):
+  if isinstance(value, (date, datetime)):
+    return value.isoformat()
+  raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def parse_date(value):
+  # Accepts a date or a datetime in ISO format; None passes through.
+  return None if value is None else datetime.fromisoformat(value)
+
+
+#----------------------------------------------------------------------------#
+# Command.
+#----------------------------------------------------------------------------#
+
+@click.command('export-data')
+@click.argument('kind', type=click.Choice(sorted(COLUMNS)))
+@click.option('--format', default='ndjson', show_default=True, type=click.Choice(sorted(FORMATS)))
+@click.option('--start', help='Only shows starting at or after this ISO date/time.')
+@click.option('--end', help='Only shows starting before this ISO date/time.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--output', type=click.File('wb'), default='-', help='Defaults to stdout.')
+@with_appcontext
+def export_data_command(kind, format, start, end, compress, output):
+  """Stream all venues, artists or shows out as NDJSON or CSV."""
+  try:
+    start, end = parse_date(start), parse_date(end)
+  except ValueError as e:
+    raise click.BadParameter(str(e))
+  for chunk in export_chunks(kind, format, start, end, compress):
+    output.write(chunk)
@@ -0,0 +1,65 @@
+import functools
+from datetime import datetime
+
+#----------------------------------------------------------------------------#
+# Filters.
+#----------------------------------------------------------------------------#
+
+# Names the app gives its own patterns; Babel's other named formats ('short',
+# 'long') keep the locale's, and anything else is taken as a pattern.
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+LOCALE_FORMATS = ('short', 'medium', 'long', 'full')
+
+
+def format_datetime(value, format='medium', locale='en'):
+  # Jinja `datetime` filter. Takes datetime objects directly; strings are
+  # still accepted and parsed, but that is the slow path.
+  if not isinstance(value, datetime):
+    value = _parse_datetime(value)
+  return _format(value, format, locale)
+
+
+def format_datetimes(values, format='medium', locale='en'):
+  # Formats a whole column of datetimes, e.g. for exports or feeds; the
+  # pattern is resolved once and repeated values are formatted once.
+  pattern, locale = _compile(format, locale)
+  formatted = {}
+  results = []
+  for value in values:
+    if not isinstance(value, datetime):
+      value = _parse_datetime(value)
+    if value not in formatted:
+      formatted[value] = pattern.apply(value, locale)
+    results.append(formatted[value])
+  return results
+
+
+@functools.lru_cache(maxsize=4096)
+def _format(value, format, locale):
+  # Listings repeat start times heavily, so recent results are memoized.
+  pattern, locale = _compile(format, locale)
+  return pattern.apply(value, locale)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(format, locale):
+  # Babel is imported here, on the first format, rather than at startup.
+  from babel.core import Locale
+  from babel.dates import get_date_format, get_datetime_format, get_time_format, parse_pattern
+  locale = Locale.parse(locale)
+  pattern = DATETIME_FORMATS.get(format, format)
+  if pattern in LOCALE_FORMATS:
+    pattern = (
+      get_datetime_format(pattern, locale)
+        .replace('{0}', get_time_format(pattern, locale).pattern)
+        .replace('{1}', get_date_format(pattern, locale).pattern)
+    )
+  return parse_pattern(pattern), locale
+
+
+def _parse_datetime(value):
+  import dateutil.parser
+  return dateutil.parser.parse(value)
@@ -0,0 +1,61 @@
+import gc
+import multiprocessing
+import os
+
+#----------------------------------------------------------------------------#
+# Gunicorn.
+#----------------------------------------------------------------------------#
+
+# Production serving: `gunicorn wsgi:app` picks this file up from the working
+# directory. Settings read the environment, so the same file serves Heroku
+# (PORT, WEB_CONCURRENCY) and other hosts.
+#
+# The app is imported once, in the master, and workers are forked from it: a
+# worker starts without repeating any import, and shares the master's memory
+# until it writes to it (gc.freeze() keeps the garbage collector from doing
+# so). The master never queries the database, but post_fork still drops any
+# pooled connection a worker inherited, since a socket must not be shared.
+#
+# `kill -HUP <master pid>` rereads this file and the environment and replaces
+# the workers gracefully: old ones finish their requests (up to
+# graceful_timeout) while new ones take over. The app stays preloaded, so
+# deploying new code takes `kill -USR2` (a new master running the new code
+# starts alongside) followed by `kill -TERM` of the old master.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+wsgi_app = 'wsgi:app'
+preload_app = True
+
+# Each worker has its own pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections;
+# keep workers x that under the database's connection limit.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then to bound memory growth; the jitter keeps them
+# from all restarting at once.
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = '-'
+
+
+def on_starting(server):
+  # Each worker would have its own memory cache, which other workers' and the
+  # clock process's writes never invalidate.
+  from config import CACHE_BACKEND
+  if server.cfg.workers > 1 and CACHE_BACKEND == 'memory':
+    raise RuntimeError(
+      f'{server.cfg.workers} workers need a shared view cache: set CACHE_REDIS_URL, or CACHE_BACKEND=none.'
+    )
+
+
+def when_ready(server):
+  gc.freeze()
+
+
+def post_fork(server, worker):
+  from dbpool import dispose_engines
+  dispose_engines(server.app.wsgi())
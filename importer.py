@@ -0,0 +1,402 @@
+import csv
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import String, or_
+from sqlalchemy.exc import DBAPIError
+from wtforms.validators import URL, ValidationError
+
+from bookings import check_bookings, check_length
+from cache import view_cache
+from forms import genre_choices, state_choices
+from models import db, Artist, Genre, Show, Venue, DEFAULT_SHOW_LENGTH, count_shows, genre_links
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+
+# Rows are streamed from CSV or NDJSON and checked by validators applying the
+# VenueForm/ArtistForm/ShowForm rules. Valid rows are inserted a batch at a
+# time, with one executemany (plus one for their genre links) and one commit
+# per batch. Shows name their artist
+# and venue by id or by name, resolved through maps loaded once up front, and
+# are checked for booking conflicts a batch at a time (see bookings.py). Rows
+# failing validation, conflicting, or refused by the database, are reported
+# through `on_reject` and the import carries on.
+#
+# Columns are the model's column names (website_link is accepted for website).
+# In CSV, genres are separated by ';' and booleans are true/false, yes/no or
+# 1/0.
+
+STATES = {value for value, _ in state_choices}
+GENRES = {value for value, _ in genre_choices}
+TRUE_VALUES = {'true', 'yes', 'y', 'on', '1'}
+FALSE_VALUES = {'false', 'no', 'n', 'off', '0', ''}
+
+
+class Rejected(Exception):
+    # args[0] is the list of error messages for the row
+    pass
+
+
+def import_file(kind, path, format=None, batch_size=1000, on_reject=None):
+  # Imports one file of `kind` ('venues', 'artists' or 'shows') and returns
+  # (imported, rejected) counts. on_reject(line, errors, row) is called for
+  # every rejected row.
+  importer = IMPORTERS[kind]()
+  # Batches that fail are rolled back and retried row by row, so the genres
+  # the importer added must not go with them.
+  db.session.commit()
+  on_reject = on_reject or (lambda line, errors, row: None)
+  imported = rejected = 0
+  batch = []
+
+  def flush():
+    nonlocal imported, rejected
+    failures = importer.insert(batch)
+    for line, errors, row in failures:
+      on_reject(line, errors, row)
+    imported += len(batch) - len(failures)
+    rejected += len(failures)
+    batch.clear()
+
+  for line, row, error in read_rows(path, format):
+    try:
+      if error:
+        raise Rejected([error])
+      batch.append((line, importer.validate(row), row))
+    except Rejected as e:
+      rejected += 1
+      on_reject(line, e.args[0], row)
+    if len(batch) >= batch_size:
+      flush()
+  if batch:
+    flush()
+
+  view_cache.invalidate(*importer.namespaces)
+  return imported, rejected
+
+
+def read_rows(path, format=None):
+  # Yields (line number, row, parse error) without reading the whole file.
+  format = format or ('csv' if path.endswith('.csv') else 'ndjson')
+  with open(path, newline='', encoding='utf-8') as f:
+    if format == 'csv':
+      reader = csv.DictReader(f)
+      for row in reader:
+        yield reader.line_num, row, None
+    elif format == 'ndjson':
+      for line, text in enumerate(f, 1):
+        if not text.strip():
+          continue
+        try:
+          row = json.loads(text)
+        except ValueError as e:
+          yield line, None, f'Invalid JSON: {e}'
+          continue
+        if isinstance(row, dict):
+          yield line, row, None
+        else:
+          yield line, row, 'Expected a JSON object.'
+    else:
+      raise ValueError(f'Unknown import format: {format!r}')
+
+
+#----------------------------------------------------------------------------#
+# Importers.
+#----------------------------------------------------------------------------#
+
+class _Importer:
+    model = None
+    namespaces = ()
+
+    def insert(self, batch):
+      # Inserts a batch of (line, values, row) in one executemany. If the
+      # database refuses the batch, rows are retried one at a time so only the
+      # offending ones are rejected. Returns the (line, errors, row) rejects.
+      try:
+        self._execute(batch)
+        db.session.commit()
+        self.inserted(batch)
+        return []
+      except DBAPIError:
+        db.session.rollback()
+
+      failures, inserted = [], []
+      for line, values, row in batch:
+        try:
+          self._execute([(line, values, row)])
+          db.session.commit()
+          inserted.append((line, values, row))
+        except DBAPIError as e:
+          db.session.rollback()
+          failures.append((line, [str(e.orig).strip()], row))
+      self.inserted(inserted)
+      return failures
+
+    def inserted(self, batch):
+      pass
+
+    def insert_related(self, batch):
+      # Inserts rows that hang off the batch's rows, in the same transaction.
+      pass
+
+    def _execute(self, batch):
+      table = self.model.__table__
+      db.session.execute(table.insert(), [
+        {name: value for name, value in values.items() if name in table.c} for _, values, _ in batch
+      ])
+      self.insert_related(batch)
+
+    def _check_lengths(self, values, errors):
+      for name, value in values.items():
+        column = self.model.__table__.c.get(name)
+        if column is not None and isinstance(column.type, String) and column.type.length and isinstance(value, str) \
+            and len(value) > column.type.length:
+          errors.append(f'{name}: longer than {column.type.length} characters.')
+
+
+class _EntityImporter(_Importer):
+    # Shared rules for venues and artists; subclasses list their extra fields.
+    required = ('name', 'city', 'state')
+    facebook_link_required = False
+    optional = ('phone', 'image_link', 'website', 'seeking_description')
+    flag = None
+
+    def __init__(self, rows=None):
+      # With `rows`, only the names those rows could clash with are loaded.
+      names = db.session.query(self.model.name)
+      if rows is not None:
+        names = names.filter(self.model.name.in_(sorted({_text(row.get('name')) for row in rows} - {None})))
+      self.names = {name for name, in names}
+      # Missing genres are flushed, not committed: they belong to the
+      # caller's transaction.
+      self.genre_ids = {name: genre_id for genre_id, name in db.session.query(Genre.id, Genre.name)}
+      missing = [Genre(name=name) for name in sorted(GENRES.difference(self.genre_ids))]
+      if missing:
+        db.session.add_all(missing)
+        db.session.flush()
+        self.genre_ids.update((genre.name, genre.id) for genre in missing)
+
+    def insert_related(self, batch):
+      table, owner_id = genre_links(self.model)
+      names = [values['name'] for _, values, _ in batch]
+      ids = dict(db.session.query(self.model.name, self.model.id).filter(self.model.name.in_(names)))
+      links = [
+        {owner_id.key: ids[values['name']], 'genre_id': self.genre_ids[genre]}
+        for _, values, _ in batch for genre in values['genres']
+      ]
+      if links:
+        db.session.execute(table.insert(), links)
+
+    def validate(self, row):
+      errors = []
+      values = {field: _text(row.get(field)) for field in (*self.required, *self.optional)}
+      if not values['website'] and row.get('website_link'):
+        values['website'] = _text(row['website_link'])
+      for field in self.required:
+        if not values[field]:
+          errors.append(f'{field}: This field is required.')
+      if values['state'] and values['state'] not in STATES:
+        errors.append('state: Not a valid choice.')
+      if values['name'] in self.names:
+        errors.append(f'name: {values["name"]!r} already exists.')
+
+      values['genres'] = _genres(row.get('genres'))
+      if not values['genres']:
+        errors.append('genres: This field is required.')
+      elif not GENRES.issuperset(values['genres']):
+        errors.append('genres: Not a valid choice.')
+
+      values['facebook_link'] = _text(row.get('facebook_link'))
+      if values['facebook_link'] or self.facebook_link_required:
+        if not _is_url(values['facebook_link']):
+          errors.append('facebook_link: Invalid URL.')
+
+      try:
+        values[self.flag] = _flag(row.get(self.flag))
+      except ValueError:
+        errors.append(f'{self.flag}: Not a valid boolean.')
+
+      self._check_lengths(values, errors)
+      if errors:
+        raise Rejected(errors)
+      self.names.add(values['name'])
+      return values
+
+
+class VenueImporter(_EntityImporter):
+    model = Venue
+    required = ('name', 'city', 'state', 'address')
+    facebook_link_required = True
+    flag = 'seeking_talent'
+    namespaces = ('venues', 'shows', 'venue:*')
+
+
+class ArtistImporter(_EntityImporter):
+    model = Artist
+    flag = 'seeking_venue'
+    namespaces = ('artists', 'shows', 'artist:*')
+
+
+class ShowImporter(_Importer):
+    model = Show
+    namespaces = ('venues', 'shows', 'venue:*', 'artist:*')
+
+    def __init__(self, rows=None):
+      # With `rows`, only the venues and artists those rows name are loaded.
+      self.venues = {name: venue_id for venue_id, name in self._refs(Venue, 'venue', rows)}
+      self.artists = {name: artist_id for artist_id, name in self._refs(Artist, 'artist', rows)}
+      self.venue_ids = set(self.venues.values())
+      self.artist_ids = set(self.artists.values())
+
+    def validate(self, row):
+      errors = []
+      values = {
+        'venue_id': self._resolve(row, 'venue', self.venues, self.venue_ids, errors),
+        'artist_id': self._resolve(row, 'artist', self.artists, self.artist_ids, errors),
+        'start_time': None,
+      }
+      start_time, end_time = _text(row.get('start_time')), _text(row.get('end_time'))
+      if not start_time:
+        errors.append('start_time: This field is required.')
+      else:
+        try:
+          values['start_time'] = datetime.fromisoformat(start_time)
+        except ValueError:
+          errors.append('start_time: Not a valid datetime value.')
+      if end_time:
+        try:
+          values['end_time'] = datetime.fromisoformat(end_time)
+        except ValueError:
+          errors.append('end_time: Not a valid datetime value.')
+      if errors:
+        raise Rejected(errors)
+      # Every row of an executemany needs the same columns.
+      values['end_time'] = values.get('end_time') or values['start_time'] + DEFAULT_SHOW_LENGTH
+      try:
+        check_length(values['start_time'], values['end_time'])
+      except ValueError as e:
+        raise Rejected([f'end_time: {e}'])
+      return values
+
+    def insert(self, batch):
+      # Rows booking a venue or artist that is busy then, with an existing
+      # show or an earlier row, are rejected; the rest are inserted.
+      failures, accepted, accepted_indexes = [], [], set()
+      for index, conflicts in enumerate(check_bookings([values for _, values, _ in batch], lock=True)):
+        line, values, row = batch[index]
+        errors = [
+          f'start_time: The {conflict["on"]} is already booked then ' + (
+            f'(show {conflict["show_id"]}).' if 'show_id' in conflict else f'(line {batch[conflict["booking"]][0]}).'
+          )
+          for conflict in conflicts
+          if 'show_id' in conflict or conflict['booking'] in accepted_indexes
+        ]
+        if errors:
+          failures.append((line, errors, row))
+        else:
+          accepted.append(batch[index])
+          accepted_indexes.add(index)
+      return failures + (super().insert(accepted) if accepted else [])
+
+    def insert_related(self, batch):
+      # The executemany bypasses the ORM, so count the shows here.
+      count_shows(db.session, added=[
+        (values['venue_id'], values['artist_id'], values['start_time']) for _, values, _ in batch
+      ])
+
+    @staticmethod
+    def _refs(model, kind, rows):
+      query = db.session.query(model.id, model.name)
+      if rows is None:
+        return query
+      ids, names = set(), set()
+      for row in rows:
+        ref_id, name = _text(row.get(f'{kind}_id')), _text(row.get(f'{kind}_name'))
+        if ref_id and ref_id.isdigit():
+          ids.add(int(ref_id))
+        elif name:
+          names.add(name)
+      return query.filter(or_(model.id.in_(sorted(ids)), model.name.in_(sorted(names))))
+
+    @staticmethod
+    def _resolve(row, kind, by_name, ids, errors):
+      # `<kind>_id` wins over `<kind>_name` when a row has both.
+      ref_id, name = _text(row.get(f'{kind}_id')), _text(row.get(f'{kind}_name'))
+      if ref_id:
+        try:
+          if int(ref_id) in ids:
+            return int(ref_id)
+        except ValueError:
+          pass
+        errors.append(f'{kind}_id: No {kind} with id {ref_id!r}.')
+      elif name:
+        if name in by_name:
+          return by_name[name]
+        errors.append(f'{kind}_name: No {kind} named {name!r}.')
+      else:
+        errors.append(f'{kind}_id: This field is required.')
+      return None
+
+
+IMPORTERS = {'venues': VenueImporter, 'artists': ArtistImporter, 'shows': ShowImporter}
+
+
+def _text(value):
+  if value is None:
+    return None
+  return str(value).strip() or None
+
+
+def _genres(value):
+  if not isinstance(value, list):
+    value = (value or '').split(';')
+  return list(dict.fromkeys(str(genre).strip() for genre in value if str(genre).strip()))
+
+
+def _flag(value):
+  if isinstance(value, bool) or value is None:
+    return bool(value)
+  text = str(value).strip().lower()
+  if text in TRUE_VALUES:
+    return True
+  if text in FALSE_VALUES:
+    return False
+  raise ValueError(value)
+
+
+_url = URL()
+
+def _is_url(value):
+  try:
+    _url(None, SimpleNamespace(data=value or '', gettext=lambda message: message))
+    return True
+  except ValidationError:
+    return False
+
+
+#----------------------------------------------------------------------------#
+# Command.
+#----------------------------------------------------------------------------#
+
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per insert and commit.')
+@click.option('--rejects', type=click.File('w'), help='Write rejected rows here as NDJSON.')
+@with_appcontext
+def import_data_command(kind, path, format, batch_size, rejects):
+  """Bulk import venues, artists or shows from a CSV or NDJSON file."""
+  def on_reject(line, errors, row):
+    if rejects:
+      rejects.write(json.dumps({'line': line, 'errors': errors, 'row': row}, default=str) + '\n')
+    else:
+      click.echo(f'line {line}: ' + '; '.join(errors), err=True)
+
+  imported, rejected = import_file(kind, path, format, batch_size, on_reject)
+  click.echo(f'Imported {imported} {kind}, rejected {rejected}.')
@@ -0,0 +1,51 @@
+import click
+from werkzeug.utils import cached_property, import_string
+
+#----------------------------------------------------------------------------#
+# Lazy loading.
+#----------------------------------------------------------------------------#
+
+# Stand-ins that let create_app() register views and CLI commands by dotted
+# name, importing their modules (and whatever those pull in) only when a
+# request or command first needs them.
+
+class LazyView:
+    # A view function or error handler imported from `import_name` on its
+    # first call.
+
+    def __init__(self, import_name):
+      self.import_name = import_name
+      self.__name__ = import_name.rpartition('.')[2]
+
+    @cached_property
+    def view(self):
+      return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+      return self.view(*args, **kwargs)
+
+
+class LazyCommand(click.Command):
+    # A click command imported from `import_name` when it is run or asked
+    # for its usage; until then only `help` (shown in `flask --help`) is known.
+
+    def __init__(self, name, import_name, help=None):
+      super().__init__(name, help=help)
+      self.import_name = import_name
+
+    @cached_property
+    def command(self):
+      return import_string(self.import_name)
+
+    def make_context(self, info_name, args, parent=None, **extra):
+      return self.command.make_context(info_name, args, parent=parent, **extra)
+
+
+def preload(app):
+  # Imports every lazy view and error handler of `app` now, for servers that
+  # load the app once and fork workers from it.
+  handlers = [handler for spec in app.error_handler_spec.values()
+              for by_class in spec.values() for handler in by_class.values()]
+  for view in list(app.view_functions.values()) + handlers:
+    if isinstance(view, LazyView):
+      view.view
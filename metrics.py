@@ -0,0 +1,273 @@
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import Response, before_render_template, g, request, signals_available, template_rendered
+
+from cache import view_cache
+from dbpool import pool_monitor
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#----------------------------------------------------------------------------#
+
+# Request, template and database timings are collected per process and served
+# in the Prometheus text format from /metrics.
+#
+# Under a multi-process server every worker has its own counters, and a scrape
+# only reaches one of them. With METRICS_DIR set, each process writes its
+# counters to METRICS_DIR/metrics-<pid>.json (atomically, at most every
+# METRICS_FLUSH_SECONDS, from a background thread) and /metrics merges every
+# file in the directory: counters and histograms are summed over all files,
+# gauges over the files of processes that are still running. Clear the
+# directory when the server (re)starts. Without METRICS_DIR, /metrics reports
+# the serving process only.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS = {
+  'fyyur_http_requests_total': ('counter', 'Requests handled, by route, method and status.'),
+  'fyyur_http_request_duration_seconds': ('histogram', 'Request handling time, by route.'),
+  'fyyur_http_requests_in_flight': ('gauge', 'Requests being handled.'),
+  'fyyur_template_render_seconds': ('histogram', 'Template render time, by template.'),
+  'fyyur_db_queries_total': ('counter', 'SQL statements executed, by route.'),
+  'fyyur_db_duration_seconds': ('histogram', 'SQL time per request, by route.'),
+  'fyyur_view_cache_hits_total': ('counter', 'View cache hits.'),
+  'fyyur_view_cache_misses_total': ('counter', 'View cache misses.'),
+  'fyyur_db_pool_checked_out': ('gauge', 'Connections checked out of the pool.'),
+  'fyyur_db_pool_overflow': ('gauge', 'Connections open beyond the pool size.'),
+}
+
+
+class Registry:
+    # Counters, gauges and histograms of one process, keyed by
+    # (name, sorted label pairs).
+
+    def __init__(self):
+      self._lock = threading.Lock()
+      self.counters = {}
+      self.gauges = {}
+      self.histograms = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def inc(self, name, labels=None, value=1):
+      key = _key(name, labels)
+      with self._lock:
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, labels=None, value=0):
+      with self._lock:
+        self.gauges[_key(name, labels)] = value
+
+    def set_total(self, name, labels=None, value=0):
+      # For counters kept elsewhere and copied in.
+      with self._lock:
+        self.counters[_key(name, labels)] = value
+
+    def add(self, name, labels=None, value=1):
+      key = _key(name, labels)
+      with self._lock:
+        self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+      key = _key(name, labels)
+      with self._lock:
+        counts = self.histograms.get(key)
+        if counts is None:
+          counts = self.histograms[key] = [0] * (len(DURATION_BUCKETS) + 2)
+        i = 0
+        while i < len(DURATION_BUCKETS) and value > DURATION_BUCKETS[i]:
+          i += 1
+        counts[i] += 1
+        counts[-1] += value
+
+    def snapshot(self):
+      with self._lock:
+        return {
+          'counters': [[*key, value] for key, value in self.counters.items()],
+          'gauges': [[*key, value] for key, value in self.gauges.items()],
+          'histograms': [[*key, list(counts)] for key, counts in self.histograms.items()],
+        }
+
+
+class Metrics:
+
+    def __init__(self, app=None):
+      self.registry = Registry()
+      self.app = None
+      self.directory = None
+      self.flush_seconds = 1.0
+      self._writer_pid = None
+      if app is not None:
+        self.init_app(app)
+
+    def init_app(self, app):
+      self.app = app
+      self.directory = app.config.get('METRICS_DIR')
+      self.flush_seconds = app.config.get('METRICS_FLUSH_SECONDS', 1.0)
+      if self.directory:
+        os.makedirs(self.directory, exist_ok=True)
+
+      app.before_request(self._start)
+      app.after_request(self._finish)
+      app.teardown_request(self._teardown)
+      if signals_available:
+        before_render_template.connect(self._template_started, app)
+        template_rendered.connect(self._template_finished, app)
+      app.add_url_rule('/metrics', 'metrics', self.view)
+      app.extensions['metrics'] = self
+
+    def view(self):
+      self._collect()
+      snapshots = [self.registry.snapshot()]
+      if self.directory:
+        self.flush()
+        snapshots = list(self._read_snapshots())
+      return Response(render(snapshots), mimetype='text/plain; version=0.0.4')
+
+    def flush(self):
+      # Writes this process's snapshot to its file, replacing it atomically
+      # so a concurrent scrape never reads half a file.
+      self._collect()
+      path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+      with open(path + '.tmp', 'w') as f:
+        json.dump(self.registry.snapshot(), f)
+      os.replace(path + '.tmp', path)
+
+    def _start(self):
+      self._ensure_writer()
+      g.metrics_started = time.perf_counter()
+      g.metrics_endpoint = _endpoint()
+      self.registry.add('fyyur_http_requests_in_flight')
+
+    def _finish(self, response):
+      started = g.get('metrics_started')
+      if started is None:
+        return response
+      endpoint = g.metrics_endpoint
+      self.registry.inc('fyyur_http_requests_total', {
+        'endpoint': endpoint, 'method': request.method, 'status': str(response.status_code),
+      })
+      self.registry.observe('fyyur_http_request_duration_seconds', {'endpoint': endpoint},
+        time.perf_counter() - started)
+      stats = g.get('query_stats')
+      if stats is not None:
+        self.registry.inc('fyyur_db_queries_total', {'endpoint': endpoint}, stats.count)
+        self.registry.observe('fyyur_db_duration_seconds', {'endpoint': endpoint}, stats.seconds)
+      return response
+
+    def _teardown(self, exc):
+      # Runs even when the view raised, so the gauge can't drift upwards.
+      if g.pop('metrics_started', None) is not None:
+        self.registry.add('fyyur_http_requests_in_flight', value=-1)
+
+    def _template_started(self, sender, template, context, **extra):
+      g.setdefault('metrics_templates', []).append(time.perf_counter())
+
+    def _template_finished(self, sender, template, context, **extra):
+      started = g.get('metrics_templates')
+      if started:
+        self.registry.observe('fyyur_template_render_seconds', {'template': template.name or '<string>'},
+          time.perf_counter() - started.pop())
+
+    def _collect(self):
+      # Copies the view cache and pool statistics of this process into the
+      # registry.
+      self.registry.set_total('fyyur_view_cache_hits_total', None, view_cache.hits)
+      self.registry.set_total('fyyur_view_cache_misses_total', None, view_cache.misses)
+      with self.app.app_context():
+        pool = pool_monitor.stats()
+      self.registry.set('fyyur_db_pool_checked_out', None, pool.get('checked_out', 0))
+      self.registry.set('fyyur_db_pool_overflow', None, pool.get('overflow', 0))
+
+    def _ensure_writer(self):
+      # One flushing thread per process; checked per request because forked
+      # workers don't inherit the parent's threads.
+      if not self.directory or self._writer_pid == os.getpid():
+        return
+      self._writer_pid = os.getpid()
+      threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True).start()
+
+    def _write_loop(self):
+      while True:
+        time.sleep(self.flush_seconds)
+        try:
+          self.flush()
+        except Exception:
+          self.app.logger.exception('Failed to write metrics')
+
+    def _read_snapshots(self):
+      for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+        try:
+          with open(path) as f:
+            snapshot = json.load(f)
+        except (OSError, ValueError):
+          continue
+        pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+        if not _running(pid):
+          snapshot['gauges'] = []
+        yield snapshot
+
+
+def render(snapshots):
+  # Merges process snapshots and renders them in the Prometheus text format.
+  values, histograms = {}, {}
+  for snapshot in snapshots:
+    for name, labels, value in snapshot['counters'] + snapshot['gauges']:
+      key = (name, tuple(map(tuple, labels)))
+      values[key] = values.get(key, 0) + value
+    for name, labels, counts in snapshot['histograms']:
+      key = (name, tuple(map(tuple, labels)))
+      merged = histograms.setdefault(key, [0] * len(counts))
+      for i, count in enumerate(counts):
+        merged[i] += count
+
+  lines = []
+  for name, (kind, help) in METRICS.items():
+    lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+    for (metric, labels), value in sorted(values.items()):
+      if metric == name:
+        lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    for (metric, labels), counts in sorted(histograms.items()):
+      if metric == name:
+        cumulative = 0
+        for bound, count in zip((*DURATION_BUCKETS, '+Inf'), counts):
+          cumulative += count
+          lines.append(f'{name}_bucket{_labels((*labels, ("le", str(bound))))} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {_number(counts[-1])}')
+        lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+  return '\n'.join(lines) + '\n'
+
+
+def _key(name, labels):
+  return name, tuple(sorted((labels or {}).items()))
+
+
+def _endpoint():
+  # The route's endpoint rather than the path, to keep label values bounded.
+  return request.url_rule.endpoint if request.url_rule else 'unmatched'
+
+
+def _labels(labels):
+  if not labels:
+    return ''
+  escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+  return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels) + '}'
+
+
+def _number(value):
+  return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _running(pid):
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except PermissionError:
+    pass
+  return True
+
+
+metrics = Metrics()
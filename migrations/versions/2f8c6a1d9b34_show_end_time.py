@@ -0,0 +1,59 @@
+"""Add Show.end_time and keep venues and artists from being double-booked.
+
+Revision ID: 2f8c6a1d9b34
+Revises: 9e3d1f6b7a25
+Create Date: 2026-10-18 19:12:40.284716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8c6a1d9b34'
+down_revision = '9e3d1f6b7a25'
+branch_labels = None
+depends_on = None
+
+# (constraint name, Show column that may not be double-booked)
+EXCLUSIONS = [
+    ('ex_Show_venue_id_during', 'venue_id'),
+    ('ex_Show_artist_id_during', 'artist_id'),
+]
+
+
+def upgrade():
+    # Existing shows get the models' DEFAULT_SHOW_LENGTH of two hours.
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.execute('''UPDATE "Show" SET end_time = start_time + interval '2 hours' ''')
+    op.alter_column('Show', 'end_time', nullable=False)
+    op.create_check_constraint('ck_Show_end_after_start', 'Show', 'end_time > start_time')
+
+    # Exclusion constraints reject overlapping shows at one venue or by one
+    # artist, even from concurrent transactions. They need the btree_gist
+    # contrib extension (for `=` on integers in a GiST index) and existing
+    # shows without overlaps; otherwise they are skipped and bookings.py's
+    # checks are all there is.
+    bind = op.get_bind()
+    has_btree_gist = bind.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gist'"
+    )).scalar() is not None
+    if has_btree_gist:
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for name, column in EXCLUSIONS:
+            savepoint = bind.begin_nested()
+            try:
+                bind.execute(sa.text(f'''
+                    ALTER TABLE "Show" ADD CONSTRAINT "{name}"
+                    EXCLUDE USING gist ({column} WITH =, tsrange(start_time, end_time) WITH &&)
+                '''))
+                savepoint.commit()
+            except sa.exc.DBAPIError:
+                savepoint.rollback()
+
+
+def downgrade():
+    for name, _ in EXCLUSIONS:
+        op.execute(f'ALTER TABLE "Show" DROP CONSTRAINT IF EXISTS "{name}"')
+    op.drop_constraint('ck_Show_end_after_start', 'Show', type_='check')
+    op.drop_column('Show', 'end_time')
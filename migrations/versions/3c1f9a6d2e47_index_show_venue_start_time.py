@@ -0,0 +1,24 @@
+"""Index Show by venue and start time.
+
+Revision ID: 3c1f9a6d2e47
+Revises: 7890b65ff382
+Create Date: 2026-10-18 09:12:40.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a6d2e47'
+down_revision = '7890b65ff382'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
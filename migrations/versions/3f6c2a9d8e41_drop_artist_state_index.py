@@ -0,0 +1,26 @@
+"""Drop the unused Artist state index.
+
+Revision ID: 3f6c2a9d8e41
+Revises: 8a1c4e6f2b93
+Create Date: 2026-10-19 11:05:48.216630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6c2a9d8e41'
+down_revision = '8a1c4e6f2b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Added with the search indexes, but no query looks artists up by state
+    # and the model doesn't declare it, so autogenerate kept proposing to drop it.
+    op.drop_index('ix_Artist_state', table_name='Artist')
+
+
+def downgrade():
+    op.create_index('ix_Artist_state', 'Artist', ['state'], unique=False)
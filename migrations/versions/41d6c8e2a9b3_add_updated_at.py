@@ -0,0 +1,34 @@
+"""Add updated_at to Venue, Artist and Show.
+
+Revision ID: 41d6c8e2a9b3
+Revises: e7a90c4b1f28
+Create Date: 2026-10-18 14:05:31.662940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '41d6c8e2a9b3'
+down_revision = 'e7a90c4b1f28'
+branch_labels = None
+depends_on = None
+
+TABLES = ['Venue', 'Artist', 'Show']
+
+
+def upgrade():
+    # Existing rows are stamped with the migration time; from then on the
+    # models set the column on insert and bump it on every update.
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+                                       server_default=sa.text("timezone('utc', now())")))
+        op.alter_column(table, 'updated_at', server_default=None)
+        op.create_index(op.f(f'ix_{table}_updated_at'), table, ['updated_at'], unique=False)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_index(op.f(f'ix_{table}_updated_at'), table_name=table)
+        op.drop_column(table, 'updated_at')
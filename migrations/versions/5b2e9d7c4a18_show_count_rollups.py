@@ -0,0 +1,59 @@
+"""Add upcoming/past show count rollups to Venue and Artist.
+
+Revision ID: 5b2e9d7c4a18
+Revises: c3f5a8d91e02
+Create Date: 2026-10-18 18:02:11.530417
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e9d7c4a18'
+down_revision = 'c3f5a8d91e02'
+branch_labels = None
+depends_on = None
+
+# (owner table, Show column referencing it)
+OWNERS = [
+    ('Venue', 'venue_id'),
+    ('Artist', 'artist_id'),
+]
+
+
+def upgrade():
+    show_rollup = op.create_table('ShowRollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('past_before', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # The models compare start_time with the app server's local time.
+    now = datetime.now()
+    op.bulk_insert(show_rollup, [{'id': 1, 'past_before': now}])
+
+    for owner, owner_id in OWNERS:
+        op.add_column(owner, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(owner, sa.Column('past_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.get_bind().execute(sa.text(f'''
+            UPDATE "{owner}" AS o SET
+                upcoming_shows_count = counts.upcoming,
+                past_shows_count = counts.past
+            FROM (
+                SELECT {owner_id} AS id,
+                       count(*) FILTER (WHERE start_time >= :now) AS upcoming,
+                       count(*) FILTER (WHERE start_time < :now) AS past
+                FROM "Show"
+                GROUP BY {owner_id}
+            ) AS counts
+            WHERE counts.id = o.id
+        '''), {'now': now})
+
+
+def downgrade():
+    for owner, _ in reversed(OWNERS):
+        op.drop_column(owner, 'past_shows_count')
+        op.drop_column(owner, 'upcoming_shows_count')
+    op.drop_table('ShowRollup')
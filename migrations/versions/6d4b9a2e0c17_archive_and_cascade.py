@@ -0,0 +1,51 @@
+"""Delete shows with their venue or artist in SQL, and let both be archived.
+
+Revision ID: 6d4b9a2e0c17
+Revises: 2f8c6a1d9b34
+Create Date: 2026-10-18 21:04:52.618302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d4b9a2e0c17'
+down_revision = '2f8c6a1d9b34'
+branch_labels = None
+depends_on = None
+
+# (foreign key name, Show column, referenced table)
+SHOW_KEYS = [
+    ('Show_venue_id_fkey', 'venue_id', 'Venue'),
+    ('Show_artist_id_fkey', 'artist_id', 'Artist'),
+]
+
+
+def upgrade():
+    # Deleting a venue or artist deletes its shows in the same statement,
+    # through the (venue_id, start_time) and (artist_id, start_time) indexes.
+    for name, column, table in SHOW_KEYS:
+        op.drop_constraint(name, 'Show', type_='foreignkey')
+        op.create_foreign_key(name, 'Show', table, [column], ['id'], ondelete='CASCADE')
+
+    # Archived venues and artists are rare, so the listings' indexes cover live
+    # rows only and the archived ones get a small index of their own.
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('archived_at', sa.DateTime(), nullable=True))
+        op.create_index(
+            f'ix_{table}_archived_at', table, ['archived_at'],
+            postgresql_where=sa.text('archived_at IS NOT NULL'))
+    op.create_index(
+        'ix_Venue_live_state_city_name', 'Venue', ['state', 'city', 'name'],
+        postgresql_where=sa.text('archived_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_Venue_live_state_city_name', table_name='Venue')
+    for table in ('Venue', 'Artist'):
+        op.drop_index(f'ix_{table}_archived_at', table_name=table)
+        op.drop_column(table, 'archived_at')
+    for name, column, table in SHOW_KEYS:
+        op.drop_constraint(name, 'Show', type_='foreignkey')
+        op.create_foreign_key(name, 'Show', table, [column], ['id'])
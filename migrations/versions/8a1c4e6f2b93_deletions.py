@@ -0,0 +1,33 @@
+"""Count deletes in one row, for page versions.
+
+Revision ID: 8a1c4e6f2b93
+Revises: 6d4b9a2e0c17
+Create Date: 2026-10-19 10:12:33.507214
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a1c4e6f2b93'
+down_revision = '6d4b9a2e0c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Replaces the row counts in the listing pages' versions (see models.py).
+    deletions = op.create_table('Deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(deletions, [{'id': 1, 'count': 0, 'deleted_at': datetime.utcnow()}])
+
+
+def downgrade():
+    op.drop_table('Deletions')
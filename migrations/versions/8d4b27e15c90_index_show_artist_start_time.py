@@ -0,0 +1,24 @@
+"""Index Show by artist and start time.
+
+Revision ID: 8d4b27e15c90
+Revises: 3c1f9a6d2e47
+Create Date: 2026-10-18 10:03:17.224581
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4b27e15c90'
+down_revision = '3c1f9a6d2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
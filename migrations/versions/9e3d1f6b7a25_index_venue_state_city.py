@@ -0,0 +1,30 @@
+"""Index Venue by state and city for the show calendar.
+
+Revision ID: 9e3d1f6b7a25
+Revises: 5b2e9d7c4a18
+Create Date: 2026-10-18 18:40:27.815903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3d1f6b7a25'
+down_revision = '5b2e9d7c4a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Calendar queries narrowed to a place find its venues here, then each
+    # venue's shows in the window through ix_Show_venue_id_start_time. The
+    # (state, city) index also serves state-only lookups, so it replaces
+    # ix_Venue_state.
+    op.create_index('ix_Venue_state_city', 'Venue', ['state', 'city'], unique=False)
+    op.drop_index('ix_Venue_state', table_name='Venue')
+
+
+def downgrade():
+    op.create_index('ix_Venue_state', 'Venue', ['state'], unique=False)
+    op.drop_index('ix_Venue_state_city', table_name='Venue')
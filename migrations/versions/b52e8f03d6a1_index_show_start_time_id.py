@@ -0,0 +1,24 @@
+"""Index Show by start time and id for keyset pagination.
+
+Revision ID: b52e8f03d6a1
+Revises: 8d4b27e15c90
+Create Date: 2026-10-18 11:26:54.903117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52e8f03d6a1'
+down_revision = '8d4b27e15c90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
@@ -0,0 +1,79 @@
+"""Move genres from array columns into Genre and association tables.
+
+Revision ID: c3f5a8d91e02
+Revises: 41d6c8e2a9b3
+Create Date: 2026-10-18 15:22:47.108394
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f5a8d91e02'
+down_revision = '41d6c8e2a9b3'
+branch_labels = None
+depends_on = None
+
+# (association table, owner table, owner id column)
+LINKS = [
+    ('VenueGenre', 'Venue', 'venue_id'),
+    ('ArtistGenre', 'Artist', 'artist_id'),
+]
+
+
+def upgrade():
+    op.create_table('Genre',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    for link, owner, owner_id in LINKS:
+        op.create_table(link,
+            sa.Column(owner_id, sa.Integer(), nullable=False),
+            sa.Column('genre_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint([owner_id], [f'{owner}.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint(owner_id, 'genre_id')
+        )
+        op.create_index(f'ix_{link}_genre_id_{owner_id}', link, ['genre_id', owner_id], unique=False)
+
+    op.execute('''
+        INSERT INTO "Genre" (name)
+        SELECT name FROM (
+            SELECT unnest(genres) AS name FROM "Venue"
+            UNION
+            SELECT unnest(genres) FROM "Artist"
+        ) AS names
+        WHERE name IS NOT NULL AND name <> ''
+        ORDER BY name
+    ''')
+    for link, owner, owner_id in LINKS:
+        op.execute(f'''
+            INSERT INTO "{link}" ({owner_id}, genre_id)
+            SELECT DISTINCT o.id, g.id
+            FROM "{owner}" AS o
+            CROSS JOIN LATERAL unnest(o.genres) AS n(name)
+            JOIN "Genre" AS g ON g.name = n.name
+        ''')
+        op.drop_index(f'ix_{owner}_genres', table_name=owner)
+        op.drop_column(owner, 'genres')
+
+
+def downgrade():
+    for link, owner, owner_id in LINKS:
+        op.add_column(owner, sa.Column('genres', postgresql.ARRAY(sa.String()), nullable=True))
+        op.execute(f'''
+            UPDATE "{owner}" AS o SET genres = coalesce((
+                SELECT array_agg(g.name ORDER BY g.name)
+                FROM "{link}" AS l JOIN "Genre" AS g ON g.id = l.genre_id
+                WHERE l.{owner_id} = o.id
+            ), '{{}}')
+        ''')
+        op.alter_column(owner, 'genres', nullable=False)
+        op.create_index(f'ix_{owner}_genres', owner, ['genres'], unique=False, postgresql_using='gin')
+        op.drop_index(f'ix_{link}_genre_id_{owner_id}', table_name=link)
+        op.drop_table(link)
+    op.drop_table('Genre')
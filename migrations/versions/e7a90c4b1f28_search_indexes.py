@@ -0,0 +1,52 @@
+"""Search indexes on Venue and Artist.
+
+Revision ID: e7a90c4b1f28
+Revises: b52e8f03d6a1
+Create Date: 2026-10-18 12:41:09.377152
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a90c4b1f28'
+down_revision = 'b52e8f03d6a1'
+branch_labels = None
+depends_on = None
+
+# The trigram indexes let `ILIKE '%term%'` on name and city use an index scan
+# instead of a sequential scan. They need the pg_trgm contrib extension; on a
+# server without it they are skipped and search still works, just unindexed.
+TRIGRAM_INDEXES = [
+    ('ix_Venue_name_trgm', 'Venue', 'name'),
+    ('ix_Venue_city_trgm', 'Venue', 'city'),
+    ('ix_Artist_name_trgm', 'Artist', 'name'),
+    ('ix_Artist_city_trgm', 'Artist', 'city'),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    has_pg_trgm = bind.execute(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )).scalar() is not None
+    if has_pg_trgm:
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, table, column in TRIGRAM_INDEXES:
+            op.create_index(name, table, [column], unique=False,
+                            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+    op.create_index('ix_Venue_genres', 'Venue', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_Artist_genres', 'Artist', ['genres'], unique=False, postgresql_using='gin')
+    op.create_index('ix_Venue_state', 'Venue', ['state'], unique=False)
+    op.create_index('ix_Artist_state', 'Artist', ['state'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_Artist_state', table_name='Artist')
+    op.drop_index('ix_Venue_state', table_name='Venue')
+    op.drop_index('ix_Artist_genres', table_name='Artist')
+    op.drop_index('ix_Venue_genres', table_name='Venue')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS "{name}"')
@@ -1,19 +1,101 @@
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+import base64
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, case, event, func, inspect, select, text, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql.functions import FunctionElement
 
-db = SQLAlchemy()
+from routing import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+
+@event.listens_for(Engine, 'connect')
+def _enforce_sqlite_foreign_keys(dbapi_connection, connection_record):
+  # SQLite only enforces foreign keys, ON DELETE CASCADE included, when asked
+  # to on each connection.
+  if 'sqlite' in type(dbapi_connection).__module__:
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
 
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
+# Genres live in their own table, linked to venues and artists through
+# association tables, so the schema is portable (SQLite included) and "by
+# genre" lookups go through the (genre_id, owner id) indexes. Venue.genres and
+# Artist.genres stay lists of genre names for reading and assignment.
+#
+# Deleting a venue or artist deletes its shows and genre links in the database
+# (ON DELETE CASCADE), without the ORM loading them; archived_at marks venues
+# and artists retired from listings instead. Partial indexes keep archived
+# venues out of the directory's (state, city, name) index, and give the few
+# archived rows a small index of their own. See retire.py.
+
+LIVE = text('archived_at IS NULL')
+ARCHIVED = text('archived_at IS NOT NULL')
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+      return f'<(Genre) id: {self.id}, name: {self.name}>'
+
+    @classmethod
+    def named(cls, name):
+      # The genre called `name`, created if it is new. Genres are few, so the
+      # first call in a transaction loads them all and later calls are free.
+      info = db.session().info
+      if 'genres_by_name' not in info:
+        with db.session.no_autoflush:
+          info['genres_by_name'] = {genre.name: genre for genre in cls.query}
+      genres = info['genres_by_name']
+      if name not in genres:
+        genres[name] = cls(name=name)
+      return genres[name]
+
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _forget_genres(session):
+  session.info.pop('genres_by_name', None)
+
+
+venue_genres = db.Table(
+  'VenueGenre',
+  db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+  db.Index('ix_VenueGenre_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genres = db.Table(
+  'ArtistGenre',
+  db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+  db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+  db.Index('ix_ArtistGenre_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+      db.Index('ix_Venue_state_city', 'state', 'city'),
+      db.Index('ix_Venue_live_state_city_name', 'state', 'city', 'name', postgresql_where=LIVE, sqlite_where=LIVE),
+      db.Index('ix_Venue_archived_at', 'archived_at', postgresql_where=ARCHIVED, sqlite_where=ARCHIVED),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False, unique=True)
-    genres = db.Column(db.ARRAY(db.String), nullable=False)
+    genre_objects = db.relationship(Genre, secondary=venue_genres, lazy='selectin', order_by=Genre.name)
+    genres = association_proxy('genre_objects', 'name', creator=Genre.named)
     address = db.Column(db.String(120), nullable=False)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
@@ -23,38 +105,69 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
-    shows = db.relationship('Show', backref='Venue', lazy=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Rollups of the venue's shows, kept by count_shows() (see "Show counts").
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    archived_at = db.Column(db.DateTime)
+    shows = db.relationship('Show', backref='Venue', lazy=True, passive_deletes='all')
 
     def __repr__(self):
-      return f'<(Venue) id: {self.id}, name: {self.name}, city: {self.city}, state: {self.state}, shows: {self.shows}>'
+      return f'<(Venue) id: {self.id}, name: {self.name}, city: {self.city}, state: {self.state}>'
 
-    @hybrid_property
+    @property
     def past_shows(self):
+      # Loaded with upcoming_shows, by load_show_partitions(), unless a batch
+      # load already filled both; forgotten when shows are flushed and at the
+      # end of the transaction.
+      if '_past_shows' not in self.__dict__:
+        load_show_partitions([self])
+      return self._past_shows
+
+    @property
+    def upcoming_shows(self):
+      if '_upcoming_shows' not in self.__dict__:
+        load_show_partitions([self])
+      return self._upcoming_shows
+
+    @hybrid_property
+    def num_past_shows(self):
+      return len(self.past_shows)
+
+    @num_past_shows.expression
+    def num_past_shows(cls):
       return (
-        Show.query
-          .filter(Show.venue_id == self.id)
-          .filter(Show.start_time < datetime.now())
-          .all()
+        select(func.count(Show.id))
+          .where(Show.venue_id == cls.id)
+          .where(Show.start_time < datetime.now())
+          .scalar_subquery()
       )
 
     @hybrid_property
-    def upcoming_shows(self):
+    def num_upcoming_shows(self):
+      return len(self.upcoming_shows)
+
+    @num_upcoming_shows.expression
+    def num_upcoming_shows(cls):
       return (
-        Show.query
-          .filter(Show.venue_id == self.id)
-          .filter(Show.start_time >= datetime.now())
-          .all()
+        select(func.count(Show.id))
+          .where(Show.venue_id == cls.id)
+          .where(Show.start_time >= datetime.now())
+          .scalar_subquery()
       )
 
-
     # TODO: implement any missing fields, as a database migration using Flask-Migrate [COMPLETED]
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+      db.Index('ix_Artist_archived_at', 'archived_at', postgresql_where=ARCHIVED, sqlite_where=ARCHIVED),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False, unique=True)
-    genres = db.Column(db.ARRAY(db.String(120)), nullable=False)
+    genre_objects = db.relationship(Genre, secondary=artist_genres, lazy='selectin', order_by=Genre.name)
+    genres = association_proxy('genre_objects', 'name', creator=Genre.named)
     city = db.Column(db.String(120), nullable=False)
     state = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(120))
@@ -63,40 +176,613 @@ class Artist(db.Model):
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(320))
     image_link = db.Column(db.String(500))
-    shows = db.relationship('Show', backref='Artist', lazy=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Rollups of the artist's shows, kept by count_shows() (see "Show counts").
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    archived_at = db.Column(db.DateTime)
+    shows = db.relationship('Show', backref='Artist', lazy=True, passive_deletes='all')
 
     def __repr__(self):
-      return f'<(Artist) id: {self.id}, name: {self.name} shows: {self.shows}>'
+      return f'<(Artist) id: {self.id}, name: {self.name}, city: {self.city}, state: {self.state}>'
 
-    @hybrid_property
+    @property
     def past_shows(self):
+      # Loaded with upcoming_shows, by load_show_partitions(), unless a batch
+      # load already filled both; forgotten when shows are flushed and at the
+      # end of the transaction.
+      if '_past_shows' not in self.__dict__:
+        load_show_partitions([self])
+      return self._past_shows
+
+    @property
+    def upcoming_shows(self):
+      if '_upcoming_shows' not in self.__dict__:
+        load_show_partitions([self])
+      return self._upcoming_shows
+
+    @hybrid_property
+    def num_past_shows(self):
+      return len(self.past_shows)
+
+    @num_past_shows.expression
+    def num_past_shows(cls):
       return (
-        Show.query
-          .filter(Show.artist_id == self.id)
-          .filter(Show.start_time < datetime.now())
-          .all()
+        select(func.count(Show.id))
+          .where(Show.artist_id == cls.id)
+          .where(Show.start_time < datetime.now())
+          .scalar_subquery()
       )
 
     @hybrid_property
-    def upcoming_shows(self):
+    def num_upcoming_shows(self):
+      return len(self.upcoming_shows)
+
+    @num_upcoming_shows.expression
+    def num_upcoming_shows(cls):
       return (
-        Show.query
-          .filter(Show.artist_id == self.id)
-          .filter(Show.start_time >= datetime.now())
-          .all()
+        select(func.count(Show.id))
+          .where(Show.artist_id == cls.id)
+          .where(Show.start_time >= datetime.now())
+          .scalar_subquery()
       )
 
     # TODO: implement any missing fields, as a database migration using Flask-Migrate [COMPLETED]
 
 # TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration. [COMPLETED]
 
+# Shows last DEFAULT_SHOW_LENGTH unless given an end_time, and at most
+# MAX_SHOW_LENGTH, which bounds how far back an overlapping show can start (see
+# bookings.py).
+DEFAULT_SHOW_LENGTH = timedelta(hours=2)
+MAX_SHOW_LENGTH = timedelta(hours=24)
+
+
+def _default_end_time(context):
+  return context.get_current_parameters()['start_time'] + DEFAULT_SHOW_LENGTH
+
+
 class Show(db.Model):
     __tablename__ = 'Show'
+    __table_args__ = (
+      db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+      db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+      db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+      db.CheckConstraint('end_time > start_time', name='ck_Show_end_after_start'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-    start_time = db.Column(db.DateTime, nullable=False)
+    # The counted columns load their old value before a set, even when
+    # expired, so _count_flushed_shows() can take the show off its old counts.
+    artist_id = db.column_property(
+      db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False), active_history=True)
+    venue_id = db.column_property(
+      db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False), active_history=True)
+    start_time = db.column_property(db.Column(db.DateTime, nullable=False), active_history=True)
+    end_time = db.Column(db.DateTime, nullable=False, default=_default_end_time)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     def __repr__(self):
-      return f'<(Show) id: {self.id}, artist_id: {self.artist_id}, venue_id: {self.venue_id}, start_time: {self.start_time}>'
+      return f'<(Show) id: {self.id}, artist_id: {self.artist_id}, venue_id: {self.venue_id}, start_time: {self.start_time}, end_time: {self.end_time}>'
+
+
+class ShowRollup(db.Model):
+    # A single row: shows starting before `past_before` are counted in
+    # past_shows_count, the others in upcoming_shows_count.
+    __tablename__ = 'ShowRollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    past_before = db.Column(db.DateTime, nullable=False)
+
+
+@event.listens_for(ShowRollup.__table__, 'after_create')
+def _insert_show_rollup(table, connection, **kw):
+  connection.execute(table.insert().values(id=1, past_before=datetime.now()))
+
+
+class Deletions(db.Model):
+    # A single row counting deletes of venues, artists and shows, bumped by
+    # note_deletion(), so page versions notice deletes without counting rows.
+    __tablename__ = 'Deletions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    deleted_at = db.Column(db.DateTime, nullable=False)
+
+
+@event.listens_for(Deletions.__table__, 'after_create')
+def _insert_deletions(table, connection, **kw):
+  connection.execute(table.insert().values(id=1, count=0, deleted_at=datetime.utcnow()))
+
+
+def _genres_changed(target, value, initiator):
+  # Changing genres only writes association rows, so bump updated_at for the
+  # owner's version (and with it the page's ETag) to change.
+  target.updated_at = datetime.utcnow()
+
+for _genre_objects in (Venue.genre_objects, Artist.genre_objects):
+  event.listen(_genre_objects, 'append', _genres_changed)
+  event.listen(_genre_objects, 'remove', _genres_changed)
+
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+class joined_names(FunctionElement):
+    # Aggregate joining a group's strings with ';', the separator used by the
+    # CSV import/export: string_agg() on PostgreSQL, group_concat() elsewhere.
+    type = db.String()
+    name = 'joined_names'
+    inherit_cache = True
+
+
+@compiles(joined_names)
+def _joined_names(element, compiler, **kw):
+  return "group_concat(%s, ';')" % compiler.process(element.clauses, **kw)
+
+
+@compiles(joined_names, 'postgresql')
+def _joined_names_postgresql(element, compiler, **kw):
+  column = compiler.process(element.clauses, **kw)
+  return f"string_agg({column}, ';' ORDER BY {column})"
+
+
+def genre_links(model):
+  # The association table of Venue or Artist, and its owner id column.
+  if model is Venue:
+    return venue_genres, venue_genres.c.venue_id
+  return artist_genres, artist_genres.c.artist_id
+
+
+def has_genre(model, names):
+  # Condition for venues/artists with any of the genres `names`, answered
+  # from the association table's (genre_id, owner id) index.
+  table, owner_id = genre_links(model)
+  return model.id.in_(
+    select(owner_id)
+      .join(Genre, Genre.id == table.c.genre_id)
+      .where(Genre.name.in_(names))
+  )
+
+
+def genre_names(model):
+  # Correlated subquery of a venue's/artist's genre names, ';'-joined.
+  table, owner_id = genre_links(model)
+  return (
+    select(joined_names(Genre.name))
+      .select_from(table.join(Genre, Genre.id == table.c.genre_id))
+      .where(owner_id == model.id)
+      .scalar_subquery()
+  )
+
+
+#----------------------------------------------------------------------------#
+# Show counts.
+#----------------------------------------------------------------------------#
+
+# Venue and Artist carry upcoming_shows_count/past_shows_count so list and
+# search pages never count shows. Whatever writes shows through the ORM is
+# covered by the after_flush listener below; bulk writes that bypass it call
+# count_shows() in their transaction. Shows deleted along with their venue or
+# artist are taken off the other side's counts by uncount_owned_shows(), in
+# one grouped query, before the owner's DELETE. Counts split shows at
+# ShowRollup.past_before rather than at "now": rollups.advance() moves that
+# boundary, recounting the shows that have started since, and
+# rollups.rebuild() recounts everything.
+#
+# Writers hold a share lock on the ShowRollup row until they commit, and
+# advance()/rebuild() an exclusive one, so a show is never counted against a
+# boundary that moves before it is visible.
+
+def count_shows(session, added=(), removed=()):
+  # Adds shows `added` to and takes shows `removed` from their venue's and
+  # artist's counts; each show is a (venue_id, artist_id, start_time).
+  if not added and not removed:
+    return
+  past_before = _share_rollup(session)
+  deltas = {Venue: defaultdict(lambda: [0, 0]), Artist: defaultdict(lambda: [0, 0])}
+  for shows, sign in ((added, 1), (removed, -1)):
+    for venue_id, artist_id, start_time in shows:
+      past = start_time < past_before
+      deltas[Venue][venue_id][past] += sign
+      deltas[Artist][artist_id][past] += sign
+  for model, by_id in deltas.items():
+    rows = [
+      {'owner_id': owner_id, 'upcoming': upcoming, 'past': past}
+      for owner_id, (upcoming, past) in by_id.items() if upcoming or past
+    ]
+    if rows:
+      session.execute(shift_counts(model), rows)
+
+
+def uncount_owned_shows(session, model, ids, exclude=()):
+  # Takes the shows of the venues or artists `ids` off the counts of their
+  # artists or venues, before those owners are deleted and their shows with
+  # them. Shows with ids in `exclude` are left out (a flush deleting them
+  # counts them itself).
+  owner_id, other, other_id = (
+    (Show.venue_id, Artist, Show.artist_id) if model is Venue else (Show.artist_id, Venue, Show.venue_id)
+  )
+  past_before = _share_rollup(session)
+  query = (
+    select(
+      other_id,
+      func.count(case((Show.start_time >= past_before, 1))),
+      func.count(case((Show.start_time < past_before, 1))))
+      .where(owner_id.in_(ids))
+      .group_by(other_id)
+  )
+  if exclude:
+    query = query.where(Show.id.notin_(exclude))
+  rows = session.execute(query).all()
+  if rows:
+    session.execute(shift_counts(other), [
+      {'owner_id': owner, 'upcoming': -upcoming, 'past': -past} for owner, upcoming, past in rows
+    ])
+
+
+def _share_rollup(session):
+  return session.execute(
+    select(ShowRollup.past_before).where(ShowRollup.id == 1).with_for_update(read=True)
+  ).scalar_one()
+
+
+def shift_counts(model):
+  # An UPDATE adding `upcoming` and `past` to the counts of the venue/artist
+  # `owner_id`, for executemany. updated_at is left alone: counts changing
+  # is not an edit of the venue or artist.
+  table = model.__table__
+  return (
+    update(table)
+      .where(table.c.id == bindparam('owner_id'))
+      .values(
+        upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+        past_shows_count=table.c.past_shows_count + bindparam('past'),
+        updated_at=table.c.updated_at)
+  )
+
+
+@event.listens_for(db.session, 'before_flush')
+def _uncount_deleted_owners(session, flush_context, instances):
+  # The relationships leave shows to ON DELETE CASCADE, so an ORM delete of a
+  # venue or artist is counted here, before its DELETE runs.
+  deleted_shows = [show.id for show in session.deleted if isinstance(show, Show)]
+  for model in (Venue, Artist):
+    ids = [owner.id for owner in session.deleted if isinstance(owner, model)]
+    if ids:
+      uncount_owned_shows(session, model, ids, exclude=deleted_shows)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _count_flushed_shows(session, flush_context):
+  # Runs while the flushed objects still hold their pre-flush history.
+  added = [_show_key(show) for show in session.new if isinstance(show, Show)]
+  removed = [_show_key(show, committed=True) for show in session.deleted if isinstance(show, Show)]
+  for show in session.dirty:
+    if isinstance(show, Show) and session.is_modified(show):
+      before, after = _show_key(show, committed=True), _show_key(show)
+      if before != after:
+        removed.append(before)
+        added.append(after)
+  count_shows(session, added, removed)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _forget_flushed_partitions(session, flush_context):
+  if any(isinstance(show, Show) for show in (*session.new, *session.dirty, *session.deleted)):
+    _forget_show_partitions(session)
+
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _forget_show_partitions(session):
+  # Drops the shows load_show_partitions() put on venues and artists, which a
+  # flush of shows, or the passing of time, may have made stale.
+  for obj in session.identity_map.values():
+    if isinstance(obj, (Venue, Artist)):
+      obj.__dict__.pop('_past_shows', None)
+      obj.__dict__.pop('_upcoming_shows', None)
+
+
+def _show_key(show, committed=False):
+  if not committed:
+    return show.venue_id, show.artist_id, show.start_time
+  attrs = inspect(show).attrs
+  return tuple(
+    (attrs[key].history.deleted or attrs[key].history.unchanged or [attrs[key].value])[0]
+    for key in ('venue_id', 'artist_id', 'start_time')
+  )
+
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+# Each read comes as a statement builder (*_query) plus a function shaping its
+# rows, so the sync views and the async read app (asgi.py) run the same SQL.
+
+def venue_directory(genre=None):
+  # Venues grouped by area, each with its number of upcoming shows (the
+  # rollup, so no shows are read).
+  return venue_areas(db.session.execute(venue_directory_query(genre)).all())
+
+def venue_directory_query(genre=None):
+  query = select(
+    Venue.id, Venue.name, Venue.city, Venue.state, Venue.upcoming_shows_count.label('num_upcoming_shows')
+  ).where(Venue.archived_at.is_(None))
+  if genre is not None:
+    query = query.where(has_genre(Venue, [genre]))
+  return query.order_by(Venue.state, Venue.city, Venue.name)
+
+def venue_areas(rows):
+  # Rows arrive ordered by area, so grouping is one linear pass.
+  areas = {}
+  for row in rows:
+    area = areas.get((row.city, row.state))
+    if area is None:
+      area = areas[(row.city, row.state)] = {'city': row.city, 'state': row.state, 'venues': []}
+    area['venues'].append({'id': row.id, 'name': row.name, 'num_upcoming_shows': row.num_upcoming_shows})
+  return list(areas.values())
+
+def artist_list_query(genre=None):
+  query = select(Artist.id, Artist.name).where(Artist.archived_at.is_(None))
+  if genre is not None:
+    query = query.where(has_genre(Artist, [genre]))
+  return query
+
+
+def load_show_partitions(entities):
+  # Fill past_shows/upcoming_shows for a list of venues or artists (not mixed)
+  # from a single query, instead of two queries per entity.
+  if not entities:
+    return entities
+  owner_id = Show.venue_id if isinstance(entities[0], Venue) else Show.artist_id
+  by_id = {}
+  for entity in entities:
+    entity._past_shows = []
+    entity._upcoming_shows = []
+    by_id[entity.id] = entity
+
+  now = datetime.now()
+  shows = Show.query.filter(owner_id.in_(list(by_id))).order_by(Show.start_time).all()
+  for show in shows:
+    entity = by_id[getattr(show, owner_id.key)]
+    if show.start_time < now:
+      entity._past_shows.append(show)
+    else:
+      entity._upcoming_shows.append(show)
+  return entities
+
+
+def load_venue_detail(venue_id, with_shows=True):
+  # A venue plus its past and upcoming shows, each row carrying the artist
+  # columns a detail page needs. Two queries however many shows it has.
+  venue = db.session.query(Venue).get(venue_id)
+  if venue is None or not with_shows:
+    return venue, [], []
+  return (venue, *split_on_start_time(db.session.execute(venue_shows_query(venue_id)).all()))
+
+
+def venue_shows_query(venue_id):
+  return (
+    select(
+      Show.start_time,
+      Artist.id.label('artist_id'),
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link'))
+      .join(Artist, Show.artist_id == Artist.id)
+      .where(Show.venue_id == venue_id)
+      .order_by(Show.start_time)
+  )
+
+
+def load_artist_detail(artist_id, with_shows=True):
+  # An artist plus its past and upcoming shows, each row carrying the venue
+  # columns a detail page needs. Two queries however many shows it has.
+  artist = db.session.query(Artist).get(artist_id)
+  if artist is None or not with_shows:
+    return artist, [], []
+  return (artist, *split_on_start_time(db.session.execute(artist_shows_query(artist_id)).all()))
+
+
+def artist_shows_query(artist_id):
+  return (
+    select(
+      Show.start_time,
+      Venue.id.label('venue_id'),
+      Venue.name.label('venue_name'),
+      Venue.image_link.label('venue_image_link'))
+      .join(Venue, Show.venue_id == Venue.id)
+      .where(Show.artist_id == artist_id)
+      .order_by(Show.start_time)
+  )
+
+
+def split_on_start_time(rows):
+  now = datetime.now()
+  past_shows = [row for row in rows if row.start_time < now]
+  upcoming_shows = [row for row in rows if row.start_time >= now]
+  return past_shows, upcoming_shows
+
+
+def show_page(after=None, before=None, per_page=24):
+  # One page of shows in (start_time, id) order, with the artist and venue
+  # columns joined in. `after`/`before` are cursors from a previous page.
+  # Returns (rows, next_cursor, prev_cursor); a cursor is None at either end.
+  rows = db.session.execute(show_page_query(after, before, per_page)).all()
+  return paginate_shows(rows, after, before, per_page)
+
+
+def show_page_query(after=None, before=None, per_page=24):
+  # The row-value comparison lets the (start_time, id) index seek straight to
+  # the page, so cost does not grow with how deep into the listing we are.
+  # One extra row is fetched to tell whether there is a page beyond.
+  query = (
+    select(
+      Show.id,
+      Show.start_time,
+      Venue.id.label('venue_id'),
+      Venue.name.label('venue_name'),
+      Artist.id.label('artist_id'),
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link'))
+      .join(Venue, Show.venue_id == Venue.id)
+      .join(Artist, Show.artist_id == Artist.id)
+  )
+  key = tuple_(Show.start_time, Show.id)
+  if before is not None:
+    return (
+      query.where(key < tuple_(*decode_show_cursor(before)))
+        .order_by(Show.start_time.desc(), Show.id.desc())
+        .limit(per_page + 1)
+    )
+  if after is not None:
+    query = query.where(key > tuple_(*decode_show_cursor(after)))
+  return query.order_by(Show.start_time, Show.id).limit(per_page + 1)
+
+
+def paginate_shows(rows, after=None, before=None, per_page=24):
+  if before is not None:
+    has_prev, has_next = len(rows) > per_page, True
+    rows = rows[:per_page][::-1]
+  else:
+    has_prev, has_next = after is not None, len(rows) > per_page
+    rows = rows[:per_page]
+  next_cursor = encode_show_cursor(rows[-1]) if rows and has_next else None
+  prev_cursor = encode_show_cursor(rows[0]) if rows and has_prev else None
+  return rows, next_cursor, prev_cursor
+
+
+def encode_show_cursor(show):
+  token = f'{show.start_time.isoformat()}|{show.id}'.encode()
+  return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+
+def decode_show_cursor(cursor):
+  # Raises ValueError on anything encode_show_cursor() could not have produced.
+  try:
+    token = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    start_time, show_id = token.split('|')
+    return datetime.fromisoformat(start_time), int(show_id)
+  except (TypeError, UnicodeDecodeError, ValueError) as e:
+    raise ValueError(f'Invalid show cursor: {cursor!r}') from e
+
+
+#----------------------------------------------------------------------------#
+# Versions.
+#----------------------------------------------------------------------------#
+
+# Cheap aggregate queries that change whenever the data behind a page does,
+# for use as HTTP validators. Each returns (last_modified, version), or None
+# when the entity does not exist. Besides updated_at maxima (index lookups),
+# a version holds the Deletions row, bumped on every delete, or for a single
+# venue or artist the count of its shows, and the earliest upcoming
+# start_time, which moves as soon as an upcoming show becomes a past one. The
+# *_version_query() statements label the updated_at columns "updated_*";
+# version_of() takes last_modified from those.
+
+def note_deletion(session):
+  # Bumps the Deletions row; call it in the transaction deleting venues,
+  # artists or shows outside the ORM (its deletes are noted below).
+  table = Deletions.__table__
+  now = datetime.utcnow()
+  if not session.execute(
+    update(table).where(table.c.id == 1).values(count=table.c.count + 1, deleted_at=now)
+  ).rowcount:
+    session.execute(table.insert().values(id=1, count=1, deleted_at=now))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _note_deleted_rows(session, flush_context, instances):
+  if any(isinstance(obj, (Venue, Artist, Show)) for obj in session.deleted):
+    note_deletion(session)
+
+
+def deletions_columns():
+  return (
+    select(Deletions.deleted_at).where(Deletions.id == 1).scalar_subquery().label('updated_deletions'),
+    select(Deletions.count).where(Deletions.id == 1).scalar_subquery(),
+  )
+
+def venue_version(venue_id):
+  return version_of(db.session.execute(venue_version_query(venue_id)).first())
+
+
+def venue_version_query(venue_id):
+  return (
+    select(
+      Venue.updated_at.label('updated_venue'),
+      func.max(Show.updated_at).label('updated_shows'),
+      func.max(Artist.updated_at).label('updated_artists'),
+      func.count(Show.id),
+      func.min(case((Show.start_time >= datetime.now(), Show.start_time))))
+      .outerjoin(Show, Show.venue_id == Venue.id)
+      .outerjoin(Artist, Show.artist_id == Artist.id)
+      .where(Venue.id == venue_id)
+      .group_by(Venue.id)
+  )
+
+
+def artist_version(artist_id):
+  return version_of(db.session.execute(artist_version_query(artist_id)).first())
+
+
+def artist_version_query(artist_id):
+  return (
+    select(
+      Artist.updated_at.label('updated_artist'),
+      func.max(Show.updated_at).label('updated_shows'),
+      func.max(Venue.updated_at).label('updated_venues'),
+      func.count(Show.id),
+      func.min(case((Show.start_time >= datetime.now(), Show.start_time))))
+      .outerjoin(Show, Show.artist_id == Artist.id)
+      .outerjoin(Venue, Show.venue_id == Venue.id)
+      .where(Artist.id == artist_id)
+      .group_by(Artist.id)
+  )
+
+
+def venue_directory_version():
+  return version_of(db.session.execute(venue_directory_version_query()).one())
+
+
+def venue_directory_version_query():
+  # The directory's upcoming show counts are rollups, which change as shows
+  # are written (updated_shows and the deletions cover that) and as
+  # rollups.advance() moves their boundary.
+  return select(
+    select(func.max(Venue.updated_at)).scalar_subquery().label('updated_venues'),
+    select(func.max(Show.updated_at)).scalar_subquery().label('updated_shows'),
+    *deletions_columns(),
+    select(ShowRollup.past_before).where(ShowRollup.id == 1).scalar_subquery()
+  )
+
+
+def artist_list_version():
+  return version_of(db.session.execute(artist_list_version_query()).one())
+
+
+def artist_list_version_query():
+  return select(select(func.max(Artist.updated_at)).scalar_subquery().label('updated_artists'), *deletions_columns())
+
+
+def show_list_version():
+  return version_of(db.session.execute(show_list_version_query()).one())
+
+
+def show_list_version_query():
+  return select(
+    select(func.max(Show.updated_at)).scalar_subquery().label('updated_shows'),
+    select(func.max(Venue.updated_at)).scalar_subquery().label('updated_venues'),
+    select(func.max(Artist.updated_at)).scalar_subquery().label('updated_artists'),
+    *deletions_columns()
+  )
+
+
+def version_of(row):
+  if row is None:
+    return None
+  updated_ats = [value for key, value in row._mapping.items() if key.startswith('updated_')]
+  last_modified = max((value for value in updated_ats if value is not None), default=None)
+  return last_modified, tuple(row)
@@ -0,0 +1,108 @@
+import heapq
+import re
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# SQL profiler.
+#----------------------------------------------------------------------------#
+
+# Every statement a request executes is timed through the engine's cursor
+# events. Each response gets a Server-Timing header with the query count, the
+# total database time and the whole request time, which browser dev tools
+# show next to the request; in debug mode (or with SQL_PROFILE_STATEMENTS) the
+# slowest statements are added too. Requests over SQL_QUERY_BUDGET queries or
+# SQL_TIME_BUDGET_MS of database time are logged with those statements.
+
+class QueryStats:
+
+    def __init__(self, keep=3):
+      self.keep = keep
+      self.count = 0
+      self.seconds = 0.0
+      self.slowest = []  # min-heap of (seconds, statement)
+
+    def record(self, statement, seconds):
+      self.count += 1
+      self.seconds += seconds
+      if len(self.slowest) < self.keep:
+        heapq.heappush(self.slowest, (seconds, statement))
+      elif seconds > self.slowest[0][0]:
+        heapq.heapreplace(self.slowest, (seconds, statement))
+
+    def slowest_first(self):
+      return sorted(self.slowest, reverse=True)
+
+
+class QueryProfiler:
+
+    def __init__(self, app=None):
+      if app is not None:
+        self.init_app(app)
+
+    def init_app(self, app):
+      if not app.config.get('SQL_PROFILE', True):
+        return
+      self.app = app
+      if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+      app.before_request(self._start)
+      app.after_request(self._finish)
+      app.extensions['query_profiler'] = self
+
+    def _start(self):
+      g.query_stats = QueryStats(self.app.config.get('SQL_PROFILE_SLOWEST', 3))
+      g.request_started = time.perf_counter()
+
+    def _finish(self, response):
+      stats = g.get('query_stats')
+      if stats is None:
+        return response
+      config = self.app.config
+      elapsed = time.perf_counter() - g.request_started
+
+      timings = [
+        f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"',
+        f'app;dur={elapsed * 1000:.1f}',
+      ]
+      if config.get('SQL_PROFILE_STATEMENTS', self.app.debug):
+        for i, (seconds, statement) in enumerate(stats.slowest_first(), 1):
+          timings.append(f'sql{i};dur={seconds * 1000:.1f};desc="{_header_text(statement)}"')
+      response.headers.add('Server-Timing', ', '.join(timings))
+
+      budget_count = config.get('SQL_QUERY_BUDGET')
+      budget_ms = config.get('SQL_TIME_BUDGET_MS')
+      if (budget_count and stats.count > budget_count) or \
+          (budget_ms and stats.seconds * 1000 > budget_ms):
+        self.app.logger.warning(
+          'Query budget exceeded: %s %s ran %d queries in %.1f ms; slowest:\n%s',
+          request.method, request.full_path.rstrip('?'), stats.count, stats.seconds * 1000,
+          '\n'.join(f'  {seconds * 1000:.1f} ms  {statement}' for seconds, statement in stats.slowest_first())
+        )
+      return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  seconds = time.perf_counter() - conn.info['query_started'].pop()
+  if has_request_context():
+    stats = g.get('query_stats')
+    if stats is not None:
+      stats.record(statement, seconds)
+
+
+def _header_text(statement, length=120):
+  # Header values can't hold newlines or unescaped quotes.
+  text = re.sub(r'\s+', ' ', statement).strip()
+  text = text.replace('\\', '\\\\').replace('"', '\\"')
+  return text[:length] + ('...' if len(text) > length else '')
+
+
+query_profiler = QueryProfiler()
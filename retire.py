@@ -0,0 +1,145 @@
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, exists, func, select, update
+
+from autocomplete import venue_names, artist_names
+from cache import view_cache
+from models import db, Artist, Show, Venue, note_deletion, uncount_owned_shows
+
+#----------------------------------------------------------------------------#
+# Retiring venues and artists.
+#----------------------------------------------------------------------------#
+
+# Venues and artists are deleted or archived by id, in set-based statements.
+#
+# Deleting one deletes its shows, and its genre links, through ON DELETE
+# CASCADE in the same DELETE, so a venue with 10k past shows is one statement
+# rather than 10k ORM deletes. Before it runs, uncount_owned_shows() takes
+# those shows off the other side's counts in one grouped query.
+#
+# Archiving keeps the row and its shows as history: archived venues and artists
+# drop out of the directory, the artist list, search and autocomplete, but
+# their pages, shows and the calendar are unchanged. Listings filter on
+# `archived_at IS NULL`, which the partial indexes in models.py cover.
+#
+# Neither goes through the ORM's flush, so the callers invalidate the view
+# cache (and autocomplete) themselves, through retired().
+
+MODELS = {'venues': Venue, 'artists': Artist}
+
+NAMESPACES = {
+  Venue: ('venues', 'shows', 'venue:*', 'artist:*'),
+  Artist: ('artists', 'shows', 'venue:*', 'artist:*'),
+}
+
+AUTOCOMPLETE = {Venue: venue_names, Artist: artist_names}
+
+
+def delete_owners(session, model, ids):
+  # Deletes the venues or artists `ids` with their shows, and returns how many
+  # were deleted.
+  table = model.__table__
+  # Locking the rows first keeps new shows from being booked on them (which
+  # would lock them FOR KEY SHARE) between counting their shows and deleting.
+  ids = session.execute(
+    select(table.c.id).where(table.c.id.in_(ids)).order_by(table.c.id).with_for_update()
+  ).scalars().all()
+  if not ids:
+    return 0
+  uncount_owned_shows(session, model, ids)
+  note_deletion(session)
+  return session.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+
+
+def archive_owners(session, model, ids, archived_at):
+  # Archives the venues or artists `ids` as of `archived_at`, or with None
+  # restores them, and returns how many changed.
+  table = model.__table__
+  query = update(table).where(table.c.id.in_(ids)).values(archived_at=archived_at)
+  if archived_at is None:
+    query = query.where(table.c.archived_at.isnot(None))
+  else:
+    query = query.where(table.c.archived_at.is_(None))
+  return session.execute(query).rowcount
+
+
+def retired(model, ids, restored=()):
+  # After commit: drops the cached pages and autocomplete entries of deleted or
+  # archived `ids`; `restored` is [(id, name), ...] of restored ones.
+  view_cache.invalidate(*NAMESPACES[model])
+  for owner_id in ids:
+    AUTOCOMPLETE[model].remove(owner_id)
+  for owner_id, name in restored:
+    AUTOCOMPLETE[model].add(owner_id, name)
+
+
+def select_owners(model, ids=(), inactive_since=None, archived_before=None):
+  # The ids, in order, of the venues or artists among `ids` (or all of them)
+  # that haven't been edited and have no shows since `inactive_since`, and/or
+  # were archived before `archived_before`.
+  owner_id = Show.venue_id if model is Venue else Show.artist_id
+  query = select(model.id).order_by(model.id)
+  if ids:
+    query = query.where(model.id.in_(ids))
+  if inactive_since is not None:
+    query = query.where(
+      model.updated_at < inactive_since,
+      ~exists().where(owner_id == model.id, Show.start_time >= inactive_since))
+  if archived_before is not None:
+    query = query.where(model.archived_at < archived_before)
+  return db.session.execute(query).scalars().all()
+
+
+def _chunks(values, size):
+  for start in range(0, len(values), size):
+    yield values[start:start + size]
+
+#----------------------------------------------------------------------------#
+# Command.
+#----------------------------------------------------------------------------#
+
+@click.command('retire')
+@click.argument('kind', type=click.Choice(sorted(MODELS)))
+@click.argument('ids', nargs=-1, type=int)
+@click.option('--inactive-since', type=click.DateTime(), help='Only those not edited, and without shows, since then.')
+@click.option('--archived-before', type=click.DateTime(), help='Only those archived before then.')
+@click.option('--delete', 'action', flag_value='delete', default=True, help='Delete them and their shows (the default).')
+@click.option('--archive', 'action', flag_value='archive', help='Archive them instead.')
+@click.option('--restore', 'action', flag_value='restore', help='Restore archived ones.')
+@click.option('--batch-size', default=1000, show_default=True, help='Venues or artists per statement and commit.')
+@click.option('--dry-run', is_flag=True, help='Only report what would be retired.')
+@with_appcontext
+def retire_command(kind, ids, inactive_since, archived_before, action, batch_size, dry_run):
+  """Delete, archive or restore venues or artists in bulk."""
+  if not (ids or inactive_since or archived_before):
+    raise click.UsageError('Give ids, --inactive-since and/or --archived-before.')
+  model = MODELS[kind]
+  selected = select_owners(model, ids, inactive_since, archived_before)
+
+  if dry_run:
+    owner_id = Show.venue_id if model is Venue else Show.artist_id
+    shows = sum(
+      db.session.execute(select(func.count()).where(owner_id.in_(chunk))).scalar()
+      for chunk in _chunks(selected, batch_size)
+    )
+    db.session.rollback()
+    click.echo(f'Would {action} {len(selected)} {kind}, with {shows} shows.')
+    return
+
+  done = 0
+  now = datetime.utcnow()
+  for chunk in _chunks(selected, batch_size):
+    restored = []
+    if action == 'delete':
+      done += delete_owners(db.session, model, chunk)
+    elif action == 'archive':
+      done += archive_owners(db.session, model, chunk, now)
+    else:
+      done += archive_owners(db.session, model, chunk, None)
+      restored = db.session.execute(select(model.id, model.name).where(model.id.in_(chunk))).all()
+    db.session.commit()
+    retired(model, [] if action == 'restore' else chunk, restored)
+  past = {'delete': 'Deleted', 'archive': 'Archived', 'restore': 'Restored'}[action]
+  click.echo(f'{past} {done} {kind}.')
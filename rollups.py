@@ -0,0 +1,116 @@
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, or_, select, update
+
+from cache import view_cache
+from models import db, Artist, Show, ShowRollup, Venue, shift_counts
+
+#----------------------------------------------------------------------------#
+# Show count rollups.
+#----------------------------------------------------------------------------#
+
+# Jobs keeping Venue/Artist upcoming_shows_count and past_shows_count true over
+# time (models.count_shows() keeps them true as shows are written). advance()
+# is meant to run every minute or so, e.g. as `flask rollups advance --every
+# 60` in a clock process or from cron; until it runs, a show that has started
+# is still counted as upcoming. rebuild() recounts from the Show table, to
+# repair drift or fill the counts after loading shows outside the ORM.
+
+def advance(session, now=None):
+  # Moves the shows that started since the last run from upcoming to past,
+  # and returns how many there were.
+  now = now or datetime.now()
+  past_before = _lock_rollup(session)
+  if past_before is None or past_before >= now:
+    return 0
+  moved = 0
+  for model, owner_id in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    rows = session.execute(
+      select(owner_id, func.count())
+        .where(Show.start_time >= past_before, Show.start_time < now)
+        .group_by(owner_id)
+    ).all()
+    if rows:
+      session.execute(shift_counts(model), [
+        {'owner_id': owner, 'upcoming': -count, 'past': count} for owner, count in rows
+      ])
+    # Every show has one venue and one artist, so both passes move as many.
+    moved = sum(count for _, count in rows)
+  # With nothing moved the old boundary splits shows just as well, and keeping
+  # it keeps the venue directory's version (and ETag) unchanged.
+  if moved:
+    _set_boundary(session, now)
+  return moved
+
+
+def rebuild(session, now=None):
+  # Recounts every venue's and artist's shows, splitting them at `now`, and
+  # returns how many venues and artists had wrong counts.
+  now = now or datetime.now()
+  _lock_rollup(session)
+  repaired = 0
+  for model, owner_id in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    table = model.__table__
+    upcoming = (
+      select(func.count()).where(owner_id == table.c.id, Show.start_time >= now).scalar_subquery()
+    )
+    past = select(func.count()).where(owner_id == table.c.id, Show.start_time < now).scalar_subquery()
+    result = session.execute(
+      update(table)
+        .where(or_(table.c.upcoming_shows_count != upcoming, table.c.past_shows_count != past))
+        .values(upcoming_shows_count=upcoming, past_shows_count=past, updated_at=table.c.updated_at)
+    )
+    repaired += result.rowcount
+  _set_boundary(session, now)
+  return repaired
+
+
+def _lock_rollup(session):
+  # The current boundary, with the row locked against count_shows() until
+  # commit; None if the row is missing.
+  return session.execute(
+    select(ShowRollup.past_before).where(ShowRollup.id == 1).with_for_update()
+  ).scalar()
+
+
+def _set_boundary(session, past_before):
+  table = ShowRollup.__table__
+  if not session.execute(update(table).where(table.c.id == 1).values(past_before=past_before)).rowcount:
+    session.execute(table.insert().values(id=1, past_before=past_before))
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+@click.group('rollups')
+def rollups_command():
+  """Maintain the venue and artist show counts."""
+
+
+@rollups_command.command('advance')
+@click.option('--every', type=float, help='Keep running, advancing every this many seconds.')
+@with_appcontext
+def advance_command(every):
+  """Count shows that have started since the last run as past."""
+  while True:
+    moved = advance(db.session)
+    db.session.commit()
+    if moved:
+      view_cache.invalidate('venues')
+    click.echo(f'{datetime.now():%Y-%m-%d %H:%M:%S} moved {moved} shows to past.')
+    if not every:
+      break
+    time.sleep(every)
+
+
+@rollups_command.command('rebuild')
+@with_appcontext
+def rebuild_command():
+  """Recount every venue's and artist's shows."""
+  repaired = rebuild(db.session)
+  db.session.commit()
+  view_cache.invalidate('venues')
+  click.echo(f'Repaired the counts of {repaired} venues and artists.')
@@ -0,0 +1,167 @@
+import itertools
+import threading
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm, text
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#----------------------------------------------------------------------------#
+
+# Replicas are the SQLALCHEMY_BINDS whose key starts with "replica" (config.py
+# builds them from DATABASE_REPLICA_URLS). GET and HEAD requests read from one
+# replica, picked round-robin among the healthy ones when the request first
+# queries; everything else, including CLI commands and every flush, uses the
+# primary. After a user's write, their requests stay on the primary for
+# REPLICA_STICKY_SECONDS, so they read their own writes despite replica lag.
+#
+# A replica is healthy when `SELECT 1` succeeds and, on PostgreSQL, its replay
+# lag is under REPLICA_MAX_LAG_SECONDS. Health is rechecked at most every
+# REPLICA_HEALTH_CHECK_SECONDS, and a replica is marked down at once when one
+# of its connections is found dead. With no healthy replica, reads go to the
+# primary.
+
+STICKY_KEY = '_primary_until'
+READ_METHODS = {'GET', 'HEAD'}
+
+LAG_QUERY = text('''
+  SELECT CASE
+    WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+  END
+''')
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None):
+      router = self.app.extensions.get('replica_router')
+      if router is not None and not self._flushing and router.reads_from_replica():
+        engine = router.replica()
+        if engine is not None:
+          return engine
+      return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+      return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+class ReplicaRouter:
+
+    def __init__(self, app=None):
+      self.keys = []
+      self.replicas = {}
+      self._counter = itertools.count()
+      self._lock = threading.Lock()
+      if app is not None:
+        self.init_app(app)
+
+    def init_app(self, app):
+      self.app = app
+      self.keys = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key.startswith('replica'))
+      self.replicas = {key: {'healthy': True, 'checked_at': None, 'reads': 0, 'error': None} for key in self.keys}
+      self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 5)
+      self.check_seconds = app.config.get('REPLICA_HEALTH_CHECK_SECONDS', 10)
+      self.max_lag = app.config.get('REPLICA_MAX_LAG_SECONDS')
+      if not self.keys:
+        return
+      app.after_request(self._stick_after_write)
+      app.extensions['replica_router'] = self
+
+    def reads_from_replica(self):
+      if not has_request_context() or request.method not in READ_METHODS or g.get('use_primary'):
+        return False
+      return session.get(STICKY_KEY, 0) <= time.time()
+
+    def replica(self):
+      # The replica engine for this request, chosen on first use so that all
+      # of a request's reads see the same snapshot; None if none is healthy.
+      if 'replica_key' not in g:
+        g.replica_key = self._next_healthy()
+        if g.replica_key is not None:
+          with self._lock:
+            self.replicas[g.replica_key]['reads'] += 1
+      return None if g.replica_key is None else self._engine(g.replica_key)
+
+    def stats(self):
+      now = time.monotonic()
+      with self._lock:
+        return {
+          key: {
+            'url': self._engine(key).url.render_as_string(hide_password=True),
+            'healthy': state['healthy'],
+            'checked_seconds_ago': None if state['checked_at'] is None else round(now - state['checked_at'], 1),
+            'requests': state['reads'],
+            'error': state['error'],
+          }
+          for key, state in self.replicas.items()
+        }
+
+    def _next_healthy(self):
+      for _ in range(len(self.keys)):
+        key = self.keys[next(self._counter) % len(self.keys)]
+        if self._healthy(key):
+          return key
+      return None
+
+    def _healthy(self, key):
+      state = self.replicas[key]
+      checked_at = state['checked_at']
+      if checked_at is None or time.monotonic() - checked_at >= self.check_seconds:
+        self._check(key)
+      return state['healthy']
+
+    def _check(self, key):
+      engine = self._engine(key)
+      error = None
+      try:
+        with engine.connect() as conn:
+          conn.execute(text('SELECT 1'))
+          if self.max_lag is not None and engine.dialect.name == 'postgresql':
+            lag = conn.execute(LAG_QUERY).scalar() or 0
+            if lag > self.max_lag:
+              error = f'replication lag {lag:.1f}s'
+      except Exception as e:
+        error = str(e).strip().splitlines()[0]
+      self._mark(key, error)
+
+    def _mark(self, key, error):
+      with self._lock:
+        state = self.replicas[key]
+        if state['healthy'] != (error is None):
+          if error is None:
+            self.app.logger.warning('Replica %s is back up', key)
+          else:
+            self.app.logger.warning('Replica %s is down: %s', key, error)
+        state.update(healthy=error is None, error=error, checked_at=time.monotonic())
+
+    def _engine(self, key):
+      db = self.app.extensions['sqlalchemy'].db
+      engine = db.get_engine(self.app, bind=key)
+      if not event.contains(engine, 'handle_error', self._on_error):
+        event.listen(engine, 'handle_error', self._on_error)
+      return engine
+
+    def _on_error(self, context):
+      if context.is_disconnect:
+        for key in self.keys:
+          if self._engine(key) is context.engine:
+            self._mark(key, str(context.original_exception).strip().splitlines()[0])
+
+    def _stick_after_write(self, response):
+      if request.method not in READ_METHODS | {'OPTIONS'}:
+        session[STICKY_KEY] = time.time() + self.sticky_seconds
+      return response
+
+
+def use_primary():
+  # Sends the rest of the current request's reads to the primary.
+  g.use_primary = True
+
+
+replica_router = ReplicaRouter()
@@ -0,0 +1,143 @@
+import json
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from exporter import buffered_chunks, parse_date
+from models import db, Artist, Show, Venue, has_genre
+
+#----------------------------------------------------------------------------#
+# Show calendar.
+#----------------------------------------------------------------------------#
+
+# Shows starting in a window of time, optionally only those at venues in a
+# city and/or state and by artists of a genre, for the calendar page and its
+# JSON and iCalendar feeds. Rows are read through a server-side cursor like the
+# exporter's and serialized as they arrive, so a wide window costs no more
+# memory than a narrow one.
+#
+# Without a place, the window is a range scan of the (start_time, id) index.
+# With one, the (state, city) index on Venue finds the venues (cities match
+# case-insensitively, so by state only) and each one's shows in the window
+# come from the (venue_id, start_time) index.
+
+
+def calendar_window(start=None, end=None, default_days=7, max_days=92):
+  # The (start, end) datetimes for ISO date/datetime strings `start` and `end`,
+  # either of which may be None. A date alone means midnight, and `end` is
+  # exclusive, so start=2026-10-24&end=2026-10-26 is a weekend. Raises
+  # ValueError for unparseable or inverted windows, or ones over max_days.
+  start = parse_date(start) or datetime.combine(datetime.now().date(), time())
+  end = parse_date(end) or start + timedelta(days=default_days)
+  if end <= start:
+    raise ValueError('The calendar window must end after it starts.')
+  if end - start > timedelta(days=max_days):
+    raise ValueError(f'The calendar window can span at most {max_days} days.')
+  return start, end
+
+
+def calendar_query(start, end, city=None, state=None, genre=None):
+  query = (
+    select(
+      Show.id,
+      Show.start_time,
+      Show.end_time,
+      Show.updated_at,
+      Venue.id.label('venue_id'),
+      Venue.name.label('venue_name'),
+      Venue.address.label('venue_address'),
+      Venue.city.label('venue_city'),
+      Venue.state.label('venue_state'),
+      Artist.id.label('artist_id'),
+      Artist.name.label('artist_name'),
+      Artist.image_link.label('artist_image_link'))
+      .join(Venue, Show.venue_id == Venue.id)
+      .join(Artist, Show.artist_id == Artist.id)
+      .where(Show.start_time >= start, Show.start_time < end)
+  )
+  if state:
+    query = query.where(Venue.state == state)
+  if city:
+    query = query.where(func.lower(Venue.city) == city.lower())
+  if genre:
+    query = query.where(has_genre(Artist, [genre]))
+  return query.order_by(Show.start_time, Show.id)
+
+
+def calendar_rows(start, end, city=None, state=None, genre=None, yield_per=500):
+  result = db.session.execute(
+    calendar_query(start, end, city, state, genre), execution_options={'stream_results': True}
+  )
+  yield from result.yield_per(yield_per)
+
+
+#----------------------------------------------------------------------------#
+# Feeds.
+#----------------------------------------------------------------------------#
+
+def json_chunks(rows, start, end):
+  # {"start": ..., "end": ..., "shows": [...]} as a stream of bytes chunks.
+  return buffered_chunks(_json_parts(rows, start, end))
+
+
+def _json_parts(rows, start, end):
+  yield f'{{"start": "{start.isoformat()}", "end": "{end.isoformat()}", "shows": ['
+  separator = ''
+  for row in rows:
+    show = row._asdict()
+    del show['updated_at']
+    show['start_time'] = show['start_time'].isoformat()
+    show['end_time'] = show['end_time'].isoformat()
+    yield separator + json.dumps(show)
+    separator = ', '
+  yield ']}\n'
+
+
+def ics_chunks(rows, url, name='Fyyur shows'):
+  # An iCalendar (RFC 5545) feed with one event per show, as a stream of
+  # bytes chunks. url(row) is the event's link. Start times are naive, so
+  # events are in "floating" time: the same wall-clock time in every zone.
+  return buffered_chunks(_ics_lines(rows, url, name))
+
+
+def _ics_lines(rows, url, name):
+  yield from _ics_fold(
+    'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Fyyur//Show calendar//EN',
+    'CALSCALE:GREGORIAN', f'X-WR-CALNAME:{_ics_text(name)}',
+  )
+  for row in rows:
+    yield from _ics_fold(
+      'BEGIN:VEVENT',
+      f'UID:show-{row.id}@fyyur',
+      f'DTSTAMP:{row.updated_at.replace(tzinfo=timezone.utc):%Y%m%dT%H%M%SZ}',
+      f'DTSTART:{row.start_time:%Y%m%dT%H%M%S}',
+      f'DTEND:{row.end_time:%Y%m%dT%H%M%S}',
+      f'SUMMARY:{_ics_text(f"{row.artist_name} at {row.venue_name}")}',
+      'LOCATION:' + _ics_text(f'{row.venue_name}, {row.venue_address}, {row.venue_city}, {row.venue_state}'),
+      f'URL:{url(row)}',
+      'END:VEVENT',
+    )
+  yield 'END:VCALENDAR\r\n'
+
+
+def _ics_text(value):
+  return (
+    value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+      .replace('\r\n', '\\n').replace('\n', '\\n')
+  )
+
+
+def _ics_fold(*lines):
+  # Content lines end in CRLF and are folded to at most 75 octets, each
+  # continuation starting with a space; folds never split a UTF-8 sequence.
+  for line in lines:
+    data = line.encode()
+    parts, limit = [], 75
+    while len(data) > limit:
+      cut = limit
+      while (data[cut] & 0xC0) == 0x80:
+        cut -= 1
+      parts.append(data[:cut].decode())
+      data, limit = data[cut:], 74
+    parts.append(data.decode())
+    yield '\r\n '.join(parts) + '\r\n'
@@ -0,0 +1,81 @@
+from sqlalchemy import case, func, or_, select
+
+from forms import genre_choices
+from models import db, has_genre
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+# Venues and artists (but not archived ones, see retire.py) are matched on
+# name, city, state and genres, and ranked:
+#   0 - exact name match
+#   1 - name starts with the term
+#   2 - name contains the term
+#   3 - city contains the term, or state is the term
+#   4 - a genre contains the term
+# ties are broken by name. This runs as one query, which returns only the
+# `limit` best rows and the total. On PostgreSQL the pg_trgm GIN indexes on
+# name/city and the genre association indexes back it. Elsewhere (e.g. SQLite)
+# the LIKE conditions scan the table in the database, and nothing is loaded
+# into the process. SQLite only folds ASCII case.
+
+EXACT, PREFIX, NAME, LOCATION, GENRE = range(5)
+
+
+def search(model, term, limit=50):
+  # Returns (total matches, up to `limit` ranked results); each result has an
+  # id, a name and its num_upcoming_shows (from the rollup).
+  term = term.strip()
+  return search_results(db.session.execute(search_query(model, term, limit)).all())
+
+
+def matching_genres(term):
+  # The known genres a term refers to, e.g. "rock" -> ["Rock n Roll"].
+  term = term.lower()
+  return [genre for genre, _ in genre_choices if term and term in genre.lower()]
+
+
+def search_query(model, term, limit=50):
+  # The ranked search as one statement; search_results() shapes its rows.
+  name_match = model.name.ilike(_like_pattern(term, prefix=False), escape='\\')
+  prefix_match = model.name.ilike(_like_pattern(term, prefix=True), escape='\\')
+  location_match = or_(
+    model.city.ilike(_like_pattern(term, prefix=False), escape='\\'),
+    model.state == term.upper()
+  )
+  conditions = [name_match, location_match]
+  genres = matching_genres(term)
+  if genres:
+    conditions.append(has_genre(model, genres))
+
+  rank = case(
+    (func.lower(model.name) == term.lower(), EXACT),
+    (prefix_match, PREFIX),
+    (name_match, NAME),
+    (location_match, LOCATION),
+    else_=GENRE
+  )
+  return (
+    select(
+      model.id,
+      model.name,
+      model.upcoming_shows_count.label('num_upcoming_shows'),
+      func.count().over().label('total'))
+      .where(model.archived_at.is_(None), or_(*conditions))
+      .order_by(rank, model.name)
+      .limit(limit)
+  )
+
+
+def search_results(rows):
+  total = rows[0].total if rows else 0
+  return total, [
+    {'id': row.id, 'name': row.name, 'num_upcoming_shows': row.num_upcoming_shows}
+    for row in rows
+  ]
+
+
+def _like_pattern(term, prefix):
+  escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+  return f'{escaped}%' if prefix else f'%{escaped}%'
@@ -2,3 +2,26 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// search-as-you-type: fill the search box's <datalist> from its autocomplete endpoint
+document.querySelectorAll('input[data-autocomplete]').forEach(function(input) {
+  var list = document.getElementById(input.getAttribute('list'));
+  var pending = null;
+  input.addEventListener('input', function() {
+    var q = input.value.trim();
+    if (!q) { list.innerHTML = ''; return; }
+    clearTimeout(pending);
+    pending = setTimeout(function() {
+      fetch(input.dataset.autocomplete + '?q=' + encodeURIComponent(q))
+        .then(function(response) { return response.json(); })
+        .then(function(data) {
+          list.innerHTML = '';
+          data.results.forEach(function(result) {
+            var option = document.createElement('option');
+            option.value = result.name;
+            list.appendChild(option);
+          });
+        });
+    }, 100);
+  });
+});
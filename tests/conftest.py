@@ -0,0 +1,79 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from app import create_app
+from models import db, Artist, Show, Venue
+
+#----------------------------------------------------------------------------#
+# Fixtures.
+#----------------------------------------------------------------------------#
+
+# Each test gets an app on a fresh SQLite file, built from config.py with the
+# overrides below (and any from make_app's keyword arguments).
+
+def test_config(**overrides):
+  values = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+  values.update(
+    DEBUG=True, TESTING=True, WTF_CSRF_ENABLED=False, SECRET_KEY='test',
+    SQLALCHEMY_BINDS={}, SQLALCHEMY_ENGINE_OPTIONS={}, CACHE_BACKEND='memory',
+    CACHE_SETTLE_SECONDS=0, METRICS_DIR=None,
+  )
+  values.update(overrides)
+  return type('TestConfig', (), values)
+
+
+@pytest.fixture
+def make_app(tmp_path):
+  apps = []
+
+  def make_app(**overrides):
+    overrides.setdefault('SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "fyyur.db"}')
+    app = create_app(test_config(**overrides))
+    with app.app_context():
+      db.create_all()
+    apps.append(app)
+    return app
+
+  yield make_app
+  for app in apps:
+    with app.app_context():
+      db.session.remove()
+      db.get_engine(app).dispose()
+
+
+@pytest.fixture
+def app(make_app):
+  return make_app()
+
+
+@pytest.fixture
+def client(app):
+  return app.test_client()
+
+
+@pytest.fixture
+def seed(app):
+  # A venue and an artist with one upcoming and one past show; returns their
+  # ids as {'venue': id, 'artist': id}.
+  with app.app_context():
+    venue = Venue(
+      name='The Musical Hop', address='1015 Folsom Street', city='San Francisco', state='CA', genres=['Jazz'],
+      facebook_link='https://www.facebook.com/TheMusicalHop')
+    artist = Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock n Roll'])
+    db.session.add_all([venue, artist])
+    db.session.flush()
+    now = datetime.now()
+    db.session.add_all([
+      Show(venue_id=venue.id, artist_id=artist.id, start_time=now + timedelta(days=3)),
+      Show(venue_id=venue.id, artist_id=artist.id, start_time=now - timedelta(days=3)),
+    ])
+    db.session.commit()
+    ids = {'venue': venue.id, 'artist': artist.id}
+    db.session.remove()
+    return ids
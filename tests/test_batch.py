@@ -0,0 +1,70 @@
+from importer import IMPORTERS, ArtistImporter, import_file
+from models import db, Artist, Genre, Venue
+
+
+def test_batch_creates_and_updates(app, client, seed):
+  response = client.post('/batch', json={
+    'venues': {'update': [{'id': seed['venue'], 'name': 'The Hop'}]},
+    'artists': {'create': [{'name': 'Matt Quevedo', 'city': 'New York', 'state': 'NY', 'genres': ['Jazz']}]},
+  })
+  assert response.status_code == 200, response.json
+  artist_id, = response.json['artists']['created']
+  with app.app_context():
+    assert db.session.get(Venue, seed['venue']).name == 'The Hop'
+    assert db.session.get(Artist, artist_id).genres == ['Jazz']
+
+
+def test_batch_rejects_everything_on_any_error(app, client, seed):
+  response = client.post('/batch', json={
+    'venues': {'update': [{'id': seed['venue'], 'name': 'The Hop'}, {'id': 999, 'name': 'Nowhere'}]},
+  })
+  assert response.status_code == 400
+  assert response.json['errors'][0]['index'] == 1
+  with app.app_context():
+    assert db.session.get(Venue, seed['venue']).name == 'The Musical Hop'
+
+
+def test_batch_rename_clears_counterpart_pages(client, seed):
+  # The artist page lists the venue's name under its shows, so a venue renamed
+  # in a batch has to clear the cached artist pages too.
+  assert b'The Musical Hop' in client.get(f'/artists/{seed["artist"]}').data
+  response = client.post('/batch', json={'venues': {'update': [{'id': seed['venue'], 'name': 'The Hop'}]}})
+  assert response.status_code == 200, response.json
+  page = client.get(f'/artists/{seed["artist"]}').data
+  assert b'The Hop' in page and b'The Musical Hop' not in page
+
+  assert b'Guns N Petals' in client.get(f'/venues/{seed["venue"]}').data
+  response = client.post('/batch', json={'artists': {'update': [{'id': seed['artist'], 'name': 'Petals'}]}})
+  assert response.status_code == 200, response.json
+  page = client.get(f'/venues/{seed["venue"]}').data
+  assert b'Petals' in page and b'Guns N Petals' not in page
+
+
+def test_rejected_batch_leaves_no_genres(app, client, seed):
+  with app.app_context():
+    genres = db.session.query(Genre.name).count()
+  response = client.post('/batch', json={
+    'artists': {'create': [{'name': 'Matt Quevedo', 'city': 'New York', 'state': 'XX', 'genres': ['Jazz']}]},
+  })
+  assert response.status_code == 400
+  with app.app_context():
+    assert db.session.query(Genre.name).count() == genres
+
+
+def test_import_keeps_genres_when_a_batch_is_retried(app, seed, tmp_path, monkeypatch):
+  # An importer that doesn't know the seeded artist lets a duplicate name
+  # reach the database, so the batch fails and is retried row by row.
+  class StaleNamesImporter(ArtistImporter):
+      def __init__(self, rows=None):
+        super().__init__(rows)
+        self.names.clear()
+
+  monkeypatch.setitem(IMPORTERS, 'artists', StaleNamesImporter)
+  path = tmp_path / 'artists.ndjson'
+  path.write_text(
+    '{"name": "Matt Quevedo", "city": "New York", "state": "NY", "genres": ["Blues"]}\n'
+    '{"name": "Guns N Petals", "city": "San Francisco", "state": "CA", "genres": ["Blues"]}\n'
+  )
+  with app.app_context():
+    assert import_file('artists', str(path)) == (1, 1)
+    assert db.session.query(Artist).filter_by(name='Matt Quevedo').one().genres == ['Blues']
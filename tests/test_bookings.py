@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from bookings import check_bookings, existing_shows_queries, owner_ranges
+from models import db, Show
+
+DAY = datetime(2030, 1, 1, 20)
+
+
+def booking(venue_id, artist_id, start, hours=2):
+  return {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start, 'end_time': start + timedelta(hours=hours)}
+
+
+def test_ranges_are_per_owner_and_merged_only_when_close():
+  bookings = [
+    booking(1, 1, DAY),
+    booking(1, 2, DAY + timedelta(hours=3)),
+    booking(1, 1, DAY + timedelta(days=90)),
+  ]
+  ranges = {(column.key, owner_id, start, end) for column, owner_id, start, end in owner_ranges(bookings)}
+  assert ranges == {
+    ('venue_id', 1, DAY, DAY + timedelta(hours=5)),
+    ('venue_id', 1, DAY + timedelta(days=90), DAY + timedelta(days=90, hours=2)),
+    ('artist_id', 1, DAY, DAY + timedelta(hours=2)),
+    ('artist_id', 1, DAY + timedelta(days=90), DAY + timedelta(days=90, hours=2)),
+    ('artist_id', 2, DAY + timedelta(hours=3), DAY + timedelta(hours=5)),
+  }
+  assert len(list(existing_shows_queries(bookings, per_query=2))) == 3
+
+
+def test_bookings_months_apart_skip_the_schedule_between(app, seed):
+  venue_id, artist_id = seed['venue'], seed['artist']
+  with app.app_context():
+    db.session.add_all(
+      Show(venue_id=venue_id, artist_id=artist_id, start_time=DAY + timedelta(days=day)) for day in range(1, 90)
+    )
+    db.session.commit()
+    bookings = [booking(venue_id, artist_id, DAY), booking(venue_id, artist_id, DAY + timedelta(days=90))]
+    # Neither booking's range reaches the 89 shows between them.
+    assert [row for query in existing_shows_queries(bookings) for row in db.session.execute(query)] == []
+
+    conflicts = check_bookings([
+      booking(venue_id, artist_id + 1, DAY + timedelta(days=89, hours=1)),
+      booking(venue_id + 1, artist_id, DAY + timedelta(days=60, hours=1)),
+      booking(venue_id + 1, artist_id + 1, DAY + timedelta(days=60, hours=3)),
+      booking(venue_id + 1, artist_id + 1, DAY + timedelta(days=60, hours=4)),
+    ], lock=True)
+    show_89, show_60 = (
+      db.session.query(Show.id).filter(Show.start_time == DAY + timedelta(days=day)).scalar() for day in (89, 60)
+    )
+    assert [sorted(booking_conflicts, key=repr) for booking_conflicts in conflicts] == [
+      [{'on': 'venue', 'show_id': show_89}],
+      [{'on': 'artist', 'show_id': show_60}],
+      [{'on': 'artist', 'booking': 3}, {'on': 'venue', 'booking': 3}],
+      [{'on': 'artist', 'booking': 2}, {'on': 'venue', 'booking': 2}],
+    ]
@@ -0,0 +1,147 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+
+import cache
+from cache import MemoryBackend, RedisBackend, ViewCache
+from models import db, Show, Venue
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request):
+  if request.param == 'memory':
+    return MemoryBackend()
+  return RedisBackend(fakeredis.FakeRedis())
+
+
+def make_cache(backend):
+  view_cache = ViewCache()
+  view_cache.backend = backend
+  view_cache.timeout = 300
+  return view_cache
+
+
+def test_memory_backend_evicts_least_recently_used():
+  backend = MemoryBackend(max_entries=2)
+  backend.set('a', 1)
+  backend.set('b', 2)
+  assert backend.get_many(['a']) == [1]
+  backend.set('c', 3)
+  assert backend.get_many(['a', 'b', 'c']) == [1, None, 3]
+
+
+def test_memory_backend_expires_entries(monkeypatch):
+  now = [1000.0]
+  monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+  backend = MemoryBackend()
+  backend.set('a', 1, timeout=10)
+  backend.set('b', 2)
+  now[0] += 10
+  assert backend.get_many(['a', 'b']) == [None, 2]
+
+
+def test_redis_backend_expires_entries():
+  client = fakeredis.FakeRedis()
+  backend = RedisBackend(client)
+  backend.set('a', {'name': 'The Hop'}, timeout=10)
+  assert backend.get_many(['a', 'b']) == [{'name': 'The Hop'}, None]
+  assert 0 < client.ttl('fyyur:a') <= 10
+  backend.delete('a')
+  assert backend.get_many(['a']) == [None]
+
+
+def test_invalidating_a_namespace_misses_only_its_entries(backend):
+  view_cache = make_cache(backend)
+  loads = []
+
+  def loader(value):
+    return lambda: loads.append(value) or value
+
+  assert view_cache.get_or_set('venue:1', ['venue:1', 'venues'], loader('v1')) == 'v1'
+  assert view_cache.get_or_set('artist:1', ['artist:1'], loader('a1')) == 'a1'
+  assert view_cache.get_or_set('venue:1', ['venue:1', 'venues'], loader('stale')) == 'v1'
+
+  view_cache.invalidate('venues')
+  assert view_cache.get_or_set('venue:1', ['venue:1', 'venues'], loader('v2')) == 'v2'
+  assert view_cache.get_or_set('artist:1', ['artist:1'], loader('stale')) == 'a1'
+  assert loads == ['v1', 'a1', 'v2']
+  assert (view_cache.hits, view_cache.misses) == (2, 3)
+
+
+def test_evicted_namespace_version_misses(backend):
+  # A lost version token is replaced by a new one, never resurrecting old entries.
+  view_cache = make_cache(backend)
+  view_cache.get_or_set('venues', ['venues'], lambda: 'old')
+  backend.delete('ns:venues')
+  assert view_cache.get_or_set('venues', ['venues'], lambda: 'new') == 'new'
+
+
+def test_unsettled_namespace_is_not_stored(backend):
+  view_cache = make_cache(backend)
+  view_cache.settle_seconds = 60
+  view_cache.invalidate('venues')
+  assert view_cache.get_or_set('venues', ['venues'], lambda: 'first') == 'first'
+  assert view_cache.get_or_set('venues', ['venues'], lambda: 'second') == 'second'
+
+
+def test_listeners_are_registered_once(make_app, seed):
+  make_app()
+  app = make_app()
+  view_cache = app.extensions['view_cache']
+  invalidations = []
+  invalidate = view_cache.invalidate
+  view_cache.invalidate = lambda *namespaces: invalidations.append(namespaces) or invalidate(*namespaces)
+  try:
+    with app.app_context():
+      db.session.get(Venue, seed['venue']).name = 'The Hop'
+      db.session.commit()
+  finally:
+    del view_cache.invalidate
+  assert len(invalidations) == 1
+
+
+def test_commit_invalidates_and_rollback_discards(app, seed):
+  view_cache = app.extensions['view_cache']
+  with app.app_context():
+    view_cache.get_or_set(f'venue:{seed["venue"]}', [f'venue:{seed["venue"]}'], lambda: 'cached')
+    db.session.get(Venue, seed['venue']).name = 'The Hop'
+    db.session.flush()
+    db.session.rollback()
+    assert view_cache.get_or_set(f'venue:{seed["venue"]}', [f'venue:{seed["venue"]}'], lambda: 'new') == 'cached'
+
+    db.session.get(Venue, seed['venue']).name = 'The Hop'
+    db.session.commit()
+    assert view_cache.get_or_set(f'venue:{seed["venue"]}', [f'venue:{seed["venue"]}'], lambda: 'new') == 'new'
+
+
+def test_disabling_the_cache_drops_the_previous_backend(make_app):
+  make_app()
+  app = make_app(CACHE_BACKEND=None)
+  assert app.extensions['view_cache'].backend is None
+  assert app.extensions['view_cache'].get_or_set('venues', ['venues'], lambda: 'loaded') == 'loaded'
+
+
+def test_pages_miss_when_data_changes_without_an_invalidation(app, client, seed, tmp_path):
+  # Another process's write never invalidates this process's memory cache,
+  # but the page's data version changes and is part of the key.
+  path = f'/venues/{seed["venue"]}'
+  old = client.get(path)
+  assert b'The Musical Hop' in old.data
+  with sqlite3.connect(tmp_path / 'fyyur.db') as conn:
+    conn.execute('UPDATE "Venue" SET name = ?, updated_at = ?', ('The Hop', datetime.utcnow() + timedelta(seconds=1)))
+  new = client.get(path, headers={'If-None-Match': old.headers['ETag']})
+  assert new.status_code == 200
+  assert b'The Hop' in new.data and b'The Musical Hop' not in new.data
+
+
+def test_pages_miss_when_a_show_starts(app, client, seed):
+  with app.app_context():
+    db.session.add(Show(venue_id=seed['venue'], artist_id=seed['artist'], start_time=datetime.now() + timedelta(seconds=1)))
+    db.session.commit()
+  assert b'2 Upcoming Shows' in client.get(f'/venues/{seed["venue"]}').data
+  time.sleep(1.1)
+  page = client.get(f'/venues/{seed["venue"]}').data
+  assert b'1 Upcoming Show' in page and b'2 Past Shows' in page
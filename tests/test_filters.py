@@ -0,0 +1,26 @@
+from datetime import datetime
+
+import babel.dates
+import pytest
+
+from filters import format_datetime, format_datetimes
+
+WHEN = datetime(2030, 5, 21, 21, 30)
+
+
+@pytest.mark.parametrize('locale', ['en', 'de', 'fr'])
+@pytest.mark.parametrize('format', ['short', 'long'])
+def test_babel_named_formats_match_babel(format, locale):
+  assert format_datetime(WHEN, format, locale) == babel.dates.format_datetime(WHEN, format, locale=locale)
+
+
+def test_app_formats_and_patterns():
+  assert format_datetime(WHEN, 'full') == 'Tuesday May, 21, 2030 at 9:30PM'
+  assert format_datetime(WHEN) == 'Tue 05, 21, 2030 9:30PM'
+  assert format_datetime('2030-05-21T21:30:00', 'yyyy-MM-dd HH:mm') == '2030-05-21 21:30'
+
+
+def test_format_datetimes_formats_a_column():
+  values = [WHEN, WHEN, '2030-05-22 10:00']
+  assert format_datetimes(values, 'short') == ['5/21/30, 9:30 PM', '5/21/30, 9:30 PM', '5/22/30, 10:00 AM']
+  assert format_datetimes(values) == [format_datetime(value) for value in values]
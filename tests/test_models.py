@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from models import db, Artist, Show, Venue, load_show_partitions
+
+
+def test_show_partitions_load_in_one_query_and_match_the_counts(app, seed):
+  with app.app_context():
+    venues = db.session.query(Venue).all()
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+    load_show_partitions(venues)
+    assert [(len(venue.past_shows), len(venue.upcoming_shows)) for venue in venues] == [(1, 1)]
+    assert len(statements) == 1
+
+    counts = db.session.query(Venue.num_past_shows, Venue.num_upcoming_shows).filter(Venue.id == seed['venue']).one()
+    assert tuple(counts) == (venues[0].num_past_shows, venues[0].num_upcoming_shows) == (1, 1)
+    assert db.session.query(Artist.id).filter(Artist.num_upcoming_shows > 0).all() == [(seed['artist'],)]
+
+
+def test_show_partitions_are_forgotten_when_shows_are_written(app, seed):
+  with app.app_context():
+    venue = db.session.get(Venue, seed['venue'])
+    assert len(venue.upcoming_shows) == 1
+    show = Show(venue_id=venue.id, artist_id=seed['artist'], start_time=datetime.now() + timedelta(days=5))
+    db.session.add(show)
+    db.session.flush()
+    assert len(venue.upcoming_shows) == 2
+    db.session.rollback()
+    assert len(venue.upcoming_shows) == 1
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Show, encode_show_cursor, show_page
+
+
+@pytest.fixture
+def show_ids(app, seed):
+  # The seeded past and upcoming shows, then five starting at the same time,
+  # so pages after the first break their ties on id.
+  with app.app_context():
+    tied = datetime.now() + timedelta(days=10)
+    db.session.add_all(Show(venue_id=seed['venue'], artist_id=seed['artist'], start_time=tied) for _ in range(5))
+    db.session.commit()
+    return [show_id for show_id, in db.session.query(Show.id).order_by(Show.start_time, Show.id)]
+
+
+def page(after=None, before=None):
+  rows, next_cursor, prev_cursor = show_page(after=after, before=before, per_page=3)
+  return [row.id for row in rows], next_cursor, prev_cursor
+
+
+def cursor(show_id):
+  return encode_show_cursor(db.session.get(Show, show_id))
+
+
+def test_forward_pages_walk_the_tied_shows_once(app, show_ids):
+  with app.app_context():
+    first, next_cursor, prev_cursor = page()
+    assert (first, prev_cursor) == (show_ids[:3], None)
+    assert next_cursor == cursor(show_ids[2])
+
+    second, next_cursor, prev_cursor = page(after=next_cursor)
+    assert second == show_ids[3:6]
+    assert (prev_cursor, next_cursor) == (cursor(show_ids[3]), cursor(show_ids[5]))
+
+    last, next_cursor, prev_cursor = page(after=next_cursor)
+    assert (last, next_cursor, prev_cursor) == (show_ids[6:], None, cursor(show_ids[6]))
+
+
+def test_backward_pages_come_back_in_order(app, show_ids):
+  with app.app_context():
+    middle, next_cursor, prev_cursor = page(before=cursor(show_ids[6]))
+    assert middle == show_ids[3:6]
+    assert (prev_cursor, next_cursor) == (cursor(show_ids[3]), cursor(show_ids[5]))
+
+    first, next_cursor, prev_cursor = page(before=prev_cursor)
+    assert (first, prev_cursor, next_cursor) == (show_ids[:3], None, cursor(show_ids[2]))
+
+
+def test_shows_view_links_pages_and_rejects_bad_cursors(client, show_ids):
+  page = client.get('/shows?per_page=3').get_data(as_text=True)
+  assert 'Later' in page and 'Earlier' not in page
+  assert client.get('/shows?after=not-a-cursor').status_code == 400
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from models import db, Artist, Show, ShowRollup, Venue
+from retire import delete_owners
+from rollups import advance, rebuild
+
+
+def counts(model, owner_id):
+  owner = db.session.get(model, owner_id)
+  return owner.upcoming_shows_count, owner.past_shows_count
+
+
+def assert_counts_match_rebuild():
+  # Recounting from the Show table at the current boundary changes nothing.
+  past_before = db.session.get(ShowRollup, 1).past_before
+  assert rebuild(db.session, past_before) == 0
+  db.session.rollback()
+
+
+def test_counts_follow_orm_writes(app, seed):
+  with app.app_context():
+    assert counts(Venue, seed['venue']) == counts(Artist, seed['artist']) == (1, 1)
+    show = Show(venue_id=seed['venue'], artist_id=seed['artist'], start_time=datetime.now() + timedelta(days=5))
+    db.session.add(show)
+    db.session.commit()
+    assert counts(Venue, seed['venue']) == (2, 1)
+    assert_counts_match_rebuild()
+
+    show.start_time = datetime.now() - timedelta(days=5)
+    db.session.commit()
+    assert counts(Venue, seed['venue']) == counts(Artist, seed['artist']) == (1, 2)
+    assert_counts_match_rebuild()
+
+    db.session.delete(show)
+    db.session.commit()
+    assert counts(Venue, seed['venue']) == counts(Artist, seed['artist']) == (1, 1)
+    assert_counts_match_rebuild()
+
+
+def test_counts_follow_batches_and_retired_owners(app, client, seed):
+  start_time = (datetime.now() + timedelta(days=7)).isoformat(timespec='seconds')
+  response = client.post('/batch', json={
+    'artists': {'create': [{'name': 'Matt Quevedo', 'city': 'New York', 'state': 'NY', 'genres': ['Jazz']}]},
+  })
+  assert response.status_code == 200, response.json
+  artist_id, = response.json['artists']['created']
+  response = client.post('/batch', json={
+    'shows': {'create': [{'venue_id': seed['venue'], 'artist_id': artist_id, 'start_time': start_time}]},
+  })
+  assert response.status_code == 200, response.json
+  with app.app_context():
+    assert counts(Venue, seed['venue']) == (2, 1)
+    assert counts(Artist, artist_id) == (1, 0)
+    assert_counts_match_rebuild()
+
+    delete_owners(db.session, Artist, [seed['artist']])
+    db.session.commit()
+    assert counts(Venue, seed['venue']) == (1, 0)
+    assert_counts_match_rebuild()
+
+
+def test_advance_moves_started_shows_to_past(app, seed):
+  with app.app_context():
+    soon = db.session.get(ShowRollup, 1).past_before + timedelta(minutes=1)
+    db.session.add(Show(venue_id=seed['venue'], artist_id=seed['artist'], start_time=soon))
+    db.session.commit()
+    assert counts(Venue, seed['venue']) == (2, 1)
+
+    assert advance(db.session, soon + timedelta(minutes=1)) == 1
+    db.session.commit()
+    assert counts(Venue, seed['venue']) == counts(Artist, seed['artist']) == (1, 2)
+    assert_counts_match_rebuild()
+    assert advance(db.session, soon + timedelta(minutes=2)) == 0
+
+
+def test_rebuild_repairs_drifted_counts(app, seed):
+  with app.app_context():
+    db.session.get(Venue, seed['venue']).upcoming_shows_count = 7
+    db.session.commit()
+    assert rebuild(db.session, db.session.get(ShowRollup, 1).past_before) == 1
+    db.session.commit()
+    assert counts(Venue, seed['venue']) == (1, 1)
@@ -0,0 +1,58 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from models import db, Venue
+
+
+@pytest.fixture
+def routed_app(make_app, seed, tmp_path):
+  # The primary and a copy of it as replica, told apart by the venue's name.
+  replica = tmp_path / 'replica.db'
+  shutil.copy(tmp_path / 'fyyur.db', replica)
+  with sqlite3.connect(replica) as conn:
+    conn.execute('UPDATE "Venue" SET name = ?', ('The Replica Hop',))
+  return make_app(SQLALCHEMY_BINDS={'replica_0': f'sqlite:///{replica}'}, CACHE_BACKEND=None)
+
+
+def venue_name(app, venue_id, method):
+  with app.test_request_context(method=method):
+    return db.session.get(Venue, venue_id).name
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(routed_app, seed):
+  assert venue_name(routed_app, seed['venue'], 'GET') == 'The Replica Hop'
+  assert venue_name(routed_app, seed['venue'], 'HEAD') == 'The Replica Hop'
+  assert venue_name(routed_app, seed['venue'], 'POST') == 'The Musical Hop'
+  with routed_app.app_context():
+    assert db.session.get(Venue, seed['venue']).name == 'The Musical Hop'
+  assert routed_app.extensions['replica_router'].stats()['replica_0']['requests'] == 2
+
+
+def test_flushes_in_read_requests_go_to_the_primary(routed_app, seed):
+  with routed_app.test_request_context(method='GET'):
+    db.session.get(Venue, seed['venue']).name = 'The Hop'
+    db.session.flush()
+    db.session.commit()
+  with routed_app.app_context():
+    assert db.session.get(Venue, seed['venue']).name == 'The Hop'
+  assert venue_name(routed_app, seed['venue'], 'GET') == 'The Replica Hop'
+
+
+def test_writers_read_their_own_writes_from_the_primary(routed_app, seed):
+  client = routed_app.test_client()
+  assert b'The Replica Hop' in client.get(f'/venues/{seed["venue"]}').data
+  response = client.post('/batch', json={'venues': {'update': [{'id': seed['venue'], 'name': 'The Hop'}]}})
+  assert response.status_code == 200, response.json
+  assert b'The Hop' in client.get(f'/venues/{seed["venue"]}').data
+  assert b'The Replica Hop' in routed_app.test_client().get(f'/venues/{seed["venue"]}').data
+
+
+def test_unhealthy_replica_falls_back_to_the_primary(routed_app, seed, tmp_path):
+  with routed_app.app_context():
+    db.get_engine(routed_app, bind='replica_0').dispose()
+  (tmp_path / 'replica.db').unlink()
+  (tmp_path / 'replica.db').mkdir()
+  assert venue_name(routed_app, seed['venue'], 'GET') == 'The Musical Hop'
+  assert routed_app.extensions['replica_router'].stats()['replica_0']['healthy'] is False
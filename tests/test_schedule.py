@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from schedule import _ics_fold, _ics_text, ics_chunks
+
+
+def test_ics_text_escapes_separators_and_newlines():
+  assert _ics_text('Rock; Roll, and\\more\r\nnext\nline') == 'Rock\\; Roll\\, and\\\\more\\nnext\\nline'
+
+
+def test_ics_fold_keeps_lines_within_75_octets():
+  folded, = _ics_fold('SUMMARY:' + 'x' * 200)
+  lines = folded.split('\r\n')
+  assert folded.endswith('\r\n') and lines[-1] == ''
+  assert [len(line.encode()) for line in lines[:-1]] == [75, 75, 60]
+  assert all(line.startswith(' ') for line in lines[1:-1])
+  assert ''.join(line[1:] if i else line for i, line in enumerate(lines[:-1])) == 'SUMMARY:' + 'x' * 200
+
+
+def test_ics_fold_never_splits_a_utf8_sequence():
+  value = 'SUMMARY:' + 'é' * 100
+  folded, = _ics_fold(value)
+  lines = folded.split('\r\n')[:-1]
+  assert all(len(line.encode()) <= 75 for line in lines)
+  assert ''.join(line[1:] if i else line for i, line in enumerate(lines)) == value
+  assert list(_ics_fold('SHORT:line')) == ['SHORT:line\r\n']
+
+
+def test_ics_feed_events():
+  start = datetime(2030, 5, 21, 21, 30)
+  row = SimpleNamespace(
+    id=7, start_time=start, end_time=start + timedelta(hours=2), updated_at=datetime(2030, 1, 1, 12),
+    artist_name='Guns N Petals', venue_name='The Musical Hop', venue_address='1015 Folsom Street',
+    venue_city='San Francisco', venue_state='CA',
+  )
+  feed = b''.join(ics_chunks([row], lambda row: f'http://fyyur.test/venues/{row.id}')).decode()
+  assert feed.startswith('BEGIN:VCALENDAR\r\n') and feed.endswith('END:VCALENDAR\r\n')
+  assert '\r\nDTSTART:20300521T213000\r\nDTEND:20300521T233000\r\n' in feed
+  assert '\r\nDTSTAMP:20300101T120000Z\r\n' in feed
+  assert '\r\nLOCATION:The Musical Hop\\, 1015 Folsom Street\\, San Francisco\\, CA\r\n' in feed
+
+
+def test_calendar_ignores_a_format_argument_and_matches_cities_in_any_case(client, seed):
+  response = client.get('/shows/calendar?format=x&city=san%20FRANCISCO')
+  page = response.get_data(as_text=True)
+  assert response.status_code == 200
+  assert '</html>' in page and 'Guns N Petals' in page
+  assert '/shows/calendar.ics?city=san+FRANCISCO' in page
+  feed = client.get('/shows/calendar.json?city=SAN%20francisco&state=ca').json
+  assert [show['artist_name'] for show in feed['shows']] == ['Guns N Petals']
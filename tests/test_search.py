@@ -0,0 +1,19 @@
+from models import db, Artist
+from search import search
+
+
+def test_search_ranks_and_limits(app):
+  with app.app_context():
+    for name, city, state in [
+      ('Hop', 'Austin', 'TX'), ('The Musical Hop', 'Austin', 'TX'), ('Hoppers', 'Austin', 'TX'),
+      ('Sax Band', 'Hopkins', 'MN'), ('50% Off', 'Austin', 'TX'),
+    ]:
+      db.session.add(Artist(name=name, city=city, state=state, genres=['Jazz']))
+    db.session.commit()
+
+    total, results = search(Artist, ' hop ')
+    assert total == 4
+    assert [result['name'] for result in results] == ['Hop', 'Hoppers', 'The Musical Hop', 'Sax Band']
+    assert search(Artist, 'hop', limit=2) == (4, results[:2])
+    assert [result['name'] for result in search(Artist, '%')[1]] == ['50% Off']
+    assert search(Artist, 'jazz')[0] == 5
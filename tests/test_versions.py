@@ -0,0 +1,37 @@
+from sqlalchemy import event
+
+from models import db, Artist, Venue
+from models import artist_list_version, show_list_version, venue_directory_version
+from retire import delete_owners
+
+
+def versions():
+  return venue_directory_version()[1], artist_list_version()[1], show_list_version()[1]
+
+
+def test_listing_versions_change_on_deletes(app, seed):
+  with app.app_context():
+    before = versions()
+    delete_owners(db.session, Artist, [seed['artist']])
+    db.session.commit()
+    after_core_delete = versions()
+    assert all(old != new for old, new in zip(before, after_core_delete))
+
+    db.session.delete(db.session.get(Venue, seed['venue']))
+    db.session.commit()
+    assert all(old != new for old, new in zip(after_core_delete, versions()))
+
+
+def test_listing_versions_count_no_rows(app, seed):
+  statements = []
+  with app.app_context():
+    event.listen(db.engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+    versions()
+  assert len(statements) == 3
+  assert not any('count(' in statement.lower() for statement in statements)
+
+
+def test_unchanged_listing_answers_304(client, seed):
+  for path in ('/venues', '/artists', '/shows'):
+    etag = client.get(path).headers['ETag']
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,99 @@
+import hashlib
+
+from flask import Blueprint, Response, current_app, make_response, request, session, stream_with_context
+
+from lazy import LazyView
+
+#----------------------------------------------------------------------------#
+# Blueprints.
+#----------------------------------------------------------------------------#
+
+# The site's pages, one blueprint per section; create_app() in app.py registers
+# them. Their URL rules are all declared here so that url_for() can build a
+# link to any page, but each view names its handler in views.<section> and that
+# module (with forms, search and the rest it imports) is only loaded when one
+# of its pages is first requested.
+
+pages = Blueprint('pages', __name__)
+venues = Blueprint('venues', __name__)
+artists = Blueprint('artists', __name__)
+shows = Blueprint('shows', __name__)
+batch = Blueprint('batch', __name__)
+blueprints = (pages, venues, artists, shows, batch)
+
+
+def route(blueprint, rule, view, **options):
+  blueprint.add_url_rule(rule, view, LazyView(f'views.{blueprint.name}.{view}'), **options)
+
+
+route(pages, '/', 'index')
+route(pages, '/export/<any(venues, artists, shows):kind>.<any(ndjson, csv):format>', 'export')
+route(pages, '/stats/pool', 'pool_stats')
+route(pages, '/stats/replicas', 'replica_stats')
+route(pages, '/stats/cache', 'cache_stats')
+pages.app_errorhandler(404)(LazyView('views.pages.not_found_error'))
+pages.app_errorhandler(500)(LazyView('views.pages.server_error'))
+
+route(venues, '/venues', 'venues')
+route(venues, '/venues/search', 'search_venues', methods=['POST'])
+route(venues, '/venues/autocomplete', 'autocomplete_venues')
+route(venues, '/venues/<int:venue_id>', 'show_venue')
+route(venues, '/venues/create', 'create_venue_form', methods=['GET'])
+route(venues, '/venues/create', 'create_venue_submission', methods=['POST'])
+route(venues, '/venues/<int:venue_id>', 'delete_venue', methods=['DELETE'])
+route(venues, '/venues/<int:venue_id>/edit', 'edit_venue', methods=['GET'])
+route(venues, '/venues/<int:venue_id>/edit', 'edit_venue_submission', methods=['POST'])
+
+route(artists, '/artists', 'artists')
+route(artists, '/artists/search', 'search_artists', methods=['POST'])
+route(artists, '/artists/autocomplete', 'autocomplete_artists')
+route(artists, '/artists/<int:artist_id>', 'show_artist')
+route(artists, '/artists/<int:artist_id>', 'delete_artist', methods=['DELETE'])
+route(artists, '/artists/<int:artist_id>/edit', 'edit_artist', methods=['GET'])
+route(artists, '/artists/<int:artist_id>/edit', 'edit_artist_submission', methods=['POST'])
+route(artists, '/artists/create', 'create_artist_form', methods=['GET'])
+route(artists, '/artists/create', 'create_artist_submission', methods=['POST'])
+
+route(shows, '/shows', 'shows')
+route(shows, '/shows/create', 'create_shows')
+route(shows, '/shows/create', 'create_show_submission', methods=['POST'])
+route(shows, '/shows/check', 'check_show_bookings', methods=['POST'])
+route(shows, '/shows/calendar', 'calendar')
+route(shows, '/shows/calendar.<any(json, ics):format>', 'calendar_feed')
+
+route(batch, '/batch', 'batch', methods=['POST'])
+
+#----------------------------------------------------------------------------#
+# Conditional requests.
+#----------------------------------------------------------------------------#
+
+def conditional(version, render):
+  # Answers If-None-Match with a 304 when the page's data version is
+  # unchanged, without calling `render`. `version` comes from one of the
+  # *_version() queries in models. Pages with pending flash messages are
+  # always rendered, since the message is part of the page.
+  last_modified, parts = version
+  etag = page_etag(parts)
+  if request.if_none_match.contains_weak(etag) and not session.get('_flashes'):
+    response = Response(status=304)
+  else:
+    response = make_response(render())
+  response.set_etag(etag)
+  response.last_modified = last_modified
+  response.cache_control.no_cache = True
+  return response
+
+def page_etag(parts):
+  return hashlib.sha1(repr((current_app.config['ETAG_SALT'], request.full_path, parts)).encode()).hexdigest()
+
+#----------------------------------------------------------------------------#
+# Streaming.
+#----------------------------------------------------------------------------#
+
+def stream_template(template_name, **context):
+  # render_template() as a streamed Response, sent as the template renders
+  # (in buffered pieces), for pages iterating over large query results.
+  current_app.update_template_context(context)
+  stream = current_app.jinja_env.get_template(template_name).stream(context)
+  stream.enable_buffering(50)
+  return Response(stream_with_context(stream))
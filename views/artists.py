@@ -0,0 +1,261 @@
+import sys
+
+from flask import abort, current_app, flash, jsonify, redirect, render_template, request, url_for
+from sqlalchemy import select
+
+from autocomplete import artist_names
+from cache import view_cache
+from forms import ArtistForm, genre_choices
+from models import db, Artist, artist_list_query
+from models import load_artist_detail, artist_version, artist_list_version
+from retire import delete_owners, retired
+from search import search
+from views import conditional
+from writes import log_write, log_writes
+
+#  Artists
+#  ----------------------------------------------------------------
+def artists():
+  # TODO: replace with real data returned from querying the database [COMPLETED]
+
+  genre = request.args.get('genre') or None
+  version = artist_list_version()
+  return conditional(version, lambda: render_template(
+    'pages/artists.html', genre=genre, genres=genre_choices,
+    artists=view_cache.get_or_set(
+      f'artists:{genre or ""}', ['artists'], lambda: artist_list_data(genre), version=version[1])
+  ))
+
+def artist_list_data(genre=None):
+  return artist_list(db.session.execute(artist_list_query(genre)))
+
+def artist_list(rows):
+  return [{'id': artist.id, 'name': artist.name} for artist in rows]
+
+def search_artists():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive. [COMPLETED]
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  
+  search_term = request.form.get('search_term', '')
+  count, artists_by_search = search(Artist, search_term, limit=current_app.config['SEARCH_RESULTS_LIMIT'])
+  data = {
+    'count': count,
+    'data': artists_by_search
+  }
+
+  return render_template('pages/search_artists.html', results=data, search_term=search_term)
+
+def autocomplete_artists():
+  # answers search-as-you-type prefix queries from the in-process name index
+  limit = max(1, min(request.args.get('limit', 10, type=int), current_app.config['AUTOCOMPLETE_MAX_RESULTS']))
+  return jsonify(results=artist_names.complete(request.args.get('q', ''), limit))
+
+def show_artist(artist_id):
+  # shows the artist page with the given artist_id
+  # TODO: replace with real artist data from the artist table, using artist_id [COMPLETED]
+
+  version = artist_version(artist_id)
+  if version is None:
+    abort(404)
+  return conditional(version, lambda: render_artist_page(artist_id, version[1]))
+
+def render_artist_page(artist_id, version):
+  data = view_cache.get_or_set(
+    f'artist:{artist_id}', [f'artist:{artist_id}', 'artist:*'], lambda: artist_page_data(artist_id),
+    version=version
+  )
+  if data is None:
+    abort(404)
+  return render_template('pages/show_artist.html', artist=data)
+
+def artist_page_data(artist_id):
+  artist, past_shows, upcoming_shows = load_artist_detail(artist_id)
+  if artist is None:
+    return None
+  return artist_data(artist, past_shows, upcoming_shows)
+
+def artist_data(artist, past_shows, upcoming_shows):
+  past_shows_venue_data = [
+    {'venue_id': show.venue_id, 'venue_name': show.venue_name,
+    'venue_image_link': show.venue_image_link, 'start_time': show.start_time}
+    for show in past_shows
+  ]
+  upcoming_shows_venue_data = [
+    {'venue_id': show.venue_id, 'venue_name': show.venue_name,
+    'venue_image_link': show.venue_image_link, 'start_time': show.start_time}
+    for show in upcoming_shows
+  ]
+  data = {
+    'id': artist.id,
+    'name': artist.name,
+    'genres': list(artist.genres),
+    'city': artist.city,
+    'state': artist.state,
+    'phone': artist.phone,
+    'website': artist.website,
+    'facebook_link': artist.facebook_link,
+    'seeking_venue': artist.seeking_venue,
+    'seeking_description': artist.seeking_description,
+    'image_link': artist.image_link,
+    'past_shows': past_shows_venue_data,
+    'upcoming_shows': upcoming_shows_venue_data,
+    'past_shows_count': len(past_shows),
+    'upcoming_shows_count': len(upcoming_shows),
+  }
+  return data
+
+#  Delete
+#  ----------------------------------------------------------------
+def delete_artist(artist_id):
+  # like delete_venue(): the artist's shows go with it in SQL
+  error = False
+  name = db.session.execute(select(Artist.name).where(Artist.id == artist_id)).scalar()
+  if name is None:
+    abort(404)
+
+  try:
+    delete_owners(db.session, Artist, [artist_id])
+    db.session.commit()
+    log_writes('delete', Artist, [{'id': artist_id, 'name': name}])
+    retired(Artist, [artist_id])
+    flash('Artist ' + name + ' was successfully deleted!')
+  except:
+    error = True
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    if error == True:
+      flash('An error occurred. Artist ' + name + ' could not be deleted.')
+
+  return jsonify(success=not error), 500 if error else 200
+
+#  Update
+#  ----------------------------------------------------------------
+def edit_artist(artist_id):
+  form = ArtistForm()
+  artist, _, _ = load_artist_detail(artist_id, with_shows=False)
+  if artist is None:
+    abort(404)
+
+  # TODO: populate form with fields from artist with ID <artist_id> [COMPLETED]
+  form.name.data = artist.name
+  form.city.data = artist.city
+  form.state.data = artist.state
+  form.phone.data = artist.phone
+  form.genres.data = list(artist.genres)
+  form.facebook_link.data = artist.facebook_link
+  form.image_link.data = artist.image_link
+  form.website_link.data = artist.website
+  form.seeking_venue.data = artist.seeking_venue
+  form.seeking_description.data = artist.seeking_description
+
+  return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+def edit_artist_submission(artist_id):
+  # TODO: take values from the form submitted, and update existing [COMPLETED]
+  # artist record with ID <artist_id> using the new attributes
+
+  error = False
+  form = ArtistForm(request.form)
+  artist = db.session.query(Artist).get(artist_id)
+  if form.validate():
+    name = form.name.data
+    city = form.city.data
+    state = form.state.data
+    phone = form.phone.data
+    genres = form.genres.data
+    facebook_link = form.facebook_link.data
+    image_link = form.image_link.data
+    website_link = form.website_link.data
+    seeking_venue = form.seeking_venue.data
+    seeking_description = form.seeking_description.data
+
+  try:
+    artist.name = name
+    artist.city = city
+    artist.state = state
+    artist.phone = phone
+    artist.genres = genres
+    artist.facebook_link = facebook_link
+    artist.image_link = image_link
+    artist.website = website_link
+    artist.seeking_venue = seeking_venue
+    artist.seeking_description = seeking_description
+    db.session.flush()
+    log_write('update', artist)
+    db.session.commit()
+    artist_names.add(artist.id, artist.name)
+    flash(f'Artist, "{artist.name}" was successfully edited!')
+  except:
+    error = True
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    if error == True:
+      flash(f'An error occurred. Artist, "{artist.name}" could not be edited!')
+
+  return redirect(url_for('.show_artist', artist_id=artist_id))
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+def create_artist_form():
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # TODO: insert form data as a new Artist record in the db, instead [COMPLETED]
+  # TODO: modify data to be the data object returned from db insertion [COMPLETED]
+
+  error = False
+  form = ArtistForm(request.form)
+  if form.validate():
+    name = form.name.data
+    city = form.city.data
+    state = form.state.data
+    phone = form.phone.data
+    genres = form.genres.data
+    facebook_link = form.facebook_link.data
+    image_link = form.image_link.data
+    website_link = form.website_link.data
+    seeking_venue = form.seeking_venue.data
+    seeking_description = form.seeking_description.data
+
+  try:
+    new_artist = Artist(
+      name=name,
+      city=city,
+      state=state,
+      phone=phone,
+      genres=genres,
+      facebook_link=facebook_link,
+      image_link=image_link,
+      website=website_link,
+      seeking_venue=seeking_venue,
+      seeking_description=seeking_description
+    )
+    db.session.add(new_artist)
+    db.session.flush()
+    log_write('create', new_artist)
+    db.session.commit()
+    artist_names.add(new_artist.id, new_artist.name)
+    flash('Artist ' + new_artist.name + ' was successfully listed!')
+  except:
+    error = True
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    if error == True:
+      flash('An error occurred. Artist ' + form.name.data + ' could not be listed.')
+
+
+  # on successful db insert, flash success
+  # flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead. [COMPLETED]
+  # e.g., flash('An error occurred. Artist ' + data.name + ' could not be listed.')
+  return render_template('pages/home.html')
@@ -0,0 +1,45 @@
+from flask import current_app, jsonify, request
+from sqlalchemy.exc import DBAPIError
+
+from autocomplete import venue_names, artist_names
+from cache import view_cache
+from models import db
+from writes import MODELS, BatchRejected, apply_batch, batch_items, log_writes
+
+#  Batch writes
+#  ----------------------------------------------------------------
+
+def batch():
+  # creates and updates venues, artists and shows posted as one JSON batch, in
+  # one transaction (see writes.py); responds with their ids, or with every
+  # item's errors and nothing written
+  try:
+    items = batch_items(request.get_json(silent=True))
+  except ValueError as e:
+    return jsonify(error=str(e)), 400
+  count = sum(len(op_items) for ops in items.values() for op_items in ops.values())
+  if count > current_app.config['BATCH_MAX_ITEMS']:
+    return jsonify(error=f'At most {current_app.config["BATCH_MAX_ITEMS"]} items per batch.'), 400
+
+  try:
+    results, written, namespaces = apply_batch(items)
+    db.session.commit()
+  except BatchRejected as e:
+    db.session.rollback()
+    return jsonify(errors=e.args[0]), 400
+  except DBAPIError as e:
+    # e.g. a name taken by a concurrent write
+    db.session.rollback()
+    return jsonify(error=str(e.orig).strip()), 409
+  finally:
+    db.session.close()
+
+  autocomplete = {'venues': venue_names, 'artists': artist_names}
+  for kind, (created, updated) in written.items():
+    log_writes('create', MODELS[kind], created)
+    log_writes('update', MODELS[kind], updated)
+    if kind in autocomplete:
+      for values in created + updated:
+        autocomplete[kind].add(values['id'], values['name'])
+  view_cache.invalidate(*namespaces)
+  return jsonify(results)
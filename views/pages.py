@@ -0,0 +1,41 @@
+from flask import Response, abort, jsonify, render_template, request, stream_with_context
+
+from cache import view_cache
+from dbpool import pool_monitor
+from exporter import export_chunks, parse_date, FORMATS as EXPORT_FORMATS
+from routing import replica_router
+
+def index():
+  return render_template('pages/home.html')
+
+#  Export
+#  ----------------------------------------------------------------
+
+def export(kind, format):
+  # streams the whole table; ?start=&end= bound show start times, ?gzip=1 compresses
+  try:
+    start, end = parse_date(request.args.get('start')), parse_date(request.args.get('end'))
+  except ValueError:
+    abort(400)
+  compress = request.args.get('gzip', type=int) == 1
+  filename = f'{kind}.{format}' + ('.gz' if compress else '')
+  return Response(
+    stream_with_context(export_chunks(kind, format, start, end, compress)),
+    mimetype='application/gzip' if compress else EXPORT_FORMATS[format],
+    headers={'Content-Disposition': f'attachment; filename={filename}'}
+  )
+
+def pool_stats():
+  return jsonify(pool_monitor.stats())
+
+def replica_stats():
+  return jsonify(replica_router.stats())
+
+def cache_stats():
+  return jsonify(view_cache.stats())
+
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+def server_error(error):
+    return render_template('errors/500.html'), 500
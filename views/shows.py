@@ -0,0 +1,177 @@
+import sys
+
+from flask import Response, abort, current_app, flash, jsonify, render_template, request, stream_with_context, url_for
+
+from bookings import check_bookings, parse_booking
+from cache import view_cache
+from forms import ShowForm, genre_choices, state_choices
+from models import db, Show, show_page, show_list_version
+from schedule import calendar_rows, calendar_window, ics_chunks, json_chunks
+from views import conditional, stream_template
+from writes import log_write
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def shows():
+  # displays list of shows at /shows
+  # TODO: replace with real shows data. [COMPLETED]
+
+  per_page = request.args.get('per_page', current_app.config['SHOWS_PER_PAGE'], type=int)
+  per_page = max(1, min(per_page, current_app.config['SHOWS_MAX_PER_PAGE']))
+  after, before = request.args.get('after'), request.args.get('before')
+  version = show_list_version()
+  return conditional(version, lambda: render_show_page(after, before, per_page, version[1]))
+
+def render_show_page(after, before, per_page, version):
+  try:
+    data, next_cursor, prev_cursor = view_cache.get_or_set(
+      f'shows:{after}:{before}:{per_page}', ['shows'], lambda: show_page_data(after, before, per_page),
+      version=version
+    )
+  except ValueError:
+    abort(400)
+  return render_template('pages/shows.html', shows=data, per_page=per_page,
+                         next_cursor=next_cursor, prev_cursor=prev_cursor)
+
+def show_page_data(after, before, per_page):
+  shows, next_cursor, prev_cursor = show_page(after=after, before=before, per_page=per_page)
+  return show_list(shows), next_cursor, prev_cursor
+
+def show_list(shows):
+  return [
+    {
+      'venue_id': show.venue_id,
+      'venue_name': show.venue_name,
+      'artist_id': show.artist_id,
+      'artist_name': show.artist_name,
+      'artist_image_link': show.artist_image_link,
+      'start_time': show.start_time
+    } for show in shows
+  ]
+
+#  Calendar
+#  ----------------------------------------------------------------
+
+def calendar():
+  # shows starting in a window (?start=&end=, a week from today by default),
+  # optionally only in a ?city= and/or ?state= and of a ?genre=; streamed
+  filters = calendar_filters()
+  # The page's filters for its feed links; `format` is the feed's own.
+  feed_args = {key: value for key, value in request.args.items() if key != 'format'}
+  return conditional(calendar_version(filters), lambda: stream_template(
+    'pages/calendar.html', shows=calendar_rows(**filters), states=state_choices, genres=genre_choices,
+    feed_args=feed_args, **filters
+  ))
+
+def calendar_feed(format):
+  # the calendar as JSON or as an iCalendar feed to subscribe to; streamed
+  filters = calendar_filters()
+
+  def render():
+    rows = calendar_rows(**filters)
+    if format == 'json':
+      chunks, mimetype = json_chunks(rows, filters['start'], filters['end']), 'application/json'
+    else:
+      chunks = ics_chunks(rows, lambda row: url_for('venues.show_venue', venue_id=row.venue_id, _external=True))
+      mimetype = 'text/calendar'
+    return Response(stream_with_context(chunks), mimetype=mimetype)
+
+  return conditional(calendar_version(filters), render)
+
+def calendar_filters():
+  try:
+    start, end = calendar_window(
+      request.args.get('start'), request.args.get('end'),
+      current_app.config['CALENDAR_DEFAULT_DAYS'], current_app.config['CALENDAR_MAX_DAYS']
+    )
+  except ValueError:
+    abort(400)
+  return {
+    'start': start,
+    'end': end,
+    'city': request.args.get('city', '').strip() or None,
+    'state': request.args.get('state', '').strip().upper() or None,
+    'genre': request.args.get('genre') or None,
+  }
+
+def calendar_version(filters):
+  # The show list's version, plus the window: a default one moves with the date.
+  last_modified, parts = show_list_version()
+  return last_modified, (*parts, filters['start'], filters['end'])
+
+def create_shows():
+  # renders form. do not touch.
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead [COMPLETED]
+
+  error = False
+  conflicts = []
+  form = ShowForm(request.form)
+  if form.validate():
+    artist_id = form.artist_id.data
+    venue_id = form.venue_id.data
+    start_time = form.start_time.data
+    end_time = form.end_time.data
+
+  try:
+    new_show = Show(
+      artist_id=int(artist_id),
+      venue_id=int(venue_id),
+      start_time=start_time,
+      end_time=end_time
+    )
+    conflicts = check_bookings([{
+      'venue_id': new_show.venue_id, 'artist_id': new_show.artist_id,
+      'start_time': start_time, 'end_time': end_time
+    }], lock=True)[0]
+    if not conflicts:
+      db.session.add(new_show)
+      db.session.flush()
+      log_write('create', new_show)
+      db.session.commit()
+      flash('Show was successfully listed!')
+  except:
+    error = True
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    if error == True:
+      flash('An error occurred. Show could not be listed.')
+    elif conflicts:
+      booked = ' and the '.join(sorted({conflict['on'] for conflict in conflicts}))
+      verb = 'are' if ' and ' in booked else 'is'
+      flash(f'Show could not be listed: the {booked} {verb} already booked at that time.')
+
+  # on successful db insert, flash success
+  # flash('Show was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead. [COMPLETED]
+  # e.g., flash('An error occurred. Show could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  return render_template('pages/home.html')
+
+def check_show_bookings():
+  # checks proposed shows, posted as {"bookings": [{"venue_id", "artist_id",
+  # "start_time", "end_time" (optional)}, ...]}, against the schedule and each
+  # other without booking them; one result per booking, in order
+  bookings = (request.get_json(silent=True) or {}).get('bookings')
+  if not isinstance(bookings, list):
+    return jsonify(error='Expected a JSON object with a "bookings" list.'), 400
+  if len(bookings) > current_app.config['SHOW_CHECK_MAX_BOOKINGS']:
+    return jsonify(error=f'At most {current_app.config["SHOW_CHECK_MAX_BOOKINGS"]} bookings per request.'), 400
+  parsed = []
+  for index, booking in enumerate(bookings):
+    try:
+      parsed.append(parse_booking(booking))
+    except KeyError as e:
+      return jsonify(error=f'Booking {index}: {e.args[0]} is required.'), 400
+    except (TypeError, ValueError) as e:
+      return jsonify(error=f'Booking {index}: {e}'), 400
+  return jsonify(results=[
+    {'ok': not conflicts, 'conflicts': conflicts} for conflicts in check_bookings(parsed)
+  ])
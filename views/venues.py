@@ -0,0 +1,266 @@
+import sys
+
+from flask import abort, current_app, flash, jsonify, redirect, render_template, request, url_for
+from sqlalchemy import select
+
+from autocomplete import venue_names
+from cache import view_cache
+from forms import VenueForm, genre_choices
+from models import db, Venue
+from models import venue_directory, load_venue_detail, venue_version, venue_directory_version
+from retire import delete_owners, retired
+from search import search
+from views import conditional
+from writes import log_write, log_writes
+
+#  Venues
+#  ----------------------------------------------------------------
+
+def venues():
+  # TODO: replace with real venues data. [COMPLETED]
+  #       num_upcoming_shows should be aggregated based on number of upcoming shows per venue.
+
+  genre = request.args.get('genre') or None
+  version = venue_directory_version()
+  return conditional(version, lambda: render_template(
+    'pages/venues.html', genre=genre, genres=genre_choices,
+    areas=view_cache.get_or_set(
+      f'venues:{genre or ""}', ['venues'], lambda: venue_directory(genre), version=version[1])
+  ))
+
+def search_venues():
+  # TODO: implement search on artists with partial string search. Ensure it is case-insensitive. [COMPLETED]
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  
+  search_term = request.form.get('search_term', '')
+  count, venues_by_search = search(Venue, search_term, limit=current_app.config['SEARCH_RESULTS_LIMIT'])
+  data = {
+    'count': count,
+    'data': venues_by_search
+  }
+
+  return render_template('pages/search_venues.html', results=data, search_term=search_term)
+
+def autocomplete_venues():
+  # answers search-as-you-type prefix queries from the in-process name index
+  limit = max(1, min(request.args.get('limit', 10, type=int), current_app.config['AUTOCOMPLETE_MAX_RESULTS']))
+  return jsonify(results=venue_names.complete(request.args.get('q', ''), limit))
+
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  # TODO: replace with real venue data from the venues table, using venue_id [COMPLETED]
+
+  version = venue_version(venue_id)
+  if version is None:
+    abort(404)
+  return conditional(version, lambda: render_venue_page(venue_id, version[1]))
+
+def render_venue_page(venue_id, version):
+  data = view_cache.get_or_set(
+    f'venue:{venue_id}', [f'venue:{venue_id}', 'venue:*'], lambda: venue_page_data(venue_id),
+    version=version
+  )
+  if data is None:
+    abort(404)
+  return render_template('pages/show_venue.html', venue=data)
+
+def venue_page_data(venue_id):
+  venue, past_shows, upcoming_shows = load_venue_detail(venue_id)
+  if venue is None:
+    return None
+  return venue_data(venue, past_shows, upcoming_shows)
+
+def venue_data(venue, past_shows, upcoming_shows):
+  past_shows_artist_data = [
+    {'artist_id': show.artist_id, 'artist_name': show.artist_name,
+    'artist_image_link': show.artist_image_link, 'start_time': show.start_time}
+    for show in past_shows
+  ]
+  upcoming_shows_artist_data = [
+    {'artist_id': show.artist_id, 'artist_name': show.artist_name,
+    'artist_image_link': show.artist_image_link, 'start_time': show.start_time}
+    for show in upcoming_shows
+  ]
+  data = {
+    'id': venue.id,
+    'name': venue.name,
+    'genres': list(venue.genres),
+    'address': venue.address,
+    'city': venue.city,
+    'state': venue.state,
+    'phone': venue.phone,
+    'website': venue.website,
+    'facebook_link': venue.facebook_link,
+    'seeking_talent': venue.seeking_talent,
+    'seeking_description': venue.seeking_description,
+    'image_link': venue.image_link,
+    'past_shows': past_shows_artist_data,
+    'upcoming_shows': upcoming_shows_artist_data,
+    'past_shows_count': len(past_shows),
+    'upcoming_shows_count': len(upcoming_shows),
+  }
+  return data
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+def create_venue_form():
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+def create_venue_submission():
+  # TODO: insert form data as a new Venue record in the db, instead [COMPLETED]
+  # TODO: modify data to be the data object returned from db insertion [COMPLETED] 
+
+  error = False
+  form = VenueForm(request.form)
+  if form.validate():
+    name = form.name.data
+    city = form.city.data
+    state = form.state.data
+    address = form.address.data
+    phone = form.phone.data
+    genres = form.genres.data
+    facebook_link = form.facebook_link.data
+    image_link = form.image_link.data
+    website = form.website_link.data
+    seeking_talent = form.seeking_talent.data
+    seeking_description = form.seeking_description.data
+    
+  try:
+    new_venue = Venue(
+      name=name,
+      city=city, 
+      state=state, 
+      address=address,
+      phone=phone, 
+      genres=genres, 
+      facebook_link=facebook_link,
+      image_link=image_link, 
+      website=website, 
+      seeking_talent=seeking_talent,
+      seeking_description=seeking_description 
+    )
+    db.session.add(new_venue)
+    db.session.flush()
+    log_write('create', new_venue)
+    db.session.commit()
+    venue_names.add(new_venue.id, new_venue.name)
+    flash('Venue ' + new_venue.name + ' was successfully listed!')
+  except:
+    error = True
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    if error == True: 
+      flash('An error occurred. Venue ' + form.name.data + ' could not be listed.')
+
+  # on successful db insert, flash success
+  # flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  # TODO: on unsuccessful db insert, flash an error instead. [Completed]
+  # e.g., flash('An error occurred. Venue ' + data.name + ' could not be listed.')
+  # see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+  return render_template('pages/home.html')
+
+def delete_venue(venue_id):
+  # TODO: Complete this endpoint for taking a venue_id, and using [COMPLETED]
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+
+  # The venue's shows go with it through ON DELETE CASCADE (see retire.py), so
+  # they are never loaded.
+  error = False
+  name = db.session.execute(select(Venue.name).where(Venue.id == venue_id)).scalar()
+  if name is None:
+    abort(404)
+
+  try:
+    delete_owners(db.session, Venue, [venue_id])
+    db.session.commit()
+    log_writes('delete', Venue, [{'id': venue_id, 'name': name}])
+    retired(Venue, [venue_id])
+    flash('Venue ' + name + ' was successfully deleted!')
+  except:
+    error = True
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    if error == True:
+      flash('An error occurred. Venue ' + name + ' could not be deleted.')
+
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  return jsonify(success=not error), 500 if error else 200
+
+#  Update
+#  ----------------------------------------------------------------
+
+def edit_venue(venue_id):
+  form = VenueForm()
+  venue, _, _ = load_venue_detail(venue_id, with_shows=False)
+  if venue is None:
+    abort(404)
+
+  # TODO: populate form with values from venue with ID <venue_id> [COMPLETED]
+  form.name.data = venue.name
+  form.city.data = venue.city
+  form.state.data = venue.state
+  form.address.data = venue.address
+  form.phone.data = venue.phone
+  form.genres.data = list(venue.genres)
+  form.facebook_link.data = venue.facebook_link
+  form.image_link.data = venue.image_link
+  form.website_link.data = venue.website
+  form.seeking_talent.data = venue.seeking_talent
+  form.seeking_description.data = venue.seeking_description
+  return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+def edit_venue_submission(venue_id):
+  # TODO: take values from the form submitted, and update existing [COMPLETED]
+  # venue record with ID <venue_id> using the new attributes
+
+  error = False
+  form = VenueForm(request.form)
+  venue = db.session.query(Venue).get(venue_id)
+  if form.validate():
+    name = form.name.data
+    city = form.city.data
+    state = form.state.data
+    address = form.address.data
+    phone = form.phone.data
+    genres = form.genres.data
+    facebook_link = form.facebook_link.data
+    image_link = form.image_link.data
+    website_link = form.website_link.data
+    seeking_talent = form.seeking_talent.data
+    seeking_description = form.seeking_description.data
+
+  try:
+    venue.name = name
+    venue.city = city
+    venue.state = state
+    venue.address = address
+    venue.phone = phone
+    venue.genres = genres
+    venue.facebook_link = facebook_link
+    venue.image_link = image_link
+    venue.website = website_link
+    venue.seeking_talent = seeking_talent
+    venue.seeking_description = seeking_description
+    db.session.flush()
+    log_write('update', venue)
+    db.session.commit()
+    venue_names.add(venue.id, venue.name)
+    flash(f'Venue, "{venue.name}" was successfully edited!')
+  except:
+    error = True
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+    if error == True:
+      flash(f'An error occurred! Venue, "{venue.name}" could not be edited!')
+
+  return redirect(url_for('.show_venue', venue_id=venue_id))
@@ -0,0 +1,245 @@
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, inspect, select
+
+from bookings import check_bookings
+from cache import owner_namespaces, show_namespaces
+from importer import IMPORTERS, Rejected
+from models import db, Artist, Genre, Show, Venue, count_shows, genre_links
+
+#----------------------------------------------------------------------------#
+# Write log.
+#----------------------------------------------------------------------------#
+
+# Every create and update is logged as one JSON line on the app's logger, e.g.
+# {"event": "venue.create", "id": 7, "name": "The Musical Hop", ...}. Only
+# column values are logged, and only those already in memory, so logging never
+# loads a relationship or refreshes an expired attribute.
+
+def log_write(action, obj):
+  # Logs a write to the model instance `obj`; call it after a flush so that
+  # new rows have their ids.
+  state = inspect(obj)
+  values = {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+  if state.identity:
+    values.setdefault('id', state.identity[0])
+  log_writes(action, type(obj), [values])
+
+
+def log_writes(action, model, rows):
+  # Logs writes to `model` given as dicts of column values, e.g. bulk mappings.
+  columns = model.__table__.c
+  event = f'{model.__name__.lower()}.{action}'
+  for values in rows:
+    record = {'event': event}
+    record.update((name, value) for name, value in values.items() if name in columns)
+    current_app.logger.info(json.dumps(record, default=str))
+
+#----------------------------------------------------------------------------#
+# Batches.
+#----------------------------------------------------------------------------#
+
+# A batch creates and updates venues, artists and shows in one transaction:
+#
+#   {"venues":  {"create": [{...}, ...], "update": [{"id": 1, ...}, ...]},
+#    "artists": {...}, "shows": {...}}
+#
+# Items are checked by the importer's validators (see importer.py), and an
+# update only needs the fields it changes. Venues and artists are written
+# first, so shows can name ones created earlier in the same batch. Each kind
+# and operation is one bulk executemany (plus one for genre links), and on
+# PostgreSQL new ids come back from the same statement through RETURNING.
+#
+# A batch is all or nothing: apply_batch() raises BatchRejected listing every
+# item's errors, and the caller rolls back. It doesn't commit either.
+
+KINDS = ('venues', 'artists', 'shows')
+OPERATIONS = ('create', 'update')
+MODELS = {'venues': Venue, 'artists': Artist, 'shows': Show}
+
+
+class BatchRejected(Exception):
+    # args[0] is a list of {'kind', 'op', 'index', 'errors'}
+    pass
+
+
+def batch_items(data):
+  # The {kind: {op: [item, ...]}} of a batch, raising ValueError if `data`
+  # isn't shaped like one.
+  if not isinstance(data, dict) or not data or set(data) - set(KINDS):
+    raise ValueError(f'Expected a JSON object with any of {", ".join(KINDS)}.')
+  items = {}
+  for kind, ops in data.items():
+    if not isinstance(ops, dict) or set(ops) - set(OPERATIONS):
+      raise ValueError(f'{kind}: Expected an object with "create" and/or "update" lists.')
+    for op, op_items in ops.items():
+      if not isinstance(op_items, list) or not all(isinstance(item, dict) for item in op_items):
+        raise ValueError(f'{kind}.{op}: Expected a list of objects.')
+      if op == 'update' and not all(isinstance(item.get('id'), int) for item in op_items):
+        raise ValueError(f'{kind}.update: Every item needs an integer "id".')
+      if op == 'update' and len({item['id'] for item in op_items}) < len(op_items):
+        raise ValueError(f'{kind}.update: An id can only be updated once per batch.')
+    items[kind] = {op: ops.get(op, []) for op in OPERATIONS}
+  return items
+
+
+def apply_batch(items):
+  # Writes the batch `items` (as from batch_items()) and returns
+  # ({kind: {'created': [id, ...], 'updated': [id, ...]}}, {kind: (created
+  # mappings, updated mappings)}, view cache namespaces to invalidate), ids in
+  # item order.
+  results, written, namespaces, errors = {}, {}, set(), []
+  for kind in KINDS:
+    if kind not in items:
+      continue
+    if kind == 'shows' and errors:
+      # Shows can only be checked once the venues and artists are written.
+      break
+    batch = _Batch(kind, items[kind]['create'], items[kind]['update'])
+    errors.extend(batch.validate())
+    if errors:
+      continue
+    batch.write()
+    written[kind] = (batch.created, batch.updated)
+    namespaces |= batch.namespaces()
+    results[kind] = {
+      'created': [values['id'] for values in batch.created],
+      'updated': [values['id'] for values in batch.updated],
+    }
+  if errors:
+    raise BatchRejected(errors)
+  return results, written, namespaces
+
+
+class _Batch:
+    # One kind's creates and updates, validated and then written in bulk.
+
+    def __init__(self, kind, creates, updates):
+      self.kind, self.model = kind, MODELS[kind]
+      self.creates, self.updates = creates, updates
+      self.existing = self._load_existing([item['id'] for item in updates])
+      self.importer = IMPORTERS[kind](rows=[*creates, *self._merged_rows()])
+      self.created, self.updated = [], []
+
+    def validate(self):
+      errors = []
+      # Updates go first, so that a name an update gives up is free for a create.
+      for op, op_items in (('update', self.updates), ('create', self.creates)):
+        for index, item in enumerate(op_items):
+          try:
+            values = self._validate(op, item)
+          except Rejected as e:
+            errors.append({'kind': self.kind, 'op': op, 'index': index, 'errors': e.args[0]})
+            continue
+          (self.updated if op == 'update' else self.created).append(values)
+      if not errors and self.model is Show:
+        errors.extend(self._booking_errors())
+      return errors
+
+    def write(self):
+      session = db.session
+      if self.created:
+        session.bulk_insert_mappings(self.model, self.created, return_defaults=True)
+      if self.updated:
+        session.bulk_update_mappings(self.model, self.updated)
+      if self.model is Show:
+        # Bulk writes bypass the ORM's flush, so count the shows here.
+        count_shows(
+          session,
+          added=[_show_key(values) for values in self.created + self.updated],
+          removed=[_show_key(self.existing[values['id']]) for values in self.updated],
+        )
+      else:
+        self._write_genres()
+
+    def namespaces(self):
+      # The same namespaces the ORM's flush would invalidate (see cache.py).
+      if self.model is Show:
+        shows = self.created + self.updated + [self.existing[values['id']] for values in self.updated]
+        return show_namespaces({show['venue_id'] for show in shows}, {show['artist_id'] for show in shows})
+      return set().union(*(owner_namespaces(self.model, values['id']) for values in self.created + self.updated))
+
+    def _validate(self, op, item):
+      if op == 'create':
+        return self.importer.validate(item)
+      existing = self.existing.get(item['id'])
+      if existing is None:
+        raise Rejected([f'id: No {self.kind[:-1]} with id {item["id"]}.'])
+      if self.model is not Show:
+        self.importer.names.discard(existing['name'])
+      values = self.importer.validate(self._merge(existing, item))
+      values['id'] = item['id']
+      return values
+
+    def _merge(self, existing, item):
+      row = {**existing, **item}
+      if self.model is Show and 'start_time' in item and 'end_time' not in item:
+        # A show moved without a new end keeps its length.
+        try:
+          length = existing['end_time'] - existing['start_time']
+          row['end_time'] = datetime.fromisoformat(str(item['start_time'])) + length
+        except ValueError:
+          pass
+      # A show moved to a venue or artist given by name takes that one.
+      for kind in ('venue', 'artist'):
+        if f'{kind}_name' in item and f'{kind}_id' not in item:
+          row.pop(f'{kind}_id', None)
+      return row
+
+    def _merged_rows(self):
+      return [self._merge(self.existing[item['id']], item) for item in self.updates if item['id'] in self.existing]
+
+    def _load_existing(self, ids):
+      # Current column values (and genres) of the updated rows, by id.
+      if not ids:
+        return {}
+      table = self.model.__table__
+      existing = {
+        row.id: dict(row._mapping) for row in db.session.execute(select(table).where(table.c.id.in_(sorted(set(ids)))))
+      }
+      if self.model is not Show:
+        links, owner_id = genre_links(self.model)
+        for row in existing.values():
+          row['genres'] = []
+        for owner, name in db.session.execute(
+          select(owner_id, Genre.name).join(Genre, Genre.id == links.c.genre_id).where(owner_id.in_(sorted(existing)))
+        ):
+          existing[owner]['genres'].append(name)
+      return existing
+
+    def _write_genres(self):
+      links, owner_id = genre_links(self.model)
+      if self.updated:
+        db.session.execute(delete(links).where(owner_id.in_([values['id'] for values in self.updated])))
+      rows = [
+        {owner_id.key: values['id'], 'genre_id': self.importer.genre_ids[genre]}
+        for values in self.created + self.updated for genre in values['genres']
+      ]
+      if rows:
+        db.session.execute(links.insert(), rows)
+
+    def _booking_errors(self):
+      # Shows in the batch may not overlap each other, or existing shows other
+      # than the ones being moved.
+      moved = {values['id'] for values in self.updated}
+      bookings = [('update', index, values) for index, values in enumerate(self.updated)]
+      bookings += [('create', index, values) for index, values in enumerate(self.created)]
+      errors = []
+      for position, conflicts in enumerate(check_bookings([values for _, _, values in bookings], lock=True)):
+        messages = []
+        for conflict in conflicts:
+          if 'show_id' in conflict and conflict['show_id'] not in moved:
+            messages.append(f'start_time: The {conflict["on"]} is already booked then (show {conflict["show_id"]}).')
+          elif conflict.get('booking', position) < position:
+            other_op, other_index, _ = bookings[conflict['booking']]
+            messages.append(f'start_time: The {conflict["on"]} is already booked then ({other_op} {other_index}).')
+        if messages:
+          op, index, _ = bookings[position]
+          errors.append({'kind': 'shows', 'op': op, 'index': index, 'errors': messages})
+      return errors
+
+
+def _show_key(values):
+  return values['venue_id'], values['artist_id'], values['start_time']
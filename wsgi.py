@@ -0,0 +1,8 @@
+from app import create_app
+from lazy import preload
+
+# The app production servers load: `gunicorn wsgi:app`, configured by
+# gunicorn.conf.py. Its views are imported up front, as the master process
+# loads the app once and forks its workers from it.
+app = create_app()
+preload(app)